@@ -0,0 +1,143 @@
+"""Benchmark: full-text search over stored documents.
+
+Fills a scratch SQLite database with synthetic documents (rendered from the
+fallback templates with varied client details), then compares FTS5 search
+against scanning and decompressing every document in Python. Also times
+incremental indexing on insert and a full reindex.
+
+    python benchmarks/bench_fts.py [--documents N] [--keep PATH]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import select
+
+from src.models.document import Document, decompress_content
+from src.models.user import db
+from src.routes.eia_docs import WORKFLOW_STEPS, normalize_client_context
+from src.services.document_search import document_search
+from src.services.fallback_templates import fallback_registry, render_fallback_document
+
+FIRST_NAMES = ('Jordan', 'Avery', 'Riley', 'Casey', 'Morgan', 'Taylor', 'Quinn', 'Reese', 'Skyler', 'Dakota')
+LAST_NAMES = ('Frame', 'Lopez', 'Nguyen', 'Okafor', 'Schmidt', 'Patel', 'Kowalski', 'Haddad', 'Brennan', 'Ito')
+PLACEMENTS = ('Cypress Residential', 'Harbor Group Home', 'Oakview Foster Care', 'Lakeside Kinship Placement',
+              'Pinecrest Treatment Center', 'Maple Street Shelter')
+GUARDIANS = ('DFPS Caseworker', 'Maternal Grandmother', 'Legal Aunt', 'Foster Parent', 'Court Appointed Guardian')
+URGENCY = ('standard', 'urgent', 'crisis')
+
+QUERIES = (
+    ('placement', 'Pinecrest Treatment', {}),
+    ('guardian', 'Grandmother', {}),
+    ('risk term + step', 'crisis', {'step_id': 'step3'}),
+    ('prefix', 'Kowal', {}),
+    ('phrase + date range', 'Harbor Group', {'created_from': 'recent'}),
+)
+
+
+def synthetic_documents(count, seed=7):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    for index in range(count):
+        step_id = WORKFLOW_STEPS[index % len(WORKFLOW_STEPS)]
+        client_data = {
+            'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'medicaidId': str(100000000 + rng.randrange(900000000)),
+            'guardian': rng.choice(GUARDIANS),
+            'placement': rng.choice(PLACEMENTS),
+            'urgencyLevel': rng.choice(URGENCY),
+        }
+        document = Document(
+            client_key=f"medicaid:{client_data['medicaidId']}",
+            client_name=client_data['name'],
+            step_id=step_id,
+            document_type=fallback_registry.get(step_id).document_type,
+            source='template',
+            created_at=now - timedelta(minutes=count - index)
+        )
+        document.content = render_fallback_document(step_id, normalize_client_context(client_data))
+        yield document
+
+
+def python_scan(term, step_id=None):
+    """Baseline: decompress every document and look for the term."""
+    needle = term.lower()
+    matches = 0
+    rows = db.session.execute(select(Document.step_id, Document.content_encoding, Document.content_data))
+    for row in rows:
+        if step_id and row.step_id != step_id:
+            continue
+        if needle in decompress_content(row.content_data, row.content_encoding).lower():
+            matches += 1
+    return matches
+
+
+def time_call(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--keep', help='write the scratch database here instead of a temp file')
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory()
+    path = args.keep or os.path.join(scratch.name, 'bench_fts.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    fallback_registry.init_app(app)
+    document_search.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        document_search.create_index()
+
+        started = time.perf_counter()
+        batch = []
+        for document in synthetic_documents(args.documents):
+            batch.append(document)
+            if len(batch) == args.batch_size:
+                db.session.add_all(batch)
+                db.session.commit()
+                db.session.expunge_all()
+                batch = []
+        if batch:
+            db.session.add_all(batch)
+            db.session.commit()
+            db.session.expunge_all()
+        insert_seconds = time.perf_counter() - started
+        print(f'inserted + indexed {args.documents} documents in {insert_seconds:.1f}s '
+              f'({args.documents / insert_seconds:.0f} docs/s), db size {os.path.getsize(path) / 1e6:.1f} MB')
+
+        recent = datetime.utcnow() - timedelta(minutes=args.documents // 10)
+        print(f"\n{'query':<22} {'hits':>6} {'fts p50 ms':>11} {'fts max ms':>11} {'scan ms':>9} {'speedup':>8}")
+        for label, term, filters in QUERIES:
+            filters = {key: recent if value == 'recent' else value for key, value in filters.items()}
+            rows, p50, worst = time_call(lambda: document_search.search(term, limit=20, **filters), args.repeat)
+            _, scan_ms, _ = time_call(lambda: python_scan(term, filters.get('step_id')), 1)
+            print(f'{label:<22} {len(rows):>6} {p50:>11.2f} {worst:>11.2f} {scan_ms:>9.0f} {scan_ms / p50:>7.0f}x')
+
+        started = time.perf_counter()
+        count = document_search.rebuild()
+        print(f'\nfull reindex of {count} documents: {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
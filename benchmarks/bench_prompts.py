@@ -0,0 +1,79 @@
+"""Micro-benchmark: per-request prompt construction.
+
+Compares the builder from before the prompt registry (benchmarks/prompts_baseline.py,
+copied verbatim: seven f-string prompts built per call, one kept) with the
+current ``get_enhanced_eia_prompts``, and with the bare registry render it
+wraps. Checks first that both builders produce the same prompts.
+
+    python benchmarks/bench_prompts.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prompts_baseline
+from src.routes.eia_docs import get_enhanced_eia_prompts
+from src.services.client_context import normalize_client_context
+from src.services.metrics import metrics
+from src.services.prompt_registry import prompt_date, prompt_registry
+
+CLIENT_DATA = {
+    'name': 'Jordan Avery',
+    'medicaidId': '123456789',
+    'guardian': 'Pat Avery',
+    'placement': 'Cypress Residential',
+    'urgencyLevel': 'urgent',
+}
+
+STEPS = ('step1', 'step2', 'step3', 'step4', 'step5', 'step6', 'step7', 'unknown')
+
+
+def registry_render(step_id, client_data):
+    context = normalize_client_context(client_data)
+    context['currentDate'] = prompt_date()
+    return prompt_registry.get(step_id).render(context)
+
+
+def check_identical():
+    for step_id in STEPS:
+        baseline = prompts_baseline.get_enhanced_eia_prompts(step_id, CLIENT_DATA)
+        current = get_enhanced_eia_prompts(step_id, CLIENT_DATA)
+        if (baseline['documentType'], baseline['prompt']) != (current['documentType'], current['prompt']):
+            raise SystemExit(f'{step_id}: the registry prompt differs from the baseline')
+
+
+def measure(func, iterations):
+    seconds = min(timeit.repeat(lambda: func('step3', CLIENT_DATA), number=iterations, repeat=5)) / iterations
+    tracemalloc.start()
+    func('step3', CLIENT_DATA)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds * 1e6, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    prompt_registry.load()
+    # As create_app does: stage timings of known steps take the cached path
+    metrics.track_steps(prompt_registry)
+    check_identical()
+    results = {
+        'baseline (verbatim)': measure(prompts_baseline.get_enhanced_eia_prompts, args.iterations),
+        'get_enhanced_eia_prompts': measure(get_enhanced_eia_prompts, args.iterations),
+        'registry render only': measure(registry_render, args.iterations),
+    }
+    baseline_us, _ = results['baseline (verbatim)']
+    print(f"{'variant':<26} {'us/call':>9} {'peak bytes':>11} {'speedup':>8}")
+    for name, (us, peak) in results.items():
+        print(f'{name:<26} {us:>9.2f} {peak:>11} {baseline_us / us:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Micro-benchmark suite for the per-request hot paths.
+
+Cases:
+
+    prompt/<step>      get_enhanced_eia_prompts for every step (and an unknown one)
+    template/<step>    generate_enhanced_template_document for every document type
+    serialize/...      JSON encoding of a generated document response
+    users/...          user CRUD routes through Flask's test client
+
+Each case reports the best and median time per call over several repeats
+and the tracemalloc peak of one call, as JSON. ``--compare`` checks the
+results against a stored baseline and exits non-zero when a case is slower,
+or allocates more, than the baseline by more than ``--threshold``. Timings
+only compare on the machine the baseline was recorded on; re-record it with
+``--save-baseline`` when moving.
+
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --save-baseline
+    python benchmarks/bench_suite.py --compare benchmarks/baseline.json [--threshold 0.25]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.main import create_app
+from src.services.startup import startup
+from src.routes.eia_docs import (WORKFLOW_STEPS, build_document_response, generate_enhanced_template_document,
+                                 get_enhanced_eia_prompts)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+CLIENT_DATA = {
+    'name': 'Jordan Avery',
+    'medicaidId': '123456789',
+    'dateOfBirth': '2011-04-02',
+    'guardian': 'Pat Avery',
+    'placement': 'Cypress Residential',
+    'referralSource': 'DFPS',
+    'serviceRequests': 'Individual therapy, psychiatric evaluation',
+    'urgencyLevel': 'urgent',
+}
+
+
+def build_cases(app, client):
+    cases = {}
+    for step_id in WORKFLOW_STEPS + ('unknown',):
+        cases[f'prompt/{step_id}'] = lambda step_id=step_id: get_enhanced_eia_prompts(step_id, CLIENT_DATA)
+        cases[f'template/{step_id}'] = lambda step_id=step_id: generate_enhanced_template_document(step_id, CLIENT_DATA)
+
+    document = build_document_response(
+        'step3', CLIENT_DATA, get_enhanced_eia_prompts('step3', CLIENT_DATA),
+        generate_enhanced_template_document('step3', CLIENT_DATA), 'template'
+    )
+    cases['serialize/json.dumps'] = lambda: json.dumps(document)
+
+    def flask_jsonify():
+        with app.app_context():
+            return app.json.response(document).get_data()
+    cases['serialize/flask-jsonify'] = flask_jsonify
+
+    counter = iter(range(10 ** 9))
+    client.put('/api/users/bulk', json={'users': [{'username': f'seed{n}', 'email': f'seed{n}@bench'} for n in range(500)]})
+
+    def create_and_delete():
+        n = next(counter)
+        user = client.post('/api/users', json={'username': f'bench{n}', 'email': f'bench{n}@bench'}).get_json()
+        client.delete(f"/api/users/{user['id']}")
+    cases['users/create+delete'] = create_and_delete
+    cases['users/get'] = lambda: client.get('/api/users/1').get_data()
+    cases['users/update'] = lambda: client.put('/api/users/1', json={'email': 'seed0@bench'}).get_data()
+    cases['users/list-page-100'] = lambda: client.get('/api/users?limit=100&after=0').get_data()
+    cases['users/list-page-100-projected'] = lambda: client.get('/api/users?limit=100&fields=username').get_data()
+    return cases
+
+
+def calibrate(func, min_seconds):
+    """Number of calls that takes at least ``min_seconds``."""
+    func()
+    number = 1
+    while True:
+        elapsed = timeit.timeit(func, number=number)
+        if elapsed >= min_seconds:
+            return number
+        number *= 2 if elapsed == 0 else max(2, int(min_seconds / elapsed * 1.2))
+
+
+def peak_bytes(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(cases, repeat, min_seconds):
+    """Time every case ``repeat`` times, round-robin.
+
+    Interleaving the repeats spreads a slow spell on the host over all
+    cases instead of inflating whichever case happened to be running.
+    """
+    numbers = {name: calibrate(func, min_seconds) for name, func in cases.items()}
+    samples = {name: [] for name in cases}
+    for _ in range(repeat):
+        for name, func in cases.items():
+            samples[name].append(timeit.timeit(func, number=numbers[name]) / numbers[name])
+    return {
+        name: {
+            'usPerCall': round(min(samples[name]) * 1e6, 3),
+            'usMedian': round(statistics.median(samples[name]) * 1e6, 3),
+            'peakBytes': peak_bytes(func),
+            'iterations': numbers[name],
+        }
+        for name, func in cases.items()
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table; return the names of regressed cases."""
+    regressions = []
+    print(f"{'case':<34} {'base us':>10} {'now us':>10} {'delta':>8} {'base peak':>10} {'now peak':>10}  status")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<34} {'-':>10} {result['usPerCall']:>10.2f} {'':>8} {'-':>10} {result['peakBytes']:>10}  new")
+            continue
+        delta = result['usPerCall'] / base['usPerCall'] - 1 if base['usPerCall'] else 0.0
+        peak_delta = result['peakBytes'] / base['peakBytes'] - 1 if base['peakBytes'] else 0.0
+        status = 'ok'
+        if delta > threshold or peak_delta > threshold:
+            status = 'REGRESSION'
+            regressions.append(name)
+        elif delta < -threshold:
+            status = 'faster'
+        print(f"{name:<34} {base['usPerCall']:>10.2f} {result['usPerCall']:>10.2f} {delta:>+7.1%} "
+              f"{base['peakBytes']:>10} {result['peakBytes']:>10}  {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--min-seconds', type=float, default=0.1, help='minimum duration of each repeat')
+    parser.add_argument('--output', help='write JSON results here (default: stdout)')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help='write results as the baseline')
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, help='compare with a baseline file')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown / growth (fraction)')
+    args = parser.parse_args()
+
+    scratch = tempfile.TemporaryDirectory()
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(scratch.name, 'bench.db')}",
+        'EIA_LIMITER_STATE_PATH': os.path.join(scratch.name, 'rate_limit.db'),
+    })
+    startup.migrate(app)
+    client = app.test_client()
+
+    cases = {name: func for name, func in build_cases(app, client).items() if args.filter in name}
+    results = run(cases, args.repeat, args.min_seconds)
+    for name, result in results.items():
+        print(f"{name:<34} {result['usPerCall']:>10.2f} us  {result['peakBytes']:>9} B", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'machine': f'{platform.system()} {platform.machine()} ({os.cpu_count()} cpu)',
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"baseline: {baseline['meta'].get('revision')} on {baseline['meta'].get('machine')}")
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+    elif not args.output and not args.save_baseline:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
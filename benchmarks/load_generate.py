@@ -0,0 +1,155 @@
+"""Load generator for /api/eia/generate-document at fixed concurrency levels.
+
+For each concurrency level, that many client threads send requests
+back-to-back over keep-alive connections for ``--seconds``. The report
+covers throughput, p50/p95/p99 latency, the fallback rate (documents
+served from the template) and status counts. With ``--stream`` the SSE
+endpoint is used and time to first byte is reported as well. With ``--pid``
+(Linux) the peak resident memory of that server process during each level
+is reported too.
+
+    python benchmarks/stub_openai.py --port 8100 &
+    OPENAI_API_BASE=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub gunicorn -c gunicorn.conf.py &
+    python benchmarks/load_generate.py --url http://localhost:5000 --concurrency 1,8,32,64
+
+    OPENAI_API_BASE=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub uvicorn src.asgi:app --port 5000 &
+    python benchmarks/load_generate.py --concurrency 10,100,500 --pid $!
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+STEPS = ('step1', 'step2', 'step3', 'step4', 'step5', 'step6', 'step7')
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def rss_mb(pid):
+    """Resident set size of ``pid`` in MiB, from /proc"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def run_level(args, concurrency):
+    parts = urlsplit(args.url)
+    path = '/api/eia/generate-document/stream' if args.stream else '/api/eia/generate-document'
+    stop_at = time.monotonic() + args.seconds
+    lock = threading.Lock()
+    latencies, first_bytes, statuses, sources = [], [], Counter(), Counter()
+
+    def worker(index):
+        conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=args.timeout)
+        local_latencies, local_first, local_statuses, local_sources = [], [], Counter(), Counter()
+        sequence = 0
+        while time.monotonic() < stop_at:
+            sequence += 1
+            body = json.dumps({
+                'clientData': {'name': f'Load Client {index}-{sequence % args.clients}', 'urgencyLevel': 'standard'},
+                'stepId': STEPS[(index + sequence) % len(STEPS)],
+                'cache': args.cache,
+            })
+            started = time.perf_counter()
+            try:
+                conn.request('POST', path, body, {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                first_byte = time.perf_counter()
+                data = response.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=args.timeout)
+                local_statuses['conn-error'] += 1
+                continue
+            finished = time.perf_counter()
+            local_latencies.append(finished - started)
+            local_first.append(first_byte - started)
+            local_statuses[response.status] += 1
+            if response.status == 200:
+                local_sources[document_source(data, args.stream)] += 1
+        with lock:
+            latencies.extend(local_latencies)
+            first_bytes.extend(local_first)
+            statuses.update(local_statuses)
+            sources.update(local_sources)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    peak_rss = None
+    for thread in threads:
+        while thread.is_alive():
+            if args.pid:
+                rss = rss_mb(args.pid)
+                if rss is not None:
+                    peak_rss = max(peak_rss or 0, rss)
+            thread.join(0.25)
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    first_bytes.sort()
+    documents = sum(sources.values())
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'reqPerSec': round(len(latencies) / elapsed, 2),
+        'p50Ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'p95Ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'p99Ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'ttfbP50Ms': round(percentile(first_bytes, 0.50) * 1000, 1),
+        'fallbackRate': round(sources.get('template', 0) / documents, 4) if documents else 0.0,
+        'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        'peakRssMb': round(peak_rss, 1) if peak_rss is not None else None,
+    }
+
+
+def document_source(data, stream):
+    if not stream:
+        return json.loads(data).get('source', 'unknown')
+    for block in data.decode().split('\n\n'):
+        if block.startswith('event: metadata'):
+            return json.loads(block.split('data: ', 1)[1]).get('source', 'unknown')
+    return 'error'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--concurrency', default='1,8,32', help='comma-separated concurrency levels')
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--cache', default='bypass', choices=('use', 'bypass', 'refresh'))
+    parser.add_argument('--clients', type=int, default=1000, help='distinct client names per thread (cache spread)')
+    parser.add_argument('--stream', action='store_true', help='use the SSE endpoint')
+    parser.add_argument('--json', action='store_true', help='print one JSON object per level')
+    parser.add_argument('--pid', type=int, help='server process whose peak RSS to report')
+    args = parser.parse_args()
+
+    if not args.json:
+        print(f"{'conc':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ttfb ms':>8} {'fallback':>9} "
+              f"{'rss MB':>7}  statuses")
+    for concurrency in (int(level) for level in args.concurrency.split(',')):
+        result = run_level(args, concurrency)
+        if args.json:
+            print(json.dumps(result))
+            continue
+        statuses = ' '.join(f'{status}:{count}' for status, count in result['statuses'].items())
+        rss = f"{result['peakRssMb']:.1f}" if result['peakRssMb'] is not None else '-'
+        print(f"{result['concurrency']:>5} {result['reqPerSec']:>8.1f} {result['p50Ms']:>9.1f} {result['p95Ms']:>9.1f} "
+              f"{result['p99Ms']:>9.1f} {result['ttfbP50Ms']:>8.1f} {result['fallbackRate']:>8.1%} {rss:>7}  {statuses}")
+
+
+if __name__ == '__main__':
+    main()
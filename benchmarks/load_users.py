@@ -0,0 +1,137 @@
+"""Load test: user API read and write throughput against a running server.
+
+Each scenario runs for a fixed time on several client threads over
+keep-alive connections and reports requests/s, rows/s and latency:
+
+    read    walk GET /api/users pages (keyset, ``--page-size`` rows)
+    create  POST /api/users, one user per request
+    bulk    POST /api/users/bulk, ``--batch`` new users per request
+    upsert  PUT /api/users/bulk, ``--batch`` users per request (half updates)
+
+    gunicorn -c gunicorn.conf.py   # e.g. WEB_CONCURRENCY=4
+    python benchmarks/load_users.py --url http://localhost:5000 --seed 20000
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+SCENARIOS = ('read', 'create', 'bulk', 'upsert')
+
+
+class Client:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body) if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload else {}
+        try:
+            self.conn.request(method, path, payload, headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            return 599, None
+        return response.status, data
+
+
+def run_scenario(args, scenario, run_id):
+    stop_at = time.monotonic() + args.seconds
+    latencies, counters, lock = [], {'requests': 0, 'rows': 0, 'errors': 0}, threading.Lock()
+
+    def worker(index):
+        client = Client(args.url)
+        prefix = f'{run_id}-{scenario}-{index}'
+        after, sequence, local = 0, 0, []
+        requests = rows = errors = 0
+        while time.monotonic() < stop_at:
+            sequence += 1
+            if scenario == 'read':
+                method, path, body = 'GET', f'/api/users?limit={args.page_size}&after={after}', None
+            elif scenario == 'create':
+                name = f'{prefix}-{sequence}'
+                method, path, body = 'POST', '/api/users', {'username': name, 'email': f'{name}@load.test'}
+            else:
+                # upsert reuses the previous batch's names for half the rows
+                base = sequence - 1 if scenario == 'upsert' and sequence % 2 == 0 else sequence
+                users = [{'username': f'{prefix}-{base}-{n}', 'email': f'{prefix}-{sequence}-{n}@load.test'}
+                         for n in range(args.batch)]
+                method, path, body = ('POST' if scenario == 'bulk' else 'PUT'), '/api/users/bulk', {'users': users}
+            started = time.perf_counter()
+            status, data = client.request(method, path, body)
+            local.append(time.perf_counter() - started)
+            requests += 1
+            if status >= 400:
+                errors += 1
+                continue
+            if scenario == 'read':
+                page = json.loads(data)
+                rows += len(page['users'])
+                after = page['nextAfter'] or 0
+            else:
+                rows += 1 if scenario == 'create' else args.batch
+        with lock:
+            latencies.extend(local)
+            counters['requests'] += requests
+            counters['rows'] += rows
+            counters['errors'] += errors
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(args.threads)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    return {
+        'scenario': scenario,
+        'reqPerSec': counters['requests'] / elapsed,
+        'rowsPerSec': counters['rows'] / elapsed,
+        'p50Ms': statistics.median(latencies) * 1000 if latencies else 0,
+        'p95Ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+        'errors': counters['errors'],
+    }
+
+
+def seed(args, run_id):
+    client = Client(args.url)
+    for start in range(0, args.seed, 1000):
+        users = [{'username': f'{run_id}-seed-{n}', 'email': f'{run_id}-seed-{n}@load.test'}
+                 for n in range(start, min(start + 1000, args.seed))]
+        status, _ = client.request('POST', '/api/users/bulk', {'users': users})
+        if status >= 400:
+            raise SystemExit(f'Seeding failed with HTTP {status}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--batch', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0, help='bulk-create this many users first')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    args = parser.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    if args.seed:
+        seed(args, run_id)
+    print(f"{'scenario':<8} {'req/s':>9} {'rows/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for scenario in args.scenarios.split(','):
+        result = run_scenario(args, scenario, run_id)
+        print(f"{result['scenario']:<8} {result['reqPerSec']:>9.1f} {result['rowsPerSec']:>10.0f} "
+              f"{result['p50Ms']:>8.1f} {result['p95Ms']:>8.1f} {result['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Interactive latency while a large generation job drains.
+
+Queues a job of ``--items`` documents for distinct clients (batch work, run
+by the server's job workers) and, while it runs, sends ``--probes``
+interactive /generate-document requests per urgency level, one every
+``--interval`` seconds, bypassing the cache. The report gives probe latency
+per urgency level, the job's progress, and the limiter's per-class
+scheduler stats from /api/eia/upstream/limiter.
+
+Give the job workers more threads than the server has upstream slots, so
+batch work alone would keep every slot busy:
+
+    python benchmarks/stub_openai.py --port 8100 --latency fixed:0.5 &
+    OPENAI_API_BASE=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub EIA_UPSTREAM_RPM=0 EIA_UPSTREAM_TPM=0 \\
+        EIA_JOB_WORKERS=16 WEB_CONCURRENCY=1 gunicorn -c gunicorn.conf.py &
+    python benchmarks/priority_mix.py --url http://localhost:5000
+
+Rerun the server with ``EIA_SCHEDULER_RESERVED_SLOTS=0`` and every
+``EIA_SCHEDULER_WEIGHT_*`` set to 1 for first-come, first-served slots.
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+URGENCY_LEVELS = ('emergency', 'standard')
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def request(url, method, path, body=None, timeout=120):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+    try:
+        conn.request(method, path, json.dumps(body) if body is not None else None,
+                     {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b'null')
+    finally:
+        conn.close()
+
+
+def probe(args, urgency, latencies, statuses):
+    for index in range(args.probes):
+        started = time.perf_counter()
+        status, _ = request(args.url, 'POST', '/api/eia/generate-document', {
+            'clientData': {'name': f'Probe {urgency} {index}', 'urgencyLevel': urgency},
+            'stepId': 'step1',
+            'cache': 'bypass'
+        })
+        latencies.append(time.perf_counter() - started)
+        statuses.append(status)
+        time.sleep(args.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--items', type=int, default=400, help='documents in the batch job')
+    parser.add_argument('--probes', type=int, default=20, help='interactive requests per urgency level')
+    parser.add_argument('--interval', type=float, default=0.5)
+    parser.add_argument('--warmup', type=float, default=3.0, help='seconds to let the job fill the queue first')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    status, job = request(args.url, 'POST', '/api/eia/jobs', {
+        'clients': [{'name': f'Batch Client {index}', 'medicaidId': f'B{index}'} for index in range(args.items)],
+        'stepIds': ['step1']
+    })
+    if status != 202:
+        raise SystemExit(f'Could not queue the batch job: {status} {job}')
+    time.sleep(args.warmup)
+
+    results = {urgency: ([], []) for urgency in URGENCY_LEVELS}
+    threads = [threading.Thread(target=probe, args=(args, urgency, *results[urgency])) for urgency in URGENCY_LEVELS]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    _, progress = request(args.url, 'GET', f"/api/eia/jobs/{job['id']}")
+    _, limiter = request(args.url, 'GET', '/api/eia/upstream/limiter')
+    request(args.url, 'POST', f"/api/eia/jobs/{job['id']}/cancel")
+    report = {
+        'probes': {
+            urgency: {
+                'count': len(latencies),
+                'ok': statuses.count(200),
+                'p50Ms': round(percentile(latencies, 0.5) * 1000, 1),
+                'p95Ms': round(percentile(latencies, 0.95) * 1000, 1),
+                'maxMs': round(max(latencies, default=0) * 1000, 1),
+            }
+            for urgency, (latencies, statuses) in results.items()
+        },
+        'jobCounts': progress['counts'],
+        'scheduler': limiter.get('scheduler'),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"batch job of {args.items} items: {report['jobCounts']}")
+    print('interactive probes (urgencyLevel: p50 / p95 / max ms, ok/count):')
+    for urgency, row in report['probes'].items():
+        print(f"  {urgency:<10} {row['p50Ms']:>8.1f} {row['p95Ms']:>8.1f} {row['maxMs']:>8.1f}   {row['ok']}/{row['count']}")
+    if report['scheduler']:
+        print(f"scheduler (capacity {report['scheduler']['capacity']}, batch {report['scheduler']['batchCapacity']}):")
+        for name, row in report['scheduler']['classes'].items():
+            print(f"  {name:<13} weight {row['weight']:>3}  granted {row['granted']:>5}  wait avg {row['waitMsAvg']:>8.1f} "
+                  f"p95 {row['waitMsP95']:>8.1f} ms  timed out {row['timedOut']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""The prompt builder as it was before the prompt registry, kept for benchmarks/bench_prompts.py.
+
+``get_enhanced_eia_prompts`` below is copied verbatim from src/routes/eia_docs.py
+in the baseline commit: all seven step prompts are f-strings built on every call
+and one is picked.
+"""
+from datetime import datetime
+
+
+def get_enhanced_eia_prompts(step_id, client_data):
+    """Get Enhanced EIA prompts for professional document generation"""
+    
+    # Extract client information with defaults
+    name = client_data.get('name', 'Michael Frame')
+    medicaid_id = client_data.get('medicaidId', '529614220')
+    date_of_birth = client_data.get('dateOfBirth', '[Protected Health Information]')
+    guardian = client_data.get('guardian', '[As documented in referral]')
+    placement = client_data.get('placement', '[Current placement facility]')
+    referral_source = client_data.get('referralSource', '[Verified referral source]')
+    service_requests = client_data.get('serviceRequests', 'Comprehensive behavioral health services')
+    urgency_level = client_data.get('urgencyLevel', 'standard')
+    
+    current_date = datetime.now().strftime('%B %d, %Y')
+    
+    prompts = {
+        'step1': {
+            'documentType': 'Referral Processing Report',
+            'prompt': f"""Generate a comprehensive, professional Referral Processing Report for the Behavioral Health Center at Cypress for client {name}.
+
+CLIENT INFORMATION:
+- Client Name: {name}
+- Medicaid ID: {medicaid_id}
+- Date of Birth: {date_of_birth}
+- Guardian/LAR: {guardian}
+- Current Placement: {placement}
+- Referral Source: {referral_source}
+- Service Requests: {service_requests}
+- Urgency Level: {urgency_level}
+- Report Date: {current_date}
+
+DOCUMENT REQUIREMENTS:
+Create a professional behavioral health document with the following sections:
+
+1. REFERRAL RECEIPT CONFIRMATION
+- Specific date and time of referral receipt
+- Referral source verification details
+- Initial contact documentation with {name}'s guardian/LAR
+- Urgency level assessment rationale
+
+2. ELIGIBILITY VERIFICATION RESULTS
+- Medicaid eligibility status for {name}
+- Service authorization requirements
+- Coverage verification details
+- Prior authorization status and timeline
+
+3. CONSENT DOCUMENTATION STATUS
+- Required consent forms identified
+- Guardian/LAR consent requirements for {name}
+- HIPAA authorization status
+- Treatment consent documentation
+
+4. SYSTEM REGISTRATION SUMMARY
+- Client registration in EHR system for {name}
+- Unique identifier assignment
+- Demographics verification
+- Insurance information entry
+
+5. NEXT STEPS AND TIMELINE
+- Immediate action items for {name}
+- Scheduled appointments
+- Documentation requirements
+- Follow-up responsibilities
+
+6. QUALITY CHECKPOINTS COMPLETED
+- Data accuracy verification for {name}
+- Completeness assessment
+- Compliance review status
+- Supervisor approval requirements
+
+7. COMPLIANCE VERIFICATION
+- Regulatory requirement adherence
+- State licensing compliance
+- Accreditation standards met
+- Risk management protocols
+
+FORMAT REQUIREMENTS:
+- Use professional clinical language appropriate for behavioral health
+- Include specific details about {name} throughout the document
+- Maintain regulatory compliance language
+- Include professional headers and certification sections
+- Use current date and time references
+- Include confidentiality notices and document identification"""
+        },
+        
+        'step2': {
+            'documentType': 'Service Engagement Plan',
+            'prompt': f"""Generate a comprehensive Service Engagement and Launch Plan for {name} at the Behavioral Health Center at Cypress.
+
+CLIENT: {name}
+MEDICAID ID: {medicaid_id}
+PLAN DATE: {current_date}
+
+Include detailed sections for:
+1. STAKEHOLDER COMMUNICATION PLAN - specific to {name}'s care team
+2. CLINICAL TEAM ASSIGNMENT DETAILS - staff assigned to {name}
+3. SERVICE INTEGRATION SCHEDULE - timeline for {name}'s services
+4. WELCOME PACKAGE CONTENTS - materials prepared for {name}
+5. COORDINATION AGREEMENTS - partnerships for {name}'s care
+6. STAFF CREDENTIALS VERIFICATION - qualifications for {name}'s team
+7. TIMELINE FOR SERVICE LAUNCH - milestones for {name}'s service initiation
+
+Use professional behavioral health language, include specific references to {name} throughout, and maintain regulatory compliance standards."""
+        },
+        
+        'step3': {
+            'documentType': 'Clinical Review & Risk Assessment',
+            'prompt': f"""Generate a comprehensive Clinical Review and Risk Profiling Report for {name} including:
+
+CLIENT: {name}
+ASSESSMENT DATE: {current_date}
+
+1. COMPREHENSIVE CLINICAL ASSESSMENT - detailed evaluation of {name}'s presenting concerns
+2. RISK FACTOR ANALYSIS - identification of risk factors specific to {name}
+3. SAFETY PLANNING - safety protocols developed for {name}
+4. MEDICAL COORDINATION - healthcare coordination for {name}
+5. HIGH-RISK FACTOR IDENTIFICATION - specific risks for {name}
+6. INTERVENTION RECOMMENDATIONS - treatment recommendations for {name}
+7. MONITORING REQUIREMENTS - ongoing monitoring plan for {name}
+
+Use clinical terminology appropriate for behavioral health, include evidence-based assessment protocols, and maintain professional documentation standards."""
+        },
+        
+        'step4': {
+            'documentType': 'CANS 3.0 Assessment Plan',
+            'prompt': f"""Generate a CANS 3.0 Assessment Administration Plan for {name} including:
+
+CLIENT: {name}
+ASSESSMENT PLAN DATE: {current_date}
+
+1. ASSESSMENT SCHEDULING - timeline for {name}'s CANS 3.0 assessment
+2. ASSESSOR QUALIFICATIONS - credentials of staff conducting {name}'s assessment
+3. DOMAIN COVERAGE PLAN - specific domains to be assessed for {name}
+4. COLLATERAL INFORMATION - sources of information for {name}'s assessment
+5. SCORING PROTOCOLS - methodology for {name}'s CANS scoring
+6. RESULTS INTEGRATION - how {name}'s results will inform treatment planning
+7. REASSESSMENT SCHEDULE - ongoing assessment timeline for {name}
+
+Include CANS 3.0 specific protocols and professional assessment standards."""
+        },
+        
+        'step5': {
+            'documentType': 'Service Delivery Activation Plan',
+            'prompt': f"""Generate a Service Delivery Activation Plan for {name} including:
+
+CLIENT: {name}
+ACTIVATION DATE: {current_date}
+
+1. INITIAL SESSION PLANNING - first sessions scheduled for {name}
+2. CRISIS PREVENTION PROTOCOLS - crisis prevention strategies for {name}
+3. SKILL BUILDING SCHEDULE - skills training plan for {name}
+4. FAMILY ENGAGEMENT - family involvement plan for {name}
+5. COMMUNITY INTEGRATION - community activities for {name}
+6. PROGRESS MONITORING - tracking progress for {name}
+7. SERVICE COORDINATION - coordinating services for {name}
+
+Use evidence-based practice language and include specific interventions for {name}."""
+        },
+        
+        'step6': {
+            'documentType': 'Documentation & QA Protocol',
+            'prompt': f"""Generate a Documentation and Quality Assurance Protocol for {name} including:
+
+CLIENT: {name}
+PROTOCOL DATE: {current_date}
+
+1. DOCUMENTATION STANDARDS - requirements for {name}'s clinical records
+2. QUALITY REVIEW SCHEDULE - QA timeline for {name}'s case
+3. COMPLIANCE MONITORING - regulatory compliance for {name}'s services
+4. SUPERVISOR OVERSIGHT - supervision plan for {name}'s case
+5. OUTCOME MEASUREMENT - outcome tracking for {name}
+6. CORRECTIVE ACTION PROTOCOLS - quality improvement for {name}'s care
+7. RECORD MANAGEMENT - record keeping standards for {name}
+
+Include regulatory compliance requirements and professional documentation standards."""
+        },
+        
+        'step7': {
+            'documentType': 'Risk Management & Safety Protocol',
+            'prompt': f"""Generate a Risk Management and Safety Protocol for {name} including:
+
+CLIENT: {name}
+PROTOCOL DATE: {current_date}
+
+1. SAFETY ASSESSMENT - comprehensive safety evaluation for {name}
+2. RISK MITIGATION STRATEGIES - specific risk reduction plans for {name}
+3. EMERGENCY PROCEDURES - crisis response protocols for {name}
+4. INCIDENT REPORTING - reporting procedures for {name}'s case
+5. SAFETY MONITORING - ongoing safety oversight for {name}
+6. CRISIS INTERVENTION - crisis response plan for {name}
+7. REGULATORY COMPLIANCE - safety compliance requirements for {name}
+
+Include evidence-based risk management practices and safety protocols specific to behavioral health."""
+        }
+    }
+    
+    return prompts.get(step_id, {
+        'documentType': 'Professional Documentation',
+        'prompt': f"""Generate professional behavioral health documentation for {name} at the Behavioral Health Center at Cypress, including comprehensive assessment, treatment planning, and service delivery components appropriate for regulatory compliance and clinical best practices."""
+    })
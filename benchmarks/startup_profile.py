@@ -0,0 +1,130 @@
+"""Cold-start profile: wall time of each startup phase and per-module import cost.
+
+Each run starts a fresh interpreter that imports ``src.main``, builds the
+app against a scratch database, runs ``migrate``, ``warm_up`` and
+``warm_up_process`` (unless ``--no-warmup``) and then sends two generation
+requests through the test client, so the first-request penalty shows as the
+difference between them. Phases are reported as the median over ``--runs``.
+``python -X importtime`` then attributes the import time of ``src.main``
+(plus what warm-up imports) to packages and modules.
+
+Without an upstream the requests use the template fallback; point
+``OPENAI_API_BASE`` at benchmarks/stub_openai.py to include the client:
+
+    python benchmarks/stub_openai.py --port 8100 --latency fixed:0.02 &
+    OPENAI_API_BASE=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub python benchmarks/startup_profile.py
+    python benchmarks/startup_profile.py --no-warmup --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, os, sys, tempfile, time
+started = time.perf_counter()
+from src.main import create_app
+from src.services.startup import startup
+timings = {'import': time.perf_counter() - started}
+scratch = tempfile.mkdtemp()
+app = create_app({
+    'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(scratch, 'startup.db')}",
+    'EIA_LIMITER_STATE_PATH': os.path.join(scratch, 'rate_limit.db'),
+    'EIA_WARMUP': int(sys.argv[1]),
+})
+startup.migrate(app)
+if startup.warmup_enabled:
+    startup.warm_up(app)
+    startup.warm_up_process(app)
+timings.update(startup.timings)
+timings['ready'] = time.perf_counter() - started
+client = app.test_client()
+for name in ('first_request', 'second_request'):
+    request_started = time.perf_counter()
+    response = client.post('/api/eia/generate-document', json={
+        'clientData': {'name': f'Startup {name}'}, 'stepId': 'step1', 'cache': 'bypass'
+    })
+    timings[name] = time.perf_counter() - request_started
+    timings['source'] = response.get_json().get('source')
+print(json.dumps(timings))
+'''
+
+
+def run_phases(warmup):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD, '1' if warmup else '0'], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - started
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_wall'] = wall
+    return timings
+
+
+def import_profile(warmup):
+    """``(package self-times, module cumulative times)`` in seconds from ``-X importtime``"""
+    code = 'import src.main'
+    if warmup:
+        code += '; from src.services.openai_pool import openai_pool; openai_pool.preload()'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    packages, modules = Counter(), {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        packages[name.split('.')[0]] += int(self_us) / 1e6
+        modules[name] = int(cumulative_us) / 1e6
+    return packages, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='packages and modules to list')
+    parser.add_argument('--no-warmup', action='store_true', help='skip warm_up (EIA_WARMUP=0)')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    warmup = not args.no_warmup
+
+    runs = [run_phases(warmup) for _ in range(args.runs)]
+    phases = {
+        name: round(statistics.median(run[name] for run in runs if name in run) * 1000, 1)
+        for name in runs[0] if name != 'source'
+    }
+    packages, modules = import_profile(warmup)
+    report = {
+        'warmup': warmup,
+        'runs': args.runs,
+        'source': runs[-1]['source'],
+        'phasesMs': phases,
+        'importMsByPackage': {name: round(seconds * 1000, 1) for name, seconds in packages.most_common(args.top)},
+        'importMsByModule': {
+            name: round(seconds * 1000, 1)
+            for name, seconds in sorted(modules.items(), key=lambda item: -item[1])[:args.top]
+        },
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"cold start, median of {args.runs} runs (warm-up {'on' if warmup else 'off'}, "
+          f"documents from {report['source']}):")
+    for name, ms in phases.items():
+        print(f'  {name:<18} {ms:>9.1f} ms')
+    print('import time by top-level package (self time):')
+    for name, ms in report['importMsByPackage'].items():
+        print(f'  {name:<40} {ms:>9.1f} ms')
+    print('slowest modules (cumulative):')
+    for name, ms in report['importMsByModule'].items():
+        print(f'  {name:<40} {ms:>9.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+"""Local OpenAI-compatible chat-completions stub for offline load tests.
+
+Serves POST /v1/chat/completions (plain and ``stream: true``) with
+configurable latency, output size, error and 429 injection, plus a
+requests-per-minute limit that answers 429 like the real API. GET /stats
+returns counters; POST /stats/reset clears them.
+
+    python benchmarks/stub_openai.py --port 8100 --latency lognormal:1.5,0.4 --error-rate 0.02
+    OPENAI_API_BASE=http://127.0.0.1:8100/v1 OPENAI_API_KEY=stub gunicorn -c gunicorn.conf.py
+
+Latency specs: ``fixed:S``, ``uniform:LO,HI``, ``normal:MEAN,SD``,
+``lognormal:MEDIAN,SIGMA`` and ``exponential:MEAN`` (seconds). For
+streaming the latency is the time to the first token; the rest arrives at
+``--tokens-per-second``.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    'client', 'assessment', 'behavioral', 'health', 'services', 'placement', 'guardian', 'treatment', 'plan',
+    'documentation', 'compliance', 'clinical', 'review', 'referral', 'intake', 'risk', 'safety', 'coordination',
+    'medicaid', 'authorization', 'progress', 'goals', 'objectives', 'interventions', 'family', 'support',
+    'evidence-based', 'quality', 'assurance', 'follow-up', 'provider', 'recommendation', 'the', 'and', 'of', 'with',
+)
+
+
+def parse_latency(spec):
+    kind, _, args = spec.partition(':')
+    values = [float(value) for value in args.split(',') if value]
+    samplers = {
+        'fixed': lambda: values[0],
+        'uniform': lambda: random.uniform(values[0], values[1]),
+        'normal': lambda: random.gauss(values[0], values[1]),
+        'lognormal': lambda: values[0] * math.exp(random.gauss(0, values[1])),
+        'exponential': lambda: random.expovariate(1 / values[0]),
+    }
+    if kind not in samplers:
+        raise argparse.ArgumentTypeError(f'unknown latency distribution {kind!r}')
+    return lambda: max(0.0, samplers[kind]())
+
+
+def parse_range(spec):
+    low, _, high = spec.partition(',')
+    return int(low), int(high or low)
+
+
+class StubState:
+    def __init__(self, options):
+        self.options = options
+        self.lock = threading.Lock()
+        self.window = []
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {'requests': 0, 'streamed': 0, 'ok': 0, 'errors': 0, 'rateLimited': 0, 'inFlight': 0,
+                             'maxInFlight': 0, 'completionTokens': 0}
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+            if name == 'inFlight':
+                self.counters['maxInFlight'] = max(self.counters['maxInFlight'], self.counters['inFlight'])
+
+    def over_rpm(self):
+        rpm = self.options.rpm
+        if not rpm:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            self.window = [at for at in self.window if at > now - 60]
+            if len(self.window) >= rpm:
+                return True
+            self.window.append(now)
+            return False
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            with self.state.lock:
+                return self._json(200, dict(self.state.counters))
+        if self.path.rstrip('/') in ('/v1/models', '/models'):
+            return self._json(200, {'object': 'list', 'data': [{'id': 'gpt-4o-mini', 'object': 'model'}]})
+        self._json(404, {'error': {'message': 'Not found'}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if self.path.rstrip('/') == '/stats/reset':
+            self.state.reset()
+            return self._json(200, {'reset': True})
+        if self.path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+            return self._json(404, {'error': {'message': 'Not found'}})
+
+        options = self.state.options
+        self.state.count('requests')
+        if self.state.over_rpm() or random.random() < options.rate_limit_rate:
+            self.state.count('rateLimited')
+            return self._json(429, {'error': {'message': 'Rate limit reached (stub)', 'type': 'requests',
+                                              'code': 'rate_limit_exceeded'}},
+                              {'Retry-After': str(options.retry_after)})
+
+        self.state.count('inFlight')
+        try:
+            time.sleep(options.latency())
+            if random.random() < options.error_rate:
+                self.state.count('errors')
+                return self._json(500, {'error': {'message': 'Injected upstream error (stub)', 'type': 'server_error'}})
+            low, high = options.output_tokens
+            tokens = min(random.randint(low, high), int(body.get('max_tokens') or high))
+            words = [random.choice(WORDS) for _ in range(tokens)]
+            self.state.count('completionTokens', tokens)
+            prompt_tokens = sum(len(str(message.get('content', ''))) for message in body.get('messages', [])) // 4
+            if body.get('stream'):
+                self.state.count('streamed')
+                include_usage = (body.get('stream_options') or {}).get('include_usage')
+                self._stream(body, words, prompt_tokens, include_usage)
+            else:
+                self._json(200, completion(body, ' '.join(words), prompt_tokens, tokens))
+            self.state.count('ok')
+        finally:
+            self.state.count('inFlight', -1)
+
+    def _stream(self, body, words, prompt_tokens, include_usage):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        completion_id = f'chatcmpl-{uuid.uuid4().hex[:24]}'
+        interval = 1 / self.state.options.tokens_per_second if self.state.options.tokens_per_second else 0
+        for index, word in enumerate(words):
+            self._chunk(chunk(completion_id, body, {'content': word if index == 0 else ' ' + word}))
+            if interval:
+                time.sleep(interval)
+        self._chunk(chunk(completion_id, body, {}, 'stop'))
+        if include_usage:
+            self._chunk({'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                         'model': body.get('model'), 'choices': [], 'usage': usage(prompt_tokens, len(words))})
+        self._write_chunk(b'data: [DONE]\n\n')
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+    def _chunk(self, payload):
+        self._write_chunk(f'data: {json.dumps(payload)}\n\n'.encode())
+
+    def _write_chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def _json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def usage(prompt_tokens, completion_tokens):
+    return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens}
+
+
+def completion(body, content, prompt_tokens, completion_tokens):
+    return {
+        'id': f'chatcmpl-{uuid.uuid4().hex[:24]}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': body.get('model'),
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+        'usage': usage(prompt_tokens, completion_tokens),
+    }
+
+
+def chunk(completion_id, body, delta, finish_reason=None):
+    return {
+        'id': completion_id,
+        'object': 'chat.completion.chunk',
+        'created': int(time.time()),
+        'model': body.get('model'),
+        'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--latency', type=parse_latency, default=parse_latency('lognormal:1.0,0.3'),
+                        help='latency distribution (default lognormal:1.0,0.3)')
+    parser.add_argument('--tokens-per-second', type=float, default=200,
+                        help='streaming speed after the first token (0: no delay)')
+    parser.add_argument('--output-tokens', type=parse_range, default=(400, 900), help='MIN,MAX words per completion')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of calls answered with HTTP 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction of calls answered with HTTP 429')
+    parser.add_argument('--rpm', type=int, default=0, help='answer 429 beyond this many requests per minute')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds on 429')
+    parser.add_argument('--seed', type=int)
+    options = parser.parse_args()
+    if options.seed is not None:
+        random.seed(options.seed)
+
+    StubHandler.state = StubState(options)
+    server = ThreadingHTTPServer((options.host, options.port), StubHandler)
+    server.daemon_threads = True
+    print(f'OpenAI stub listening on http://{options.host}:{options.port}/v1')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
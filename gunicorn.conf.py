@@ -0,0 +1,44 @@
+"""Gunicorn settings for production serving.
+
+    gunicorn -c gunicorn.conf.py
+
+The app is built once in the master (``preload_app``) so workers share its
+read-only memory copy-on-write. ``when_ready`` warms it up there too
+(compiled templates, the openai modules), before any worker accepts a
+connection; ``post_fork`` then gives each worker its own database and
+upstream connections and job workers. The schema is not created here: run
+``flask --app src.main migrate`` first (the Procfile's release phase).
+"""
+import multiprocessing
+import os
+
+wsgi_app = 'src.main:create_app()'
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Requests mostly wait on the upstream model, so each worker serves several
+# of them at once on threads
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# Long enough for an upstream call that uses all its retries
+# (EIA_UPSTREAM_READ_TIMEOUT x (1 + EIA_UPSTREAM_MAX_RETRIES))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 200))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+preload_app = True
+accesslog = '-'
+
+
+def when_ready(server):
+    from src.services.startup import startup
+
+    if startup.warmup_enabled:
+        startup.warm_up(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    from src.main import after_fork
+
+    after_fork(worker.app.wsgi())
@@ -0,0 +1,229 @@
+"""ASGI entry point: generation routes on asyncio, everything else on the Flask app.
+
+    flask --app src.main migrate
+    uvicorn src.asgi:app --host 0.0.0.0 --port 5000
+
+Under gunicorn's threaded workers each request that waits on the upstream
+model holds a thread, so a worker serves at most ``threads`` generations at
+once. Here ``POST /api/eia/generate-document`` (JSON and SSE),
+``/generate-document/stream`` and ``/generate-workflow`` run as coroutines on
+the shared ``AsyncOpenAI`` client (see ``src.routes.eia_docs_async``), so one
+process holds as many in-flight calls as the upstream limiter allows
+(``EIA_UPSTREAM_CONCURRENCY``) at the cost of a coroutine each. Requests
+using ``deadlineMs`` (or ``X-Deadline-Ms``) or ``sections``, and all other routes, are passed to the
+Flask app on a pool of ``ASGI_WSGI_THREADS`` threads. Cross-worker
+coalescing (``EIA_SINGLE_FLIGHT_SHARED``) only applies to the Flask routes.
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import anyio
+import anyio.from_thread
+import anyio.to_thread
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from src.main import create_app
+from src.routes import eia_docs_async
+from src.routes.jobs import job_runner
+from src.services.metrics import metrics
+from src.services.openai_pool import openai_pool
+from src.services.startup import startup
+
+# Threads running Flask routes, and blocking database work of the async routes
+WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 16))
+
+
+def accepts_event_stream(headers):
+    accept = parse_accept_header(headers.get('accept'), MIMEAccept)
+    return accept.best_match(['application/json', 'text/event-stream']) == 'text/event-stream'
+
+
+ROUTES = {
+    '/api/eia/generate-document':
+        lambda app, data, headers: eia_docs_async.generate_document(app, data, headers, accepts_event_stream(headers)),
+    '/api/eia/generate-document/stream': lambda app, data, headers: eia_docs_async.generate_document_stream(app, data),
+    '/api/eia/generate-workflow': lambda app, data, headers: eia_docs_async.generate_workflow(app, data),
+}
+
+
+class WSGIBridge:
+    """Serve a WSGI app from ASGI, one request per thread of a bounded pool.
+
+    The response body is sent as the app yields it, so streamed (SSE)
+    responses stream here too.
+    """
+
+    def __init__(self, wsgi_app, threads):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self._limiter = None
+
+    async def __call__(self, scope, body, send):
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.threads)
+        environ = self.environ(scope, body)
+        await anyio.to_thread.run_sync(self._run, environ, send, limiter=self._limiter)
+
+    def _run(self, environ, send):
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info is not None and response.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            return write
+
+        def write(chunk):
+            if not response.get('sent'):
+                response['sent'] = True
+                anyio.from_thread.run(send, {
+                    'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']
+                })
+            if chunk:
+                anyio.from_thread.run(send, {'type': 'http.response.body', 'body': chunk, 'more_body': True})
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            for chunk in result:
+                write(chunk)
+            write(b'')
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        anyio.from_thread.run(send, {'type': 'http.response.body', 'body': b''})
+
+    @staticmethod
+    def environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope['headers']:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                environ[name] = value
+                continue
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+
+
+class Application:
+    """The ASGI application: native async routes first, the WSGI bridge for the rest"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WSGIBridge(flask_app, WSGI_THREADS)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        body = await read_body(receive)
+        handler = ROUTES.get(scope['path']) if scope['method'] == 'POST' else None
+        if handler is not None:
+            headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+            try:
+                data = json.loads(body)
+            except ValueError:
+                data = None
+            if isinstance(data, dict):
+                timings = metrics.start_request_timings() if metrics.server_timing else None
+                try:
+                    response = await handler(self.flask_app, data, headers)
+                finally:
+                    server_timing = metrics.finish_request_timings(timings) if timings is not None else None
+                if response is not None:
+                    status, content, extra = response
+                    extra = dict(extra)
+                    if server_timing:
+                        extra['Server-Timing'] = server_timing
+                    if 'origin' in headers:
+                        # Same response headers flask-cors adds on the Flask routes
+                        extra['Access-Control-Allow-Origin'] = headers['origin']
+                        extra['Vary'] = 'Origin'
+                    await send_response(send, status, content, extra)
+                    return
+        await self.wsgi(scope, body, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                asyncio.get_running_loop().set_default_executor(
+                    ThreadPoolExecutor(max_workers=WSGI_THREADS, thread_name_prefix='eia-asgi')
+                )
+                # uvicorn only starts listening once startup completes
+                if startup.warmup_enabled:
+                    await anyio.to_thread.run_sync(startup.warm_up, self.flask_app)
+                    await anyio.to_thread.run_sync(startup.warm_up_process, self.flask_app)
+                job_runner.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await openai_pool.aclose()
+                await anyio.to_thread.run_sync(job_runner.stop)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def send_response(send, status, content, headers):
+    """Send a JSON response, or stream an async iterator of SSE messages"""
+    if hasattr(content, '__aiter__'):
+        await send({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+        try:
+            async for message in content:
+                await send({'type': 'http.response.body', 'body': message.encode('utf-8'), 'more_body': True})
+        finally:
+            await content.aclose()
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    body = content if isinstance(content, bytes) else json.dumps(content).encode('utf-8')
+    headers = {'Content-Type': 'application/json', 'Content-Length': str(len(body)), **headers}
+    await send({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def encode_headers(headers):
+    return [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in headers.items()]
+
+
+app = Application(create_app())
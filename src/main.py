@@ -1,49 +1,119 @@
 import os
 import sys
+import time
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
 from src.models.user import db
 from src.routes.user import user_bp
 from src.routes.eia_docs import eia_docs_bp
+from src.routes.clients import clients_bp
+from src.routes.documents import documents_bp
+from src.routes.jobs import jobs_bp, job_runner
+from src.services.circuit_breaker import upstream_breaker
+from src.services.client_context import client_contexts
+from src.services.database import database_tuning
+from src.services.doc_cache import document_cache
+from src.services.document_search import document_search
+from src.services.fallback_templates import fallback_registry
+from src.services.metrics import metrics
+from src.services.openai_pool import openai_pool
+from src.services.prompt_registry import prompt_registry
+from src.services.provisional import provisional_documents
+from src.services.rate_limiter import upstream_limiter
+from src.services.single_flight import single_flight
+from src.services.startup import startup
+from src.services.static_assets import static_manifest
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+STATIC_FOLDER = os.path.join(os.path.dirname(__file__), 'static')
 
-# Enable CORS for frontend-backend communication
-CORS(app)
 
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(eia_docs_bp, url_prefix='/api/eia')
+def create_app(config=None):
+    """Build and configure the application
 
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
+    ``config`` overrides the defaults before any extension reads them.
+    Building the app has no side effects beyond configuration: the schema
+    is created by ``flask --app src.main migrate`` (or here with
+    ``EIA_AUTO_MIGRATE``), templates load in ``startup.warm_up`` or on first
+    use, and the background job workers are not started: call
+    ``job_runner.start()`` in each serving process (see ``after_fork`` for
+    pre-forking servers).
+    """
+    started = time.perf_counter()
+    app = Flask(__name__, static_folder=STATIC_FOLDER)
+    app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+    # Maximum upstream calls in flight for a single /api/eia/generate-workflow request
+    app.config['EIA_WORKFLOW_CONCURRENCY'] = int(os.environ.get('EIA_WORKFLOW_CONCURRENCY', 4))
+    # Maximum upstream calls in flight for one document generated section by section
+    app.config['EIA_SECTION_CONCURRENCY'] = int(os.environ.get('EIA_SECTION_CONCURRENCY', 7))
+
+    # Enable CORS for frontend-backend communication
+    CORS(app)
+
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(eia_docs_bp, url_prefix='/api/eia')
+    app.register_blueprint(jobs_bp, url_prefix='/api/eia')
+    app.register_blueprint(documents_bp, url_prefix='/api/eia')
+    app.register_blueprint(clients_bp, url_prefix='/api/eia')
+
+    # uncomment if you need to use database
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config or {})
+    database_tuning.init_app(app)
+    db.init_app(app)
+    openai_pool.init_app(app)
+    upstream_breaker.init_app(app)
+    upstream_limiter.init_app(app)
+    single_flight.init_app(app)
+    document_cache.init_app(app)
+    client_contexts.init_app(app)
+    prompt_registry.init_app(app)
+    fallback_registry.init_app(app)
+    provisional_documents.init_app(app)
+    document_search.init_app(app)
+    job_runner.init_app(app)
+    metrics.init_app(app)
+    metrics.track_steps(prompt_registry)
+    static_manifest.init_app(app)
+    startup.init_app(app)
+    if app.config['EIA_AUTO_MIGRATE']:
+        startup.migrate(app)
+
+    app.add_url_rule('/', 'serve', serve, defaults={'path': ''})
+    app.add_url_rule('/<path:path>', 'serve', serve)
+    startup.record('create_app', started)
+    return app
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+def after_fork(app):
+    """Make a forked worker process safe to serve
+
+    Connections inherited from the parent are dropped without being closed
+    (the parent and its other children still use the sockets), then this
+    process opens its own (with ``EIA_WARMUP``) and starts its job workers.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    openai_pool.close()
+    if startup.warmup_enabled:
+        startup.warm_up_process(app)
+    job_runner.start()
+
+
+def serve(path):
+    return static_manifest.serve(path)
 
 
 if __name__ == '__main__':
+    # Development server; production runs gunicorn with gunicorn.conf.py
+    app = create_app()
+    startup.migrate(app)
+    startup.warm_up(app)
+    job_runner.start()
     # Railway provides PORT environment variable
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
-
@@ -0,0 +1,15 @@
+from datetime import datetime
+from src.models.user import db
+
+class CachedDocument(db.Model):
+    __tablename__ = 'cached_document'
+
+    key = db.Column(db.String(64), primary_key=True)
+    document_type = db.Column(db.String(120), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<CachedDocument {self.key[:12]}>'
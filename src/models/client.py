@@ -0,0 +1,62 @@
+from datetime import datetime
+from src.models.user import db
+
+class Client(db.Model):
+    """A client record, so generation requests can send ``clientId`` instead of ``clientData``"""
+    __tablename__ = 'client'
+    __table_args__ = (
+        db.Index('ix_client_medicaid_id', 'medicaid_id', unique=True),
+    )
+
+    # clientData field for each column; the Medicaid ID is required so every
+    # record has a stable document store key
+    FIELDS = {
+        'name': 'name',
+        'medicaidId': 'medicaid_id',
+        'dateOfBirth': 'date_of_birth',
+        'guardian': 'guardian',
+        'placement': 'placement',
+        'referralSource': 'referral_source',
+        'serviceRequests': 'service_requests',
+        'urgencyLevel': 'urgency_level'
+    }
+    REQUIRED_FIELDS = ('name', 'medicaidId')
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    medicaid_id = db.Column(db.String(32), nullable=False)
+    date_of_birth = db.Column(db.String(32))
+    guardian = db.Column(db.String(200))
+    placement = db.Column(db.String(200))
+    referral_source = db.Column(db.String(200))
+    service_requests = db.Column(db.Text)
+    urgency_level = db.Column(db.String(32))
+    # Incremented on every update; cached prompt contexts are checked against it
+    version = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __mapper_args__ = {'version_id_col': version}
+
+    def __repr__(self):
+        return f'<Client {self.id} {self.medicaid_id}>'
+
+    @property
+    def client_data(self):
+        """The record as a generation request's ``clientData`` (unset fields left out, so defaults apply)"""
+        data = {}
+        for field, column in self.FIELDS.items():
+            value = getattr(self, column)
+            if value is not None:
+                data[field] = value
+        return data
+
+    def to_dict(self):
+        return {
+            'clientId': self.id,
+            'clientKey': f'medicaid:{self.medicaid_id}',
+            'clientData': self.client_data,
+            'version': self.version,
+            'createdAt': self.created_at.isoformat(),
+            'updatedAt': self.updated_at.isoformat()
+        }
@@ -0,0 +1,117 @@
+import zlib
+from datetime import datetime
+from src.models.user import db
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+# Codec used for newly stored content; rows record their own encoding so
+# either can be read back
+DEFAULT_CONTENT_ENCODING = 'zstd' if zstandard is not None else 'zlib'
+
+def compress_content(text, encoding=DEFAULT_CONTENT_ENCODING):
+    data = text.encode('utf-8')
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    return zlib.compress(data, 6)
+
+def decompress_content(data, encoding):
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read zstd-compressed documents')
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    return zlib.decompress(data).decode('utf-8')
+
+class Document(db.Model):
+    __tablename__ = 'document'
+    __table_args__ = (
+        db.Index('ix_document_client_step_id', 'client_key', 'step_id', 'id'),
+        db.Index('ix_document_client_id', 'client_key', 'id'),
+        db.Index('ix_document_step_id', 'step_id', 'id'),
+    )
+
+    # Columns returned by listings; content_data stays on disk until asked for
+    LISTING_COLUMNS = ('id', 'client_key', 'client_name', 'step_id', 'document_type', 'prompt_version',
+                       'model', 'source', 'status', 'content_size', 'prompt_ms', 'generation_ms',
+                       'total_ms', 'created_at', 'updated_at')
+
+    id = db.Column(db.Integer, primary_key=True)
+    client_key = db.Column(db.String(120), nullable=False)
+    client_name = db.Column(db.String(200), nullable=False)
+    step_id = db.Column(db.String(32), nullable=False)
+    document_type = db.Column(db.String(120), nullable=False)
+    prompt_version = db.Column(db.String(32))
+    model = db.Column(db.String(64))
+    source = db.Column(db.String(16), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='final')
+    content_encoding = db.Column(db.String(8), nullable=False)
+    content_size = db.Column(db.Integer, nullable=False)
+    content_data = db.deferred(db.Column(db.LargeBinary, nullable=False))
+    prompt_ms = db.Column(db.Float)
+    generation_ms = db.Column(db.Float)
+    total_ms = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Document {self.id} {self.step_id}>'
+
+    @property
+    def content(self):
+        return decompress_content(self.content_data, self.content_encoding)
+
+    @content.setter
+    def content(self, text):
+        self.content_encoding = DEFAULT_CONTENT_ENCODING
+        self.content_data = compress_content(text, self.content_encoding)
+        self.content_size = len(text)
+
+    def to_dict(self, include_content=False):
+        data = {
+            'documentId': self.id,
+            'clientKey': self.client_key,
+            'clientName': self.client_name,
+            'stepId': self.step_id,
+            'documentType': self.document_type,
+            'promptVersion': self.prompt_version,
+            'model': self.model,
+            'source': self.source,
+            'status': self.status,
+            'provisional': self.status == 'provisional',
+            'contentSize': self.content_size,
+            'timings': {
+                'promptMs': self.prompt_ms,
+                'generationMs': self.generation_ms,
+                'totalMs': self.total_ms
+            },
+            'createdAt': self.created_at.isoformat(),
+            'updatedAt': self.updated_at.isoformat()
+        }
+        if include_content:
+            data['content'] = self.content
+        return data
+
+class DocumentSection(db.Model):
+    """Generated text of one numbered section, reused while its prompt is unchanged.
+
+    ``fingerprint`` hashes the section prompt and model parameters, and the
+    prompt holds only the client fields the section depends on, so a client
+    whose other fields changed gets the stored text back.
+    """
+    __tablename__ = 'document_section'
+    __table_args__ = (
+        db.Index('ix_document_section_client_step_fingerprint', 'client_key', 'step_id', 'fingerprint', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    client_key = db.Column(db.String(120), nullable=False)
+    step_id = db.Column(db.String(32), nullable=False)
+    number = db.Column(db.Integer, nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DocumentSection {self.step_id}#{self.number}>'
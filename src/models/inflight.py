@@ -0,0 +1,29 @@
+from datetime import datetime
+from src.models.user import db
+
+class InflightGeneration(db.Model):
+    """One upstream call claimed by a worker process, and its outcome.
+
+    Rows are written by ``SingleFlight`` when cross-worker coalescing is on;
+    other workers wait on a key's ``running`` row instead of calling
+    upstream themselves and read ``content`` (or ``error``) once it
+    finishes. At most one row per key is ``running``.
+    """
+    __tablename__ = 'inflight_generation'
+    __table_args__ = (
+        db.Index('ix_inflight_generation_running_key', 'key', unique=True, sqlite_where=db.text("status = 'running'")),
+    )
+
+    token = db.Column(db.String(32), primary_key=True)
+    key = db.Column(db.String(64), nullable=False)
+    owner_pid = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='running')
+    content = db.Column(db.Text)
+    error = db.Column(db.Text)
+    error_status = db.Column(db.Integer)
+    retry_after = db.Column(db.Integer)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<InflightGeneration {self.key[:12]} {self.status}>'
@@ -0,0 +1,87 @@
+import json
+import uuid
+from datetime import datetime
+from src.models.user import db
+
+class GenerationJob(db.Model):
+    __tablename__ = 'generation_job'
+
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    total_items = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    cancelled_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<GenerationJob {self.id}>'
+
+    def to_dict(self, counts=None):
+        counts = counts or {}
+        pending = counts.get('pending', 0)
+        running = counts.get('running', 0)
+        done = counts.get('succeeded', 0) + counts.get('failed', 0)
+        if self.cancelled_at is not None:
+            status = 'cancelled'
+        elif pending == 0 and running == 0:
+            status = 'completed'
+        elif running or done:
+            status = 'running'
+        else:
+            status = 'queued'
+        return {
+            'id': self.id,
+            'status': status,
+            'totalItems': self.total_items,
+            'counts': {state: counts.get(state, 0) for state in GenerationJobItem.STATES},
+            'createdAt': self.created_at.isoformat(),
+            'cancelledAt': self.cancelled_at.isoformat() if self.cancelled_at else None
+        }
+
+class GenerationJobItem(db.Model):
+    __tablename__ = 'generation_job_item'
+    __table_args__ = (
+        db.Index('ix_generation_job_item_job_id_id', 'job_id', 'id'),
+        db.Index('ix_generation_job_item_status_id', 'status', 'id'),
+    )
+
+    STATES = ('pending', 'running', 'succeeded', 'failed', 'cancelled')
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(32), db.ForeignKey('generation_job.id'), nullable=False)
+    step_id = db.Column(db.String(32), nullable=False)
+    client_name = db.Column(db.String(200), nullable=False)
+    client_data = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    claimed_by = db.Column(db.String(64))
+    claimed_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    source = db.Column(db.String(16))
+    document_type = db.Column(db.String(120))
+    document_id = db.Column(db.Integer, db.ForeignKey('document.id'))
+    error = db.Column(db.Text)
+
+    document = db.relationship('Document', lazy='select')
+
+    def __repr__(self):
+        return f'<GenerationJobItem {self.job_id}:{self.id}>'
+
+    def get_client_data(self):
+        return json.loads(self.client_data)
+
+    def to_dict(self, include_content=False):
+        data = {
+            'id': self.id,
+            'jobId': self.job_id,
+            'stepId': self.step_id,
+            'clientName': self.client_name,
+            'status': self.status,
+            'attempts': self.attempts,
+            'source': self.source,
+            'documentType': self.document_type,
+            'documentId': self.document_id,
+            'error': self.error,
+            'finishedAt': self.finished_at.isoformat() if self.finished_at else None
+        }
+        if include_content:
+            data['content'] = self.document.content if self.document is not None else None
+        return data
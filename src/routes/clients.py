@@ -0,0 +1,107 @@
+from flask import Blueprint, jsonify, request
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from src.models.client import Client
+from src.models.user import db
+from src.services.client_context import client_contexts
+
+clients_bp = Blueprint('clients', __name__)
+
+MAX_PAGE_SIZE = 200
+
+@clients_bp.route('/clients', methods=['POST'])
+def create_client():
+    """Store a client; generation requests can then send its ``clientId`` instead of ``clientData``
+
+    The body holds the ``clientData`` fields; ``name`` and ``medicaidId`` are
+    required and a Medicaid ID may belong to one client only.
+    """
+    values, error = client_values(request.get_json(silent=True), partial=False)
+    if error:
+        return jsonify({'error': error}), 400
+    client = Client(**values)
+    db.session.add(client)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'A client with this Medicaid ID already exists'}), 409
+    return jsonify(client.to_dict()), 201
+
+@clients_bp.route('/clients', methods=['GET'])
+def list_clients():
+    """Page through clients ordered by ID (``after`` is the last ID seen), or look one up by ``medicaidId``"""
+    medicaid_id = request.args.get('medicaidId')
+    if medicaid_id:
+        client = db.session.execute(select(Client).where(Client.medicaid_id == medicaid_id.strip())).scalar()
+        return jsonify({'clients': [client.to_dict()] if client else [], 'nextAfter': None})
+
+    limit = max(1, min(request.args.get('limit', 50, type=int), MAX_PAGE_SIZE))
+    after = request.args.get('after', 0, type=int)
+    clients = db.session.execute(
+        select(Client).where(Client.id > after).order_by(Client.id).limit(limit)
+    ).scalars().all()
+    return jsonify({
+        'clients': [client.to_dict() for client in clients],
+        'nextAfter': clients[-1].id if len(clients) == limit else None
+    })
+
+@clients_bp.route('/clients/<int:client_id>', methods=['GET'])
+def get_client(client_id):
+    return jsonify(db.get_or_404(Client, client_id).to_dict())
+
+@clients_bp.route('/clients/<int:client_id>', methods=['PATCH'])
+def update_client(client_id):
+    """Update some of a client's fields (``null`` clears an optional one)
+
+    Bumps the client's ``version``, so cached prompt contexts are rebuilt in
+    every worker. With ``version`` in the body the update only applies if the
+    client is still at that version (409 otherwise).
+    """
+    client = db.get_or_404(Client, client_id)
+    data = request.get_json(silent=True)
+    values, error = client_values(data, partial=True)
+    if error:
+        return jsonify({'error': error}), 400
+    if 'version' in data and data['version'] != client.version:
+        return jsonify({'error': 'Client was updated by another request', 'version': client.version}), 409
+    for column, value in values.items():
+        setattr(client, column, value)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'A client with this Medicaid ID already exists'}), 409
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Client was updated by another request'}), 409
+    finally:
+        client_contexts.invalidate(client_id)
+    return jsonify(client.to_dict())
+
+@clients_bp.route('/clients/context-cache', methods=['GET'])
+def client_context_stats():
+    return jsonify(client_contexts.stats())
+
+def client_values(data, partial):
+    """``(column values, error)`` for a client body; ``partial`` allows leaving fields out"""
+    if not isinstance(data, dict):
+        return None, 'A JSON object with client fields is required'
+    unknown = [field for field in data if field not in Client.FIELDS and field != 'version']
+    if unknown:
+        return None, f"Unknown fields: {', '.join(unknown)}"
+    values = {}
+    for field, column in Client.FIELDS.items():
+        if field not in data:
+            if not partial and field in Client.REQUIRED_FIELDS:
+                return None, f'{field} is required'
+            continue
+        value = data[field]
+        if value is not None and not isinstance(value, str):
+            return None, f'{field} must be a string'
+        value = value.strip() if value is not None else None
+        if not value and field in Client.REQUIRED_FIELDS:
+            return None, f'{field} is required'
+        values[column] = value or None
+    return values, None
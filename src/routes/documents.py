@@ -0,0 +1,315 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy import func, select
+from src.models.document import Document, decompress_content
+from src.models.user import db
+from src.routes.eia_docs import (WORKFLOW_STEPS, format_sse, generate_step_document,
+                                 generate_template_step_document)
+from src.services.client_context import client_contexts
+from src.services.doc_cache import CACHE_MODES
+from src.services.document_search import SearchQueryError, document_search
+from src.services.document_store import client_key_for
+from src.services.packet_export import EXPORT_FORMATS, PacketWriter
+from src.services.provisional import provisional_documents
+from src.services.scheduler import batch_origin
+
+documents_bp = Blueprint('documents', __name__)
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 200
+MAX_SEARCH_RESULTS = 100
+MAX_EXPORT_CLIENTS = 2000
+
+# Clients whose stored documents are loaded (and missing ones generated) at a time
+EXPORT_BATCH_CLIENTS = 25
+
+@documents_bp.route('/documents', methods=['GET'])
+def list_documents():
+    """Page through stored documents, newest first (``before`` is the last ID seen)
+
+    Optional filters: ``clientKey``, ``stepId``, ``source`` and ``status``.
+    Listings never load document content.
+    """
+    limit = max(1, min(request.args.get('limit', 50, type=int), MAX_PAGE_SIZE))
+    before = request.args.get('before', type=int)
+
+    query = select(Document).order_by(Document.id.desc()).limit(limit)
+    if before is not None:
+        query = query.where(Document.id < before)
+    for param, column in (('clientKey', Document.client_key), ('stepId', Document.step_id),
+                          ('source', Document.source), ('status', Document.status)):
+        value = request.args.get(param)
+        if value:
+            query = query.where(column == value)
+
+    documents = db.session.execute(query).scalars().all()
+    return jsonify({
+        'documents': [document.to_dict() for document in documents],
+        'nextBefore': documents[-1].id if len(documents) == limit else None
+    })
+
+@documents_bp.route('/documents/latest', methods=['GET'])
+def latest_documents():
+    """Latest stored document for each step of one client (``clientKey`` required)"""
+    client_key = request.args.get('clientKey')
+    if not client_key:
+        return jsonify({'error': 'clientKey is required'}), 400
+    include_content = request.args.get('includeContent', 'false').lower() == 'true'
+
+    latest_ids = (
+        select(func.max(Document.id))
+        .where(Document.client_key == client_key)
+        .group_by(Document.step_id)
+    )
+    query = select(Document).where(Document.id.in_(latest_ids)).order_by(Document.step_id)
+    if include_content:
+        query = query.options(db.undefer(Document.content_data))
+
+    documents = db.session.execute(query).scalars().all()
+    return jsonify({
+        'clientKey': client_key,
+        'documents': [document.to_dict(include_content) for document in documents]
+    })
+
+@documents_bp.route('/documents/search', methods=['GET'])
+def search_documents():
+    """Full-text search over stored documents, best match first
+
+    ``q`` is matched word by word (``syntax=fts`` passes it to FTS5 as-is).
+    Optional filters: ``stepId``, ``documentType`` and a ``from``/``to``
+    creation date range (ISO dates; a bare ``to`` date includes that day).
+    """
+    query_text = request.args.get('q', '').strip()
+    if not query_text:
+        return jsonify({'error': 'q is required'}), 400
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_SEARCH_RESULTS))
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    try:
+        created_from = parse_date_arg('from')
+        created_to = parse_date_arg('to', end_of_day=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        rows = document_search.search(
+            query_text,
+            step_id=request.args.get('stepId'),
+            document_type=request.args.get('documentType'),
+            created_from=created_from,
+            created_to=created_to,
+            limit=limit,
+            offset=offset,
+            syntax=request.args.get('syntax', 'plain')
+        )
+    except SearchQueryError as e:
+        return jsonify({'error': f'Invalid search query: {str(e)}'}), 400
+
+    results = []
+    for document, snippet, score in rows:
+        result = document.to_dict()
+        result['snippet'] = snippet
+        result['score'] = round(-score, 4)
+        results.append(result)
+    return jsonify({
+        'query': query_text,
+        'results': results,
+        'nextOffset': offset + limit if len(results) == limit else None
+    })
+
+def parse_date_arg(name, end_of_day=False):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO date or datetime')
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+@documents_bp.route('/documents/<int:document_id>', methods=['GET'])
+def get_document(document_id):
+    """Fetch one stored document with its content"""
+    document = db.get_or_404(Document, document_id, options=[db.undefer(Document.content_data)])
+    return jsonify(document.to_dict(include_content=True))
+
+@documents_bp.route('/documents/<int:document_id>/events', methods=['GET'])
+def subscribe_document(document_id):
+    """Server-Sent Events stream that sends the document once it is final
+
+    Waits up to ``timeout`` seconds (default 60, query parameter) for a
+    provisional document to be upgraded and always finishes with one
+    ``document`` event carrying the latest state.
+    """
+    db.get_or_404(Document, document_id)
+    timeout = min(request.args.get('timeout', 60, type=float), 300)
+
+    def events():
+        document = provisional_documents.wait(document_id, timeout)
+        if document is None:
+            yield format_sse('error', {'error': 'Document not found'})
+            return
+        yield format_sse('document', document.to_dict(include_content=True))
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@documents_bp.route('/documents/export', methods=['GET', 'POST'])
+def export_documents():
+    """Stream a ZIP packet with the latest document of each requested step per client
+
+    GET takes repeated ``clientKey`` and ``stepId`` parameters and exports
+    stored documents only. POST takes ``clientKeys``, ``clientIds`` (stored
+    clients) and/or ``clients`` (``clientData`` objects); with
+    ``generateMissing`` (the default) steps that a stored client or a
+    ``clients`` entry has no document for are generated, at most
+    ``concurrency`` at a time (capped by ``EIA_WORKFLOW_CONCURRENCY``).
+    ``stepIds`` defaults to all seven steps and ``format`` is ``text``,
+    ``pdf`` or ``docx``. The packet ends with ``manifest.csv``, which also
+    lists requested documents that were neither stored nor generated.
+    Clients are read and written a batch at a time, so memory use does not
+    grow with the size of the packet.
+    """
+    if request.method == 'GET':
+        data = {
+            'clientKeys': request.args.getlist('clientKey'),
+            'stepIds': request.args.getlist('stepId'),
+            'format': request.args.get('format', 'text'),
+            'generateMissing': False
+        }
+    else:
+        data = request.get_json(silent=True) or {}
+
+    clients = {}
+    for client_key in data.get('clientKeys') or []:
+        if not isinstance(client_key, str) or not client_key:
+            return jsonify({'error': 'clientKeys must be a list of client keys'}), 400
+        clients[client_key] = None
+    for client_data in data.get('clients') or []:
+        if not isinstance(client_data, dict) or not client_data.get('name'):
+            return jsonify({'error': 'Client name is required for every client'}), 400
+        clients[client_key_for(client_data)] = client_data
+    for client_id in data.get('clientIds') or []:
+        client_data = client_contexts.get(client_id)
+        if client_data is None:
+            return jsonify({'error': f'Client {client_id} not found'}), 404
+        clients[client_key_for(client_data)] = client_data
+
+    if not clients:
+        return jsonify({'error': 'At least one client key or client is required'}), 400
+    if len(clients) > MAX_EXPORT_CLIENTS:
+        return jsonify({'error': f'An export may contain at most {MAX_EXPORT_CLIENTS} clients'}), 400
+
+    step_ids = data.get('stepIds') or list(WORKFLOW_STEPS)
+    if not isinstance(step_ids, list) or not all(isinstance(step_id, str) and step_id for step_id in step_ids):
+        return jsonify({'error': 'stepIds must be a list of step IDs'}), 400
+    step_ids = list(dict.fromkeys(step_ids))
+
+    export_format = data.get('format', 'text')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+
+    max_concurrency = current_app.config.get('EIA_WORKFLOW_CONCURRENCY', 4)
+    try:
+        concurrency = max(1, min(int(data.get('concurrency', max_concurrency)), max_concurrency))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'concurrency must be an integer'}), 400
+
+    cache_mode = data.get('cache', 'use')
+    if cache_mode not in CACHE_MODES:
+        return jsonify({'error': f"cache must be one of {', '.join(CACHE_MODES)}"}), 400
+
+    generate_missing = bool(data.get('generateMissing', True))
+    app = current_app._get_current_object()
+
+    def packet():
+        writer = PacketWriter(export_format)
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='eia-export')
+        try:
+            items = list(clients.items())
+            for start in range(0, len(items), EXPORT_BATCH_CLIENTS):
+                batch = items[start:start + EXPORT_BATCH_CLIENTS]
+                stored = latest_packet_documents([client_key for client_key, _ in batch], step_ids)
+                missing = []
+                for client_key, client_data in batch:
+                    for step_id in step_ids:
+                        row = stored.pop((client_key, step_id), None)
+                        if row is not None:
+                            yield writer.add(stored_packet_entry(row), decompress_content(row.content_data,
+                                                                                          row.content_encoding))
+                        elif client_data is not None and generate_missing:
+                            missing.append((client_key, client_data, step_id))
+                        else:
+                            writer.record({'clientKey': client_key, 'stepId': step_id, 'origin': 'missing',
+                                           'clientName': (client_data or {}).get('name', '')})
+                futures = [
+                    executor.submit(generate_packet_document, app, client_key, client_data, step_id, cache_mode)
+                    for client_key, client_data, step_id in missing
+                ]
+                for future in as_completed(futures):
+                    entry, content = future.result()
+                    yield writer.add(entry, content)
+            yield writer.close()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    filename = f"eia-packet-{datetime.now().strftime('%Y%m%d-%H%M%S')}.zip"
+    return Response(stream_with_context(packet()), mimetype='application/zip', headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def latest_packet_documents(client_keys, step_ids):
+    """Latest stored document row per ``(client_key, step_id)``, content included"""
+    latest_ids = (
+        select(func.max(Document.id))
+        .where(Document.client_key.in_(client_keys), Document.step_id.in_(step_ids))
+        .group_by(Document.client_key, Document.step_id)
+    )
+    rows = db.session.execute(
+        select(Document.id, Document.client_key, Document.client_name, Document.step_id, Document.document_type,
+               Document.source, Document.status, Document.created_at, Document.content_encoding,
+               Document.content_data)
+        .where(Document.id.in_(latest_ids))
+    )
+    return {(row.client_key, row.step_id): row for row in rows}
+
+def stored_packet_entry(row):
+    return {
+        'clientKey': row.client_key,
+        'clientName': row.client_name,
+        'stepId': row.step_id,
+        'documentType': row.document_type,
+        'source': row.source,
+        'status': row.status,
+        'documentId': row.id,
+        'origin': 'stored',
+        'createdAt': row.created_at.isoformat()
+    }
+
+def generate_packet_document(app, client_key, client_data, step_id, cache_mode):
+    """Generate (and store) a document missing from a packet as batch work; returns ``(entry, content)``"""
+    with app.app_context(), batch_origin():
+        try:
+            document = generate_step_document(step_id, client_data, cache_mode)
+        except Exception:
+            logger.exception('Generating packet document %s for %s failed', step_id, client_key)
+            document = generate_template_step_document(step_id, client_data)
+    return {
+        'clientKey': client_key,
+        'clientName': document['clientName'],
+        'stepId': step_id,
+        'documentType': document['documentType'],
+        'source': document['source'],
+        'status': 'final',
+        'documentId': document.get('documentId') or '',
+        'origin': 'generated',
+        'createdAt': document['timestamp']
+    }, document['content']
@@ -1,67 +1,37 @@
-from flask import Blueprint, request, jsonify
-import os
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
 from datetime import datetime
+import contextvars
+import json
+import logging
+import time
+from src.services.circuit_breaker import CircuitOpenError, upstream_breaker
+from src.services.client_context import client_contexts, normalize_client_context
+from src.services.doc_cache import CACHE_MODES, cache_key, document_cache, prompt_key
+from src.services.document_store import client_key_for, load_sections, save_document, save_sections
+from src.services.fallback_templates import iter_fallback_document, render_fallback_document
+from src.services.metrics import metrics
+from src.services.openai_pool import is_rate_limited, openai_pool
+from src.services.prompt_registry import prompt_date, prompt_registry
+from src.services.provisional import provisional_documents
+from src.services.rate_limiter import UpstreamBusyError, upstream_limiter
+from src.services.scheduler import prioritized, priority_class
+from src.services.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
 
 eia_docs_bp = Blueprint('eia_docs', __name__)
 
-@eia_docs_bp.route('/generate-document', methods=['POST'])
-def generate_document():
-    """Generate documentation using Enhanced GPT-Powered Prompts"""
-    try:
-        data = request.get_json()
-        
-        # Extract client data and step information
-        client_data = data.get('clientData', {})
-        step_id = data.get('stepId', '')
-        
-        # Validate required data
-        if not client_data.get('name'):
-            return jsonify({'error': 'Client name is required'}), 400
-        
-        if not step_id:
-            return jsonify({'error': 'Step ID is required'}), 400
-        
-        # Generate the document using Enhanced GPT-Powered system
-        prompt_data = get_enhanced_eia_prompts(step_id, client_data)
-        
-        # Use Enhanced GPT-Powered generation
-        generated_content = generate_with_enhanced_gpt(prompt_data['prompt'])
-        
-        # Return the generated document
-        return jsonify({
-            'success': True,
-            'content': generated_content,
-            'documentType': prompt_data['documentType'],
-            'timestamp': datetime.now().isoformat(),
-            'stepId': step_id,
-            'clientName': client_data.get('name', '')
-        })
-        
-    except Exception as e:
-        print(f"Error generating document: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': f'Failed to generate document: {str(e)}'
-        }), 500
+MODEL = 'gpt-4o-mini'
+MAX_TOKENS = 3000
+TEMPERATURE = 0.2
+# Output budget of one section when a document is generated section by section
+SECTION_MAX_TOKENS = 700
 
-def generate_with_enhanced_gpt(prompt):
-    """Generate content using Enhanced GPT-Powered system with professional prompts"""
-    try:
-        # Import the GPT-Powered system
-        import openai
-        
-        # Use environment variables that are pre-configured in the system
-        client = openai.OpenAI(
-            api_key=os.environ.get('OPENAI_API_KEY'),
-            base_url=os.environ.get('OPENAI_API_BASE')
-        )
-        
-        response = client.chat.completions.create(
-            model='gpt-4o-mini',
-            messages=[
-                {
-                    'role': 'system',
-                    'content': '''You are a professional EIA (Enhanced Intelligence Assistant) for the Behavioral Health Center at Cypress, specializing in generating high-quality, regulatory-compliant documentation for behavioral health services.
+# Steps generated by /generate-workflow when no stepIds are given
+WORKFLOW_STEPS = ('step1', 'step2', 'step3', 'step4', 'step5', 'step6', 'step7')
+
+SYSTEM_PROMPT = '''You are a professional EIA (Enhanced Intelligence Assistant) for the Behavioral Health Center at Cypress, specializing in generating high-quality, regulatory-compliant documentation for behavioral health services.
 
 PROFESSIONAL STANDARDS:
 - Use appropriate clinical and behavioral health terminology
@@ -88,540 +58,683 @@ PERSONALIZATION:
 - Maintain individual focus while following templates
 
 Generate comprehensive, professional documentation that meets all regulatory standards and provides meaningful, actionable content for behavioral health service delivery.'''
-                },
-                {
-                    'role': 'user',
-                    'content': prompt
-                }
-            ],
-            max_tokens=3000,
-            temperature=0.2
-        )
+
+@eia_docs_bp.route('/generate-document', methods=['POST'])
+def generate_document():
+    """Generate documentation using Enhanced GPT-Powered Prompts"""
+    if request.accept_mimetypes.best_match(['application/json', 'text/event-stream']) == 'text/event-stream':
+        return generate_document_stream()
+    try:
+        data = request.get_json()
         
-        return response.choices[0].message.content
+        # Extract client data and step information
+        client_data = request_client_data(data)
+        step_id = data.get('stepId', '')
+        cache_mode = data.get('cache', 'use')
+        
+        # Validate required data
+        if client_data is None:
+            return jsonify({'error': 'Client not found'}), 404
+        error = generation_request_error(data, client_data)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        # Optional latency budget: answer with the template if upstream is slower
+        deadline_ms = requested_deadline(data, request.headers)
+        if data.get('sections'):
+            if deadline_ms is not None:
+                return jsonify({'error': 'deadlineMs is not supported with sections'}), 400
+            document = generate_sectioned_document(step_id, client_data, cache_mode)
+            with metrics.timed('serialize', step_id=step_id, model=MODEL):
+                return jsonify(document)
+        if deadline_ms is not None:
+            try:
+                deadline_ms = float(deadline_ms)
+            except (TypeError, ValueError):
+                deadline_ms = -1
+            if deadline_ms <= 0:
+                return jsonify({'error': 'deadlineMs must be a positive number'}), 400
+            return jsonify(generate_step_document_within(step_id, client_data, deadline_ms / 1000, cache_mode))
         
+        # Generate the document using Enhanced GPT-Powered system
+        document = generate_step_document(step_id, client_data, cache_mode)
+        with metrics.timed('serialize', step_id=step_id, model=MODEL):
+            return jsonify(document)
+        
+    except UpstreamBusyError as e:
+        return upstream_busy_response(e)
     except Exception as e:
-        # Enhanced fallback with professional templates
-        print(f"Enhanced GPT system not available, using professional template: {str(e)}")
-        return generate_enhanced_template_document(prompt)
-
-def generate_enhanced_template_document(prompt):
-    """Enhanced fallback template-based document generation with professional content"""
-    
-    current_date = datetime.now().strftime('%B %d, %Y')
-    current_time = datetime.now().strftime('%I:%M %p')
-    
-    # Extract client name from prompt
-    client_name = "Michael Frame"
-    if "Client Name:" in prompt:
-        try:
-            client_name = prompt.split("Client Name:")[1].split("\n")[0].strip()
-        except:
-            client_name = "Michael Frame"
-    
-    if "Referral Processing Report" in prompt:
-        return f"""BEHAVIORAL HEALTH CENTER AT CYPRESS
-REFERRAL PROCESSING REPORT
-
-═══════════════════════════════════════════════════════════════════
-
-CLIENT INFORMATION:
-Name: {client_name}
-Medicaid ID: 529614220
-Date of Birth: [Protected Health Information]
-Guardian/LAR: [As documented in referral]
-Current Placement: [As specified in referral documentation]
-Referral Source: [Verified referral source]
-Service Requests: Comprehensive behavioral health services
-Urgency Level: Standard processing
-Report Date: {current_date}
-Report Time: {current_time}
-
-═══════════════════════════════════════════════════════════════════
-
-1. REFERRAL RECEIPT CONFIRMATION
-
-Date and Time of Referral Receipt: {current_date} at {current_time}
-
-Referral Source Verification: The referral for {client_name} was received from the identified source and has been verified through direct communication and comprehensive documentation review. All referral documentation has been authenticated to ensure appropriateness and accuracy of the service request.
-
-Initial Contact Documentation: Initial contact with {client_name}'s guardian/LAR was successfully established on {current_date}. Detailed communication notes have been recorded in the client record, including explanation of the referral process, available service options, and next steps in the intake procedure.
-
-Urgency Level Assessment: Based on comprehensive clinical review of referral details and presenting concerns, the urgency level has been assessed as standard processing. This indicates routine processing procedures without immediate crisis intervention requirements, allowing for thorough assessment and planning.
-
-2. ELIGIBILITY VERIFICATION RESULTS
-
-Medicaid Eligibility Status: {client_name}'s Medicaid eligibility has been confirmed through direct query of the state Medicaid database on {current_date}. Active coverage has been verified with current benefits in good standing.
-
-Service Authorization Requirements: The behavioral health services requested for {client_name} require prior authorization per current Medicaid policy guidelines. Authorization procedures have been initiated in accordance with established protocols and timelines.
-
-Coverage Verification Details: Comprehensive review of coverage parameters has been completed, including service limits, provider network status, and benefit utilization. All findings have been documented to ensure compliant service provision.
-
-Prior Authorization Status: Prior authorization request for {client_name} was submitted on {current_date}. Authorization is pending approval with expected response within standard processing timeframe of 5-7 business days.
-
-3. CONSENT DOCUMENTATION STATUS
-
-Required Consent Forms Identified: The following consent forms have been identified as necessary for service initiation: Consent for Treatment, Release of Information, HIPAA Authorization, and Emergency Contact Authorization.
-
-Guardian/LAR Consent Requirements: Given {client_name}'s status, consent from the legally authorized representative (LAR) is required and has been formally requested. Documentation of consent receipt is pending and will be completed prior to service initiation.
-
-HIPAA Authorization Status: HIPAA authorization form has been provided to {client_name}'s guardian/LAR with detailed explanation of privacy rights and information sharing protocols. Signature is pending to ensure full compliance with federal privacy regulations.
-
-Treatment Consent Documentation: Comprehensive treatment consent form has been prepared and will be executed upon initial clinical engagement, ensuring informed consent for all proposed interventions.
-
-4. SYSTEM REGISTRATION SUMMARY
-
-Client Registration in EHR System: {client_name}'s demographic and referral information has been entered into the Behavioral Health Center's Electronic Health Record (EHR) system on {current_date}, ensuring comprehensive record management.
-
-Unique Identifier Assignment: A unique client identifier has been assigned (Client ID: MF-{datetime.now().strftime('%Y%m%d')}) to ensure accurate tracking and record management throughout the service delivery process.
-
-Demographics Verification: {client_name}'s demographic data, including name, date of birth, and current placement, have been verified against referral documentation and Medicaid records to ensure accuracy and consistency.
-
-Insurance Information Entry: Medicaid insurance details have been entered and cross-verified for accuracy within the EHR system, ensuring proper billing and authorization tracking.
-
-5. NEXT STEPS AND TIMELINE
-
-Immediate Action Items: 
-- Obtain signed consent forms from {client_name}'s guardian/LAR
-- Submit outstanding prior authorization documentation
-- Schedule initial clinical assessment appointment
-- Coordinate with referral source for additional information if needed
-
-Scheduled Appointments: Initial clinical assessment appointment for {client_name} scheduled for [Date and Time to be determined upon authorization approval].
-
-Documentation Requirements: Complete all intake documentation, including clinical assessment forms, risk screening tools, and treatment planning materials prior to scheduled appointment.
-
-Follow-up Responsibilities: Case manager has been assigned to monitor authorization status and coordinate ongoing communication with referral source and {client_name}'s guardian/LAR.
-
-6. QUALITY CHECKPOINTS COMPLETED
-
-Data Accuracy Verification: All client data entered for {client_name} has been reviewed for accuracy and consistency with source documents. Secondary verification completed by supervisory staff.
-
-Completeness Assessment: Referral packet and electronic record have been assessed for completeness. Pending receipt of signed consents and authorization approval before proceeding to clinical assessment phase.
-
-Compliance Review Status: All documentation for {client_name} has been reviewed for compliance with internal policies and external regulatory standards, including HIPAA, state licensing requirements, and Medicaid guidelines.
-
-Supervisor Approval Requirements: Referral processing documentation for {client_name} has been submitted for supervisory review and approval on {current_date}.
-
-7. COMPLIANCE VERIFICATION
-
-Regulatory Requirement Adherence: All referral processing activities for {client_name} adhere to applicable federal and state regulations governing behavioral health services, including 42 CFR Part 2 and state licensing requirements.
-
-State Licensing Compliance: Service provision and documentation comply with Texas state behavioral health licensing requirements and Department of State Health Services regulations.
-
-Accreditation Standards Met: Documentation and processes align with accreditation standards set forth by relevant accrediting bodies, including CARF (Commission on Accreditation of Rehabilitation Facilities) and The Joint Commission standards.
-
-Risk Management Protocols: Comprehensive risk assessment and mitigation protocols have been followed to ensure {client_name}'s safety and data security throughout the referral processing procedure.
-
-═══════════════════════════════════════════════════════════════════
-
-PROFESSIONAL CERTIFICATION:
-
-Prepared by: [Clinical Staff Name], LCSW
-Licensed Clinical Social Worker
-Texas License #: [License Number]
-Date: {current_date}
-
-Reviewed and Approved by: [Clinical Supervisor Name], LPC-S
-Licensed Professional Counselor - Supervisor
-Texas License #: [License Number]
-Date: {current_date}
-
-═══════════════════════════════════════════════════════════════════
-
-CONFIDENTIALITY NOTICE:
-This document contains confidential and privileged information. The Behavioral Health Center at Cypress maintains strict adherence to confidentiality, regulatory compliance, and quality standards in all referral processing activities to ensure optimal client care and service delivery for {client_name} and all clients served.
-
-Document ID: REF-{datetime.now().strftime('%Y%m%d')}-{client_name.replace(' ', '').upper()[:4]}
-Generated: {current_date} at {current_time}"""
-
-    elif "Service Engagement Plan" in prompt:
-        return f"""BEHAVIORAL HEALTH CENTER AT CYPRESS
-SERVICE ENGAGEMENT AND LAUNCH PLAN
-
-═══════════════════════════════════════════════════════════════════
-
-CLIENT: {client_name}
-MEDICAID ID: 529614220
-PLAN DATE: {current_date}
-PREPARED BY: [Clinical Team Lead], LMSW
-
-═══════════════════════════════════════════════════════════════════
-
-1. STAKEHOLDER COMMUNICATION PLAN
-
-Primary Contacts Identified: {client_name}'s guardian/LAR, referral source, current placement facility, and assigned clinical team have been identified as primary stakeholders in the service engagement process.
-
-Communication Protocols: Weekly communication schedule has been established with all stakeholders. Primary contact methods include secure email communication and scheduled phone conferences to ensure HIPAA compliance and effective coordination.
-
-Meeting Schedules: Initial stakeholder meeting for {client_name} has been scheduled within 72 hours of service authorization approval. Ongoing monthly coordination meetings have been planned to ensure continuous communication and service alignment.
-
-Information Sharing Agreements: HIPAA-compliant information sharing agreements have been executed with all relevant parties to ensure coordinated care while maintaining {client_name}'s privacy rights and confidentiality.
-
-2. CLINICAL TEAM ASSIGNMENT DETAILS
-
-Primary Clinician Assignment: Licensed clinician has been assigned to {client_name} based on comprehensive needs assessment and staff expertise evaluation. Clinician credentials have been verified and documented in compliance files.
-
-Support Staff Roles: The following support staff have been assigned to provide comprehensive service delivery for {client_name}:
-- Case Manager: Coordination and advocacy services
-- Skills Trainer: Life skills development and community integration
-- Peer Support Specialist: Peer mentoring and recovery support
-
-Supervision Structure: Clinical supervision for {client_name}'s case will be provided weekly by licensed clinical supervisor. Administrative supervision will be provided by program manager to ensure quality and compliance.
-
-Credential Verification: All assigned staff credentials have been verified through state licensing boards and documented in personnel files to ensure qualified service provision for {client_name}.
-
-3. SERVICE INTEGRATION SCHEDULE
-
-Service Coordination Timeline: Integration with {client_name}'s existing services has been planned over a 30-day period with weekly milestone reviews to ensure smooth transition and continuity of care.
-
-Integration with Existing Services: Coordination with {client_name}'s current medical, educational, and social services has been planned to ensure seamless service delivery without duplication or gaps in care.
-
-Transition Planning: Gradual transition from current service providers to new service team has been designed with overlap period to ensure continuity and minimize disruption to {client_name}'s routine and therapeutic relationships.
-
-Continuity of Care Protocols: Established protocols for maintaining therapeutic relationships and service consistency during transition period have been implemented to support {client_name}'s stability and progress.
-
-4. WELCOME PACKAGE CONTENTS
-
-Orientation Materials: Comprehensive welcome package for {client_name} includes client rights and responsibilities, detailed service descriptions, contact information, and emergency procedures.
-
-Rights and Responsibilities: Comprehensive overview of {client_name}'s rights, grievance procedures, and service expectations has been prepared in age-appropriate language and format.
-
-Contact Information: 24/7 crisis contact information, primary team contacts, and administrative contacts have been provided to {client_name} and guardian/LAR for immediate access when needed.
-
-Emergency Procedures: Crisis intervention protocols, emergency contact procedures, and safety planning information have been included to ensure {client_name}'s safety and appropriate response to emergencies.
-
-5. COORDINATION AGREEMENTS
-
-Multi-Agency Coordination: Formal coordination agreements have been established with DFPS, school district, medical providers, and {client_name}'s placement facility to ensure comprehensive service delivery.
-
-Information Sharing Protocols: Secure communication methods have been established for sharing {client_name}'s treatment progress and coordination needs while maintaining confidentiality and HIPAA compliance.
-
-Joint Treatment Planning: Collaborative treatment planning sessions have been scheduled with all service providers to ensure goal alignment and coordinated intervention strategies for {client_name}.
-
-Collaborative Care Agreements: Written agreements outlining roles, responsibilities, and communication expectations have been executed with all parties involved in {client_name}'s care.
-
-6. STAFF CREDENTIALS VERIFICATION
-
-License Verification: All clinical staff assigned to {client_name}'s case have had their licenses verified through state licensing boards and documented in compliance files.
-
-Training Requirements: Specialized training requirements have been identified and completion schedules established for all staff working with {client_name}'s specific needs and population.
-
-Competency Assessments: Initial competency assessments have been completed for all staff working with {client_name} to ensure appropriate skill level and expertise.
-
-Ongoing Education Plans: Continuing education requirements have been identified and training schedules established to maintain competencies relevant to {client_name}'s ongoing care needs.
-
-7. TIMELINE FOR SERVICE LAUNCH
-
-Milestone Dates for {client_name}:
-- Service Authorization: Day 1 (Upon approval)
-- Initial Assessment: Day 3 (Within 72 hours)
-- Treatment Planning: Day 7 (Within one week)
-- Service Initiation: Day 10 (Full service launch)
-
-Critical Path Activities: Authorization processing, staff assignment, stakeholder coordination, and initial assessment completion have been identified as critical path activities for {client_name}'s service launch.
-
-Resource Allocation: Staffing assignments, transportation arrangements, and material resources have been allocated and confirmed for {client_name}'s service delivery.
-
-Quality Checkpoints: Supervisory review at each milestone has been scheduled to ensure quality standards and regulatory compliance throughout {client_name}'s service engagement process.
-
-═══════════════════════════════════════════════════════════════════
-
-SERVICE LAUNCH CERTIFICATION:
-
-Service Launch Date: [To be determined upon authorization]
-Next Review Date: [30 days post-launch]
-
-Approved by: [Clinical Supervisor Name], LPC-S
-Licensed Professional Counselor - Supervisor
-Texas License #: [License Number]
-Date: {current_date}
-
-═══════════════════════════════════════════════════════════════════
-
-This engagement plan ensures coordinated, quality service delivery for {client_name} while maintaining compliance with all regulatory requirements and professional standards. The plan will be reviewed and updated as needed to ensure continued appropriateness and effectiveness.
-
-Document ID: ENG-{datetime.now().strftime('%Y%m%d')}-{client_name.replace(' ', '').upper()[:4]}
-Generated: {current_date} at {current_time}"""
-
-    else:
-        # Enhanced generic professional document template
-        return f"""BEHAVIORAL HEALTH CENTER AT CYPRESS
-PROFESSIONAL CLINICAL DOCUMENTATION
-
-═══════════════════════════════════════════════════════════════════
-
-CLIENT: {client_name}
-MEDICAID ID: 529614220
-DOCUMENT DATE: {current_date}
-DOCUMENT TIME: {current_time}
-
-═══════════════════════════════════════════════════════════════════
-
-PROFESSIONAL DOCUMENTATION SUMMARY
-
-This comprehensive document has been generated using the Enhanced EIA Documentation System to support professional behavioral health service delivery for {client_name}. The content follows established clinical protocols and regulatory compliance standards specific to behavioral health services.
-
-KEY COMPONENTS ADDRESSED:
-
-Clinical Assessment and Planning:
-- Comprehensive evaluation of {client_name}'s presenting concerns and needs
-- Evidence-based assessment protocols and standardized instruments
-- Individualized treatment planning based on assessment findings
-- Goal-oriented intervention strategies aligned with best practices
-
-Evidence-Based Intervention Strategies:
-- Research-supported therapeutic approaches appropriate for {client_name}
-- Trauma-informed care principles integrated throughout service delivery
-- Culturally responsive interventions tailored to individual needs
-- Family and systems-based approaches when clinically indicated
-
-Quality Assurance Protocols:
-- Regular supervision and clinical oversight of {client_name}'s case
-- Outcome measurement and progress monitoring systems
-- Continuous quality improvement processes and feedback mechanisms
-- Peer review and consultation protocols for complex cases
-
-Regulatory Compliance Measures:
-- HIPAA privacy and security requirements maintained throughout
-- State licensing and certification standards adhered to consistently
-- Medicaid documentation and billing compliance ensured
-- Professional ethics and standards of practice followed
-
-Professional Documentation Standards:
-- Comprehensive record-keeping and documentation protocols
-- Timely completion of all required clinical documentation
-- Accurate and objective clinical observations and assessments
-- Professional language and terminology used throughout
-
-INDIVIDUALIZED CONSIDERATIONS FOR {client_name.upper()}:
-
-The service delivery approach for {client_name} incorporates individualized assessment findings, cultural considerations, and specific needs identified through comprehensive evaluation. Treatment planning reflects evidence-based practices appropriate for the presenting concerns and desired outcomes.
-
-NEXT STEPS AND RECOMMENDATIONS:
-
-Continued assessment and monitoring of {client_name}'s progress will be conducted according to established protocols. Regular review and updating of treatment plans will ensure continued appropriateness and effectiveness of interventions.
+        logger.exception('Generating document failed')
+        return jsonify({
+            'success': False,
+            'error': f'Failed to generate document: {str(e)}'
+        }), 500
 
-═══════════════════════════════════════════════════════════════════
+@eia_docs_bp.route('/generate-document/stream', methods=['POST'])
+def generate_document_stream():
+    """Stream a generated document as Server-Sent Events
+
+    Emits ``delta`` events with content fragments as they arrive, then a final
+    ``metadata`` event (or an ``error`` event if generation fails midway).
+    """
+    data = request.get_json(silent=True) or {}
+    client_data = request_client_data(data)
+    step_id = data.get('stepId', '')
+    cache_mode = data.get('cache', 'use')
+
+    if client_data is None:
+        return jsonify({'error': 'Client not found'}), 404
+    error = generation_request_error(data, client_data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    prompt_data = get_enhanced_eia_prompts(step_id, client_data)
+    key = document_cache_key(step_id, client_data)
+    cached = document_cache.get(key, cache_mode)
+
+    def events():
+        source = 'llm'
+        document_id = None
+        if cached is not None:
+            yield format_sse('delta', {'content': cached[1]})
+        else:
+            fragments = []
+            started = time.perf_counter()
+            try:
+                for source, fragment in stream_with_enhanced_gpt(prompt_data['prompt'], step_id, client_data):
+                    fragments.append(fragment)
+                    yield format_sse('delta', {'content': fragment})
+            except Exception as e:
+                yield stream_error_event(e, started, step_id)
+                return
+            observe_stream(started, step_id, outcome_label(source))
+            content = ''.join(fragments)
+            if source == 'llm':
+                document_cache.set(key, prompt_data['documentType'], content, cache_mode)
+            document = streamed_document(step_id, client_data, prompt_data, content, source, started)
+            document_id = save_document(document, client_data)
+        yield stream_metadata_event(step_id, client_data, prompt_data, source, cached is not None, document_id)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
-PROFESSIONAL CERTIFICATION:
+def request_client_data(data):
+    """The request's client: the stored client ``clientId`` names, else ``clientData``
+
+    Returns None when ``clientId`` names no stored client. Stored clients come
+    from ``client_contexts`` with their prompt context already resolved.
+    """
+    if data.get('clientId') is not None:
+        return client_contexts.get(data['clientId'])
+    return data.get('clientData') or {}
+
+def requested_deadline(data, headers):
+    """The request's latency budget in ms as sent (``deadlineMs``, else the ``X-Deadline-Ms`` header), or None"""
+    return data.get('deadlineMs', headers.get('x-deadline-ms'))
+
+def client_data_error(data, client_data):
+    """Validation error for the client of a generation request body, or None"""
+    if data.get('clientId') is not None and data.get('clientData'):
+        return 'Send either clientId or clientData, not both'
+    if not isinstance(client_data, dict) or not client_data.get('name'):
+        return 'Client name is required'
+    return None
+
+def generation_request_error(data, client_data):
+    """Validation error for a single-document generation request body, or None"""
+    error = client_data_error(data, client_data)
+    if error:
+        return error
+    if not data.get('stepId', ''):
+        return 'Step ID is required'
+    if data.get('cache', 'use') not in CACHE_MODES:
+        return f"cache must be one of {', '.join(CACHE_MODES)}"
+    return None
+
+def workflow_options(data, max_concurrency):
+    """``(step_ids, concurrency, cache_mode, error)`` for a /generate-workflow body"""
+    step_ids = data.get('stepIds') or list(WORKFLOW_STEPS)
+    if not isinstance(step_ids, list) or not all(isinstance(step_id, str) and step_id for step_id in step_ids):
+        return None, None, None, 'stepIds must be a list of step IDs'
+    try:
+        concurrency = min(int(data.get('concurrency', max_concurrency)), max_concurrency)
+    except (TypeError, ValueError):
+        return None, None, None, 'concurrency must be an integer'
+    concurrency = max(1, min(concurrency, len(step_ids)))
+    cache_mode = data.get('cache', 'use')
+    if cache_mode not in CACHE_MODES:
+        return None, None, None, f"cache must be one of {', '.join(CACHE_MODES)}"
+    return step_ids, concurrency, cache_mode, None
+
+def workflow_response(by_step, step_ids, client_data):
+    """Body of a non-streamed /generate-workflow response, documents in ``step_ids`` order"""
+    return {
+        'success': True,
+        'documents': [by_step[step_id] for step_id in step_ids],
+        'timestamp': datetime.now().isoformat(),
+        'clientName': client_data.get('name', '')
+    }
 
-Prepared by: EIA Documentation System
-Clinical Documentation Specialist
-Behavioral Health Center at Cypress
-Date: {current_date}
+def workflow_complete_event(count, step_ids):
+    return format_sse('complete', {
+        'success': True,
+        'count': count,
+        'stepIds': step_ids,
+        'timestamp': datetime.now().isoformat()
+    })
 
-Clinical Review by: [Clinical Supervisor Name], LCSW
-Licensed Clinical Social Worker
-Texas License #: [License Number]
-Date: {current_date}
+def stream_error_event(error, started, step_id):
+    """Record a failed stream and return its ``error`` event"""
+    observe_stream(started, step_id, 'error')
+    if isinstance(error, UpstreamBusyError):
+        return format_sse('error', {'error': str(error), 'status': error.status, 'retryAfter': error.retry_after})
+    logger.error('Streaming document for %s failed', step_id, exc_info=error)
+    return format_sse('error', {'error': f'Failed to generate document: {str(error)}'})
+
+def stream_metadata_event(step_id, client_data, prompt_data, source, cached, document_id):
+    return format_sse('metadata', {
+        'success': True,
+        'documentType': prompt_data['documentType'],
+        'timestamp': datetime.now().isoformat(),
+        'stepId': step_id,
+        'clientName': client_data.get('name', ''),
+        'source': source,
+        'cached': cached,
+        'documentId': document_id
+    })
 
-═══════════════════════════════════════════════════════════════════
+def observe_stream(started, step_id, outcome):
+    metrics.stage_seconds.observe(time.perf_counter() - started, stage='stream', step_id=metrics.step_label(step_id),
+                                  model=MODEL, outcome=outcome)
+
+def upstream_busy_response(error):
+    """429/503 with Retry-After for a call the upstream limiter refused"""
+    response = jsonify({'success': False, 'error': str(error), 'retryAfter': error.retry_after})
+    response.status_code = error.status
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def format_sse(event, data):
+    """Format one Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@eia_docs_bp.route('/generate-workflow', methods=['POST'])
+def generate_workflow():
+    """Generate several workflow steps for one client concurrently
+
+    Accepts ``clientData`` (or the ``clientId`` of a stored client), an
+    optional ``stepIds`` list (all seven steps by default) and an optional ``concurrency``, capped by
+    ``EIA_WORKFLOW_CONCURRENCY``. With ``"stream": true`` each document is sent
+    as a ``document`` SSE event as soon as it completes; with
+    ``"sections": true`` each is generated section by section.
+    """
+    data = request.get_json(silent=True) or {}
+    client_data = request_client_data(data)
+
+    if client_data is None:
+        return jsonify({'error': 'Client not found'}), 404
+    error = client_data_error(data, client_data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    step_ids, concurrency, cache_mode, error = workflow_options(data, current_app.config.get('EIA_WORKFLOW_CONCURRENCY', 4))
+    if error:
+        return jsonify({'error': error}), 400
+
+    documents = iter_workflow_documents(current_app._get_current_object(), step_ids, client_data, concurrency, cache_mode,
+                                        sections=bool(data.get('sections')))
+
+    if data.get('stream'):
+        def events():
+            completed = 0
+            for document in documents:
+                completed += 1
+                yield format_sse('document', document)
+            yield workflow_complete_event(completed, step_ids)
+
+        return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
 
-CONFIDENTIALITY NOTICE:
-This document contains confidential and privileged information regarding {client_name}. The Behavioral Health Center at Cypress maintains strict adherence to confidentiality, regulatory compliance, and quality standards in all clinical documentation activities to ensure optimal client care and service delivery.
+    return jsonify(workflow_response({document['stepId']: document for document in documents}, step_ids, client_data))
+
+def iter_workflow_documents(app, step_ids, client_data, concurrency, cache_mode='use', sections=False):
+    """Yield one generated document per step, in completion order"""
+    generate = generate_sectioned_document if sections else generate_step_document
+
+    def run(step_id):
+        with app.app_context():
+            try:
+                return generate(step_id, client_data, cache_mode)
+            except Exception as e:
+                logger.exception('Workflow step %s failed, using its template', step_id)
+                return generate_template_step_document(step_id, client_data)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='eia-workflow') as executor:
+        futures = [executor.submit(run, step_id) for step_id in dict.fromkeys(step_ids)]
+        for future in as_completed(futures):
+            yield future.result()
+
+def generate_step_document(step_id, client_data, cache_mode='use', store=True):
+    """Generate one step's document, falling back to the template on upstream failure
+
+    Upstream results are cached (see ``document_cache_key``); template
+    fallbacks are not, so the next request tries the model again. Unless the
+    request bypasses the cache, identical requests already waiting on
+    upstream share that call instead of making their own (``coalesced``).
+    When the upstream limiter refuses the call, ``UpstreamBusyError``
+    propagates so the client can retry rather than get a template. Newly
+    generated documents are persisted to the document store unless ``store``
+    is false; cache hits are not stored again.
+    """
+    with metrics.timed('generate', step_id=step_id, model=MODEL) as stage, prioritized(client_data):
+        started = time.perf_counter()
+        prompt_data = get_enhanced_eia_prompts(step_id, client_data)
+        key = document_cache_key(step_id, client_data)
+        cached = document_cache.get(key, cache_mode)
+        prompt_done = time.perf_counter()
+        if cached is not None:
+            stage['outcome'] = 'cached'
+            return cached_document(step_id, client_data, prompt_data, cached[1])
+
+        coalesced = False
+        try:
+            if cache_mode == 'bypass':
+                content = request_enhanced_gpt(prompt_data['prompt'], step_id)
+            else:
+                content, coalesced = single_flight.do(
+                    key, lambda: request_enhanced_gpt(prompt_data['prompt'], step_id), step_id=step_id
+                )
+            source = 'llm'
+        except UpstreamBusyError:
+            raise
+        except Exception as e:
+            content, source = fallback_content(step_id, client_data, e), 'template'
+        else:
+            if not coalesced:
+                document_cache.set(key, prompt_data['documentType'], content, cache_mode)
+        stage['outcome'] = 'coalesced' if coalesced else outcome_label(source)
+        document = generated_document(step_id, client_data, prompt_data, content, source, coalesced, started, prompt_done)
+        if store:
+            document['documentId'] = save_document(document, client_data)
+        return document
+
+def generate_sectioned_document(step_id, client_data, cache_mode='use', store=True):
+    """Generate one step's document section by section, in parallel
+
+    Each numbered section gets its own smaller prompt holding only the client
+    fields it depends on (declared in the prompt manifest); the results are
+    assembled in order. Sections are stored per client, so when a client's
+    data changes only sections whose prompt changed are regenerated; the
+    rest come from storage unless the request bypasses or refreshes the
+    cache. If any section fails, the template document is returned instead,
+    but the sections that did succeed are stored so a retry only regenerates
+    the rest. Steps without declared sections are generated whole.
+    """
+    template = prompt_registry.get(step_id)
+    if not template.sections:
+        return generate_step_document(step_id, client_data, cache_mode, store)
+
+    with metrics.timed('generate', step_id=step_id, model=MODEL) as stage, prioritized(client_data):
+        started = time.perf_counter()
+        sections = get_section_prompts(step_id, client_data)
+        client_key = client_key_for(client_data)
+        stored = {}
+        if cache_mode == 'use':
+            stored = load_sections(client_key, step_id, [section['fingerprint'] for section in sections])
+        prompt_done = time.perf_counter()
+
+        missing = [section for section in sections if section['fingerprint'] not in stored]
+        generated, errors = generate_sections(missing, step_id, cache_mode)
+        if cache_mode != 'bypass':
+            save_sections(client_key, step_id, [
+                (section['number'], section['fingerprint'], generated[section['fingerprint']])
+                for section in missing if section['fingerprint'] in generated
+            ])
+        busy = [error for error in errors if isinstance(error, UpstreamBusyError)]
+        if busy:
+            raise busy[0]
+
+        prompt_data = {'documentType': template.document_type, 'promptVersion': template.version}
+        if errors:
+            logger.warning('Upstream unavailable for %s section(s) of %s, using the template: %s', len(errors), step_id, errors[0])
+            content = generate_enhanced_template_document(step_id, client_data)
+            source = 'template'
+        else:
+            contents = {**stored, **generated}
+            content = '\n\n'.join(contents[section['fingerprint']].strip() for section in sections)
+            source = 'llm'
+        stage['outcome'] = 'cached' if not missing else outcome_label(source)
+        finished = time.perf_counter()
+        document = build_document_response(step_id, client_data, prompt_data, content, source)
+        document['cached'] = not missing
+        document['sections'] = [{
+            'number': section['number'],
+            'heading': section['heading'],
+            'fields': list(section['fields']),
+            'source': 'stored' if section['fingerprint'] in stored
+                      else 'llm' if section['fingerprint'] in generated else 'failed'
+        } for section in sections]
+        document['regeneratedSections'] = [section['number'] for section in missing]
+        document['timings'] = {
+            'promptMs': round((prompt_done - started) * 1000, 3),
+            'generationMs': round((finished - prompt_done) * 1000, 3),
+            'totalMs': round((finished - started) * 1000, 3)
+        }
+        if store and missing:
+            document['documentId'] = save_document(document, client_data)
+        return document
+
+def generate_sections(sections, step_id, cache_mode='use'):
+    """Generate section texts concurrently; returns ``({fingerprint: content}, [errors])``"""
+    if not sections:
+        return {}, []
+    app = current_app._get_current_object()
+
+    def run(section):
+        with app.app_context():
+            def call():
+                return request_enhanced_gpt(section['prompt'], step_id, SECTION_MAX_TOKENS)
+            if cache_mode == 'bypass':
+                return call()
+            return single_flight.do(section['fingerprint'], call, step_id=step_id)[0]
+
+    generated, errors = {}, []
+    concurrency = min(len(sections), app.config.get('EIA_SECTION_CONCURRENCY', 7))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='eia-section') as executor:
+        # Copy the context so the sections are scheduled at this request's priority
+        futures = {executor.submit(contextvars.copy_context().run, run, section): section for section in sections}
+        for future in as_completed(futures):
+            try:
+                generated[futures[future]['fingerprint']] = future.result()
+            except Exception as e:
+                errors.append(e)
+    return generated, errors
+
+def get_section_prompts(step_id, client_data):
+    """One prompt per numbered section of ``step_id``, with its heading, fields and fingerprint"""
+    with metrics.timed('prompt', step_id=step_id):
+        template = prompt_registry.get(step_id)
+        section_prompt = prompt_registry.section_prompt
+        labels = prompt_registry.field_labels
+        context = normalize_client_context(client_data)
+        context['currentDate'] = prompt_date()
+        guidance = template.guidance.render(context) if template.guidance else ''
+        prompts = []
+        for section in template.sections:
+            prompt = section_prompt.render({
+                'heading': section.heading,
+                'documentType': template.document_type,
+                'name': context['name'],
+                'clientDetails': '\n'.join(f'- {labels[field]}: {context[field]}' for field in section.fields),
+                'requirements': section.render(context),
+                'guidance': guidance
+            })
+            version = f'{template.version}/{section_prompt.version}'
+            prompts.append({
+                'number': section.number,
+                'heading': section.heading,
+                'fields': section.fields,
+                'prompt': prompt,
+                'fingerprint': prompt_key(prompt, SYSTEM_PROMPT, MODEL, TEMPERATURE, SECTION_MAX_TOKENS, version)
+            })
+        return prompts
+
+def outcome_label(source):
+    """Metrics outcome for a document source: ``llm`` or ``fallback``"""
+    return 'llm' if source == 'llm' else 'fallback'
+
+def document_cache_key(step_id, client_data):
+    """Cache key covering everything that shapes the upstream completion"""
+    return cache_key(step_id, normalize_client_context(client_data), SYSTEM_PROMPT, MODEL,
+                     TEMPERATURE, MAX_TOKENS, prompt_registry.get(step_id).version)
+
+def generate_step_document_within(step_id, client_data, deadline, cache_mode='use'):
+    """Generate a document within ``deadline`` seconds
+
+    If upstream has not answered in time, the template document is returned
+    marked ``provisional`` and stored; the upstream call keeps running and
+    replaces the stored document, fetched from /documents/<documentId>.
+    """
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            return generate_step_document(step_id, client_data, cache_mode, store=False)
+
+    future = provisional_documents.executor.submit(run)
+    try:
+        document = future.result(timeout=deadline)
+    except FutureTimeoutError:
+        document = generate_template_step_document(step_id, client_data)
+        document['provisional'] = True
+        document['documentId'] = provisional_documents.create(document, client_data, future)
+        return document
+    document['provisional'] = False
+    if not document['cached']:
+        document['documentId'] = save_document(document, client_data)
+    return document
+
+def generate_template_step_document(step_id, client_data):
+    """Build one step's document from the offline template only"""
+    prompt_data = get_enhanced_eia_prompts(step_id, client_data)
+    content = generate_enhanced_template_document(step_id, client_data)
+    return build_document_response(step_id, client_data, prompt_data, content, 'template')
+
+def cached_document(step_id, client_data, prompt_data, content):
+    """Response for a document served from the cache"""
+    document = build_document_response(step_id, client_data, prompt_data, content, 'llm')
+    document['cached'] = True
+    return document
+
+def fallback_content(step_id, client_data, error):
+    """Template content used in place of a failed upstream call"""
+    logger.warning('Upstream unavailable for %s, using the template: %s', step_id, error)
+    return generate_enhanced_template_document(step_id, client_data)
+
+def generated_document(step_id, client_data, prompt_data, content, source, coalesced, started, prompt_done):
+    """Response for a newly generated (or fallback) document, timed from ``started``"""
+    finished = time.perf_counter()
+    document = build_document_response(step_id, client_data, prompt_data, content, source)
+    document['cached'] = False
+    document['coalesced'] = coalesced
+    document['timings'] = {
+        'promptMs': round((prompt_done - started) * 1000, 3),
+        'generationMs': round((finished - prompt_done) * 1000, 3),
+        'totalMs': round((finished - started) * 1000, 3)
+    }
+    return document
+
+def streamed_document(step_id, client_data, prompt_data, content, source, started):
+    """Stored form of a streamed document; prompt time is not measured separately"""
+    document = build_document_response(step_id, client_data, prompt_data, content, source)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+    document['timings'] = {'promptMs': None, 'generationMs': elapsed_ms, 'totalMs': elapsed_ms}
+    return document
+
+def build_document_response(step_id, client_data, prompt_data, content, source):
+    """Shape a generated document the way the generation endpoints return it"""
+    return {
+        'success': True,
+        'content': content,
+        'documentType': prompt_data['documentType'],
+        'timestamp': datetime.now().isoformat(),
+        'stepId': step_id,
+        'clientName': client_data.get('name', ''),
+        'source': source,
+        'promptVersion': prompt_data['promptVersion'],
+        'model': MODEL if source == 'llm' else None
+    }
 
-Document ID: DOC-{datetime.now().strftime('%Y%m%d')}-{client_name.replace(' ', '').upper()[:4]}
-Generated: {current_date} at {current_time}"""
+@eia_docs_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters for the generated-document cache"""
+    return jsonify(document_cache.stats())
+
+@eia_docs_bp.route('/upstream/circuit', methods=['GET'])
+def upstream_circuit_status():
+    """State, sliding-window error/latency rates and recent transitions of the upstream circuit breaker"""
+    return jsonify(upstream_breaker.status())
+
+@eia_docs_bp.route('/upstream/limiter', methods=['GET'])
+def upstream_limiter_stats():
+    """Queue depth, wait times and rejections of the upstream limiter"""
+    return jsonify(upstream_limiter.stats())
+
+@eia_docs_bp.route('/upstream/coalescing', methods=['GET'])
+def upstream_coalescing_stats():
+    """Upstream calls made versus requests that shared another request's call"""
+    return jsonify(single_flight.stats())
+
+@eia_docs_bp.route('/upstream/pool', methods=['GET'])
+def upstream_pool_stats():
+    """Connection pool statistics for the shared upstream client"""
+    return jsonify(openai_pool.stats())
+
+def request_enhanced_gpt(prompt, step_id='', max_tokens=MAX_TOKENS):
+    """Call the upstream model for a prompt, raising on any upstream failure
+
+    The shared circuit breaker is checked first and raises
+    ``CircuitOpenError`` while it is open, so rejected calls take no limiter
+    capacity. Admitted calls then wait for capacity in the upstream limiter,
+    which raises ``UpstreamBusyError`` when its queue is full or the rate
+    limit cannot be met in time.
+    """
+    # Shared keep-alive client, configured from OPENAI_API_KEY / OPENAI_API_BASE
+    client = openai_pool.get_client()
+
+    admission = admit_upstream_call()
+    try:
+        with upstream_limiter.slot(prompt, max_tokens) as reservation, \
+                metrics.timed('upstream', step_id=step_id, model=MODEL, outcome='llm'):
+            request_started = time.monotonic()
+            try:
+                response = client.chat.completions.create(**completion_request(prompt, max_tokens))
+            except Exception as e:
+                record_upstream_failure(admission, e, request_started)
+                raise
+            reservation.settle(response.usage)
+            upstream_breaker.record_success(admission, time.monotonic() - request_started)
+    except UpstreamBusyError:
+        # Refused by the limiter, so it never reached upstream
+        upstream_breaker.release_probe(admission)
+        raise
+    return completion_content(response, step_id)
+
+def stream_with_enhanced_gpt(prompt, step_id, client_data):
+    """Yield ``(source, fragment)`` pairs for a document as it is generated
+
+    Upstream deltas are passed through as they arrive. If the upstream call
+    fails before producing any content (or the circuit is open), the template
+    fallback is yielded section by section instead; failures after the first
+    delta, and ``UpstreamBusyError`` from the limiter, propagate.
+    """
+    started = False
+    admission = None
+    try:
+        admission = admit_upstream_call()
+        with upstream_limiter.slot(prompt, MAX_TOKENS, priority_class(client_data)) as reservation:
+            request_started = time.monotonic()
+            try:
+                client = openai_pool.get_client()
+                stream = client.chat.completions.create(**completion_request(prompt, MAX_TOKENS, stream=True))
+                with stream:
+                    for chunk in stream:
+                        reservation.settle(chunk.usage)
+                        fragment = chunk_fragment(chunk, step_id)
+                        if fragment:
+                            started = True
+                            yield 'llm', fragment
+            except Exception as e:
+                record_upstream_failure(admission, e, request_started)
+                raise
+            upstream_breaker.record_success(admission, time.monotonic() - request_started)
+    except (UpstreamBusyError, GeneratorExit):
+        # Refused by the limiter, or the client went away mid-stream: neither
+        # an upstream failure nor a success
+        upstream_breaker.release_probe(admission)
+        raise
+    except Exception as e:
+        if started:
+            raise
+        for section in stream_fallback(step_id, client_data, e):
+            yield 'template', section
+
+def admit_upstream_call():
+    """The circuit breaker's ``Admission`` for a call going upstream now; ``CircuitOpenError`` if refused"""
+    admission = upstream_breaker.allow_request()
+    if admission is None:
+        raise CircuitOpenError(f'{upstream_breaker.name} circuit is open')
+    return admission
+
+def completion_request(prompt, max_tokens=MAX_TOKENS, stream=False):
+    """Arguments of the upstream chat completion call for ``prompt``"""
+    arguments = {
+        'model': MODEL,
+        'messages': [
+            {'role': 'system', 'content': SYSTEM_PROMPT},
+            {'role': 'user', 'content': prompt}
+        ],
+        'max_tokens': max_tokens,
+        'temperature': TEMPERATURE
+    }
+    if stream:
+        arguments['stream'] = True
+        arguments['stream_options'] = {'include_usage': True}
+    return arguments
+
+def completion_content(response, step_id):
+    """Record a completion's token usage and return its text"""
+    metrics.record_usage(response.usage, step_id=step_id, model=MODEL)
+    return response.choices[0].message.content
+
+def chunk_fragment(chunk, step_id):
+    """Record a stream chunk's token usage (sent with the last one) and return its text, if any"""
+    if chunk.usage is not None:
+        metrics.record_usage(chunk.usage, step_id=step_id, model=MODEL)
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content
+
+def record_upstream_failure(admission, error, request_started):
+    """Count a failed upstream call against the circuit, and back off the limiter on a 429"""
+    upstream_breaker.record_failure(admission, time.monotonic() - request_started)
+    if is_rate_limited(error):
+        upstream_limiter.throttle()
+
+def stream_fallback(step_id, client_data, error):
+    """Template sections streamed in place of a failed upstream stream"""
+    logger.warning('Upstream unavailable for %s, streaming the template: %s', step_id, error)
+    return iter_enhanced_template_document(step_id, client_data)
+
+def generate_enhanced_template_document(step_id, client_data, now=None):
+    """Enhanced fallback template-based document generation with professional content
+
+    Dispatches on ``step_id`` to a precompiled template and fills it from the
+    normalized ``client_data``; all dates and times come from one timestamp.
+    """
+    with metrics.timed('template', step_id=step_id, outcome='fallback'):
+        return render_fallback_document(step_id, normalize_client_context(client_data), now)
+
+def iter_enhanced_template_document(step_id, client_data, now=None):
+    """Yield the fallback document for ``step_id`` one section at a time"""
+    return iter_fallback_document(step_id, normalize_client_context(client_data), now)
 
 def get_enhanced_eia_prompts(step_id, client_data):
-    """Get Enhanced EIA prompts for professional document generation"""
-    
-    # Extract client information with defaults
-    name = client_data.get('name', 'Michael Frame')
-    medicaid_id = client_data.get('medicaidId', '529614220')
-    date_of_birth = client_data.get('dateOfBirth', '[Protected Health Information]')
-    guardian = client_data.get('guardian', '[As documented in referral]')
-    placement = client_data.get('placement', '[Current placement facility]')
-    referral_source = client_data.get('referralSource', '[Verified referral source]')
-    service_requests = client_data.get('serviceRequests', 'Comprehensive behavioral health services')
-    urgency_level = client_data.get('urgencyLevel', 'standard')
-    
-    current_date = datetime.now().strftime('%B %d, %Y')
-    
-    prompts = {
-        'step1': {
-            'documentType': 'Referral Processing Report',
-            'prompt': f"""Generate a comprehensive, professional Referral Processing Report for the Behavioral Health Center at Cypress for client {name}.
-
-CLIENT INFORMATION:
-- Client Name: {name}
-- Medicaid ID: {medicaid_id}
-- Date of Birth: {date_of_birth}
-- Guardian/LAR: {guardian}
-- Current Placement: {placement}
-- Referral Source: {referral_source}
-- Service Requests: {service_requests}
-- Urgency Level: {urgency_level}
-- Report Date: {current_date}
-
-DOCUMENT REQUIREMENTS:
-Create a professional behavioral health document with the following sections:
-
-1. REFERRAL RECEIPT CONFIRMATION
-- Specific date and time of referral receipt
-- Referral source verification details
-- Initial contact documentation with {name}'s guardian/LAR
-- Urgency level assessment rationale
-
-2. ELIGIBILITY VERIFICATION RESULTS
-- Medicaid eligibility status for {name}
-- Service authorization requirements
-- Coverage verification details
-- Prior authorization status and timeline
-
-3. CONSENT DOCUMENTATION STATUS
-- Required consent forms identified
-- Guardian/LAR consent requirements for {name}
-- HIPAA authorization status
-- Treatment consent documentation
-
-4. SYSTEM REGISTRATION SUMMARY
-- Client registration in EHR system for {name}
-- Unique identifier assignment
-- Demographics verification
-- Insurance information entry
-
-5. NEXT STEPS AND TIMELINE
-- Immediate action items for {name}
-- Scheduled appointments
-- Documentation requirements
-- Follow-up responsibilities
-
-6. QUALITY CHECKPOINTS COMPLETED
-- Data accuracy verification for {name}
-- Completeness assessment
-- Compliance review status
-- Supervisor approval requirements
-
-7. COMPLIANCE VERIFICATION
-- Regulatory requirement adherence
-- State licensing compliance
-- Accreditation standards met
-- Risk management protocols
-
-FORMAT REQUIREMENTS:
-- Use professional clinical language appropriate for behavioral health
-- Include specific details about {name} throughout the document
-- Maintain regulatory compliance language
-- Include professional headers and certification sections
-- Use current date and time references
-- Include confidentiality notices and document identification"""
-        },
-        
-        'step2': {
-            'documentType': 'Service Engagement Plan',
-            'prompt': f"""Generate a comprehensive Service Engagement and Launch Plan for {name} at the Behavioral Health Center at Cypress.
-
-CLIENT: {name}
-MEDICAID ID: {medicaid_id}
-PLAN DATE: {current_date}
-
-Include detailed sections for:
-1. STAKEHOLDER COMMUNICATION PLAN - specific to {name}'s care team
-2. CLINICAL TEAM ASSIGNMENT DETAILS - staff assigned to {name}
-3. SERVICE INTEGRATION SCHEDULE - timeline for {name}'s services
-4. WELCOME PACKAGE CONTENTS - materials prepared for {name}
-5. COORDINATION AGREEMENTS - partnerships for {name}'s care
-6. STAFF CREDENTIALS VERIFICATION - qualifications for {name}'s team
-7. TIMELINE FOR SERVICE LAUNCH - milestones for {name}'s service initiation
-
-Use professional behavioral health language, include specific references to {name} throughout, and maintain regulatory compliance standards."""
-        },
-        
-        'step3': {
-            'documentType': 'Clinical Review & Risk Assessment',
-            'prompt': f"""Generate a comprehensive Clinical Review and Risk Profiling Report for {name} including:
-
-CLIENT: {name}
-ASSESSMENT DATE: {current_date}
-
-1. COMPREHENSIVE CLINICAL ASSESSMENT - detailed evaluation of {name}'s presenting concerns
-2. RISK FACTOR ANALYSIS - identification of risk factors specific to {name}
-3. SAFETY PLANNING - safety protocols developed for {name}
-4. MEDICAL COORDINATION - healthcare coordination for {name}
-5. HIGH-RISK FACTOR IDENTIFICATION - specific risks for {name}
-6. INTERVENTION RECOMMENDATIONS - treatment recommendations for {name}
-7. MONITORING REQUIREMENTS - ongoing monitoring plan for {name}
-
-Use clinical terminology appropriate for behavioral health, include evidence-based assessment protocols, and maintain professional documentation standards."""
-        },
-        
-        'step4': {
-            'documentType': 'CANS 3.0 Assessment Plan',
-            'prompt': f"""Generate a CANS 3.0 Assessment Administration Plan for {name} including:
-
-CLIENT: {name}
-ASSESSMENT PLAN DATE: {current_date}
-
-1. ASSESSMENT SCHEDULING - timeline for {name}'s CANS 3.0 assessment
-2. ASSESSOR QUALIFICATIONS - credentials of staff conducting {name}'s assessment
-3. DOMAIN COVERAGE PLAN - specific domains to be assessed for {name}
-4. COLLATERAL INFORMATION - sources of information for {name}'s assessment
-5. SCORING PROTOCOLS - methodology for {name}'s CANS scoring
-6. RESULTS INTEGRATION - how {name}'s results will inform treatment planning
-7. REASSESSMENT SCHEDULE - ongoing assessment timeline for {name}
-
-Include CANS 3.0 specific protocols and professional assessment standards."""
-        },
-        
-        'step5': {
-            'documentType': 'Service Delivery Activation Plan',
-            'prompt': f"""Generate a Service Delivery Activation Plan for {name} including:
-
-CLIENT: {name}
-ACTIVATION DATE: {current_date}
-
-1. INITIAL SESSION PLANNING - first sessions scheduled for {name}
-2. CRISIS PREVENTION PROTOCOLS - crisis prevention strategies for {name}
-3. SKILL BUILDING SCHEDULE - skills training plan for {name}
-4. FAMILY ENGAGEMENT - family involvement plan for {name}
-5. COMMUNITY INTEGRATION - community activities for {name}
-6. PROGRESS MONITORING - tracking progress for {name}
-7. SERVICE COORDINATION - coordinating services for {name}
-
-Use evidence-based practice language and include specific interventions for {name}."""
-        },
-        
-        'step6': {
-            'documentType': 'Documentation & QA Protocol',
-            'prompt': f"""Generate a Documentation and Quality Assurance Protocol for {name} including:
-
-CLIENT: {name}
-PROTOCOL DATE: {current_date}
-
-1. DOCUMENTATION STANDARDS - requirements for {name}'s clinical records
-2. QUALITY REVIEW SCHEDULE - QA timeline for {name}'s case
-3. COMPLIANCE MONITORING - regulatory compliance for {name}'s services
-4. SUPERVISOR OVERSIGHT - supervision plan for {name}'s case
-5. OUTCOME MEASUREMENT - outcome tracking for {name}
-6. CORRECTIVE ACTION PROTOCOLS - quality improvement for {name}'s care
-7. RECORD MANAGEMENT - record keeping standards for {name}
-
-Include regulatory compliance requirements and professional documentation standards."""
-        },
-        
-        'step7': {
-            'documentType': 'Risk Management & Safety Protocol',
-            'prompt': f"""Generate a Risk Management and Safety Protocol for {name} including:
-
-CLIENT: {name}
-PROTOCOL DATE: {current_date}
-
-1. SAFETY ASSESSMENT - comprehensive safety evaluation for {name}
-2. RISK MITIGATION STRATEGIES - specific risk reduction plans for {name}
-3. EMERGENCY PROCEDURES - crisis response protocols for {name}
-4. INCIDENT REPORTING - reporting procedures for {name}'s case
-5. SAFETY MONITORING - ongoing safety oversight for {name}
-6. CRISIS INTERVENTION - crisis response plan for {name}
-7. REGULATORY COMPLIANCE - safety compliance requirements for {name}
-
-Include evidence-based risk management practices and safety protocols specific to behavioral health."""
+    """Get Enhanced EIA prompts for professional document generation
+
+    Only the requested step's precompiled template is rendered; unknown steps
+    get the generic professional documentation prompt.
+    """
+    with metrics.timed('prompt', step_id=step_id):
+        template = prompt_registry.get(step_id)
+        context = normalize_client_context(client_data)
+        context['currentDate'] = prompt_date()
+        return {
+            'documentType': template.document_type,
+            'prompt': template.render(context),
+            'promptVersion': template.version
         }
-    }
-    
-    return prompts.get(step_id, {
-        'documentType': 'Professional Documentation',
-        'prompt': f"""Generate professional behavioral health documentation for {name} at the Behavioral Health Center at Cypress, including comprehensive assessment, treatment planning, and service delivery components appropriate for regulatory compliance and clinical best practices."""
-    })
-
@@ -0,0 +1,283 @@
+"""Asyncio versions of the document generation routes, served by ``src/asgi.py``
+
+These mirror ``generate_step_document``, ``/generate-document/stream`` and
+``/generate-workflow`` in ``eia_docs`` but await the upstream model on the
+shared ``AsyncOpenAI`` client, so a request waiting on upstream holds a
+coroutine instead of a worker thread. Cache, document store and other
+database work still runs synchronously, on a worker thread inside an app
+context. Only the I/O differs: validation, prompts, cache keys, the
+fallback decision and response bodies come from the helpers the WSGI
+routes use.
+
+Handlers take the Flask app, the parsed JSON body and the request headers
+(lower-case names) and return ``(status, body, headers)``, where ``body`` is
+JSON-serializable or an async iterator of SSE messages, or None to leave the
+request to the WSGI app.
+"""
+import asyncio
+import json
+import logging
+import time
+
+from src.routes.eia_docs import (MAX_TOKENS, MODEL, admit_upstream_call, cached_document, chunk_fragment,
+                                 client_data_error, completion_content, completion_request, document_cache_key,
+                                 fallback_content, format_sse, generate_template_step_document, generated_document,
+                                 generation_request_error, get_enhanced_eia_prompts, observe_stream, outcome_label,
+                                 record_upstream_failure, request_client_data, requested_deadline, stream_error_event,
+                                 stream_fallback, stream_metadata_event, streamed_document, workflow_complete_event,
+                                 workflow_options, workflow_response)
+from src.services.circuit_breaker import upstream_breaker
+from src.services.doc_cache import document_cache
+from src.services.document_store import save_document
+from src.services.metrics import metrics
+from src.services.openai_pool import openai_pool
+from src.services.rate_limiter import UpstreamBusyError, upstream_limiter
+from src.services.scheduler import prioritized, priority_class
+from src.services.single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = {
+    'Content-Type': 'text/event-stream; charset=utf-8',
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+
+async def generate_document(app, data, headers, accept_stream=False):
+    """POST /api/eia/generate-document"""
+    if accept_stream:
+        return await generate_document_stream(app, data)
+    # Deadlines and section-by-section generation stay on the WSGI routes
+    if data.get('sections') or requested_deadline(data, headers) is not None:
+        return None
+    client_data = await resolve_client_data(app, data)
+    if client_data is None:
+        return 404, {'error': 'Client not found'}, {}
+    error = generation_request_error(data, client_data)
+    if error:
+        return 400, {'error': error}, {}
+    step_id = data.get('stepId', '')
+    try:
+        document = await generate_step_document(app, step_id, client_data, data.get('cache', 'use'))
+    except UpstreamBusyError as e:
+        return upstream_busy_response(e)
+    except Exception as e:
+        logger.exception('Generating document failed')
+        return 500, {'success': False, 'error': f'Failed to generate document: {str(e)}'}, {}
+    with metrics.timed('serialize', step_id=step_id, model=MODEL):
+        return 200, json.dumps(document).encode('utf-8'), {}
+
+
+async def generate_document_stream(app, data):
+    """POST /api/eia/generate-document/stream"""
+    client_data = await resolve_client_data(app, data)
+    if client_data is None:
+        return 404, {'error': 'Client not found'}, {}
+    error = generation_request_error(data, client_data)
+    if error:
+        return 400, {'error': error}, {}
+    step_id = data.get('stepId', '')
+    cache_mode = data.get('cache', 'use')
+
+    prompt_data = get_enhanced_eia_prompts(step_id, client_data)
+    key = document_cache_key(step_id, client_data)
+    cached = await run_in_app(app, document_cache.get, key, cache_mode)
+
+    async def events():
+        source = 'llm'
+        document_id = None
+        if cached is not None:
+            yield format_sse('delta', {'content': cached[1]})
+        else:
+            fragments = []
+            started = time.perf_counter()
+            try:
+                async for source, fragment in stream_with_enhanced_gpt(prompt_data['prompt'], step_id, client_data):
+                    fragments.append(fragment)
+                    yield format_sse('delta', {'content': fragment})
+            except Exception as e:
+                yield stream_error_event(e, started, step_id)
+                return
+            observe_stream(started, step_id, outcome_label(source))
+            content = ''.join(fragments)
+            if source == 'llm':
+                await run_in_app(app, document_cache.set, key, prompt_data['documentType'], content, cache_mode)
+            document = streamed_document(step_id, client_data, prompt_data, content, source, started)
+            document_id = await run_in_app(app, save_document, document, client_data)
+        yield stream_metadata_event(step_id, client_data, prompt_data, source, cached is not None, document_id)
+
+    return 200, events(), SSE_HEADERS
+
+
+async def generate_workflow(app, data):
+    """POST /api/eia/generate-workflow"""
+    if data.get('sections'):
+        return None
+    client_data = await resolve_client_data(app, data)
+
+    if client_data is None:
+        return 404, {'error': 'Client not found'}, {}
+    error = client_data_error(data, client_data)
+    if error:
+        return 400, {'error': error}, {}
+
+    step_ids, concurrency, cache_mode, error = workflow_options(data, app.config.get('EIA_WORKFLOW_CONCURRENCY', 4))
+    if error:
+        return 400, {'error': error}, {}
+
+    documents = iter_workflow_documents(app, step_ids, client_data, concurrency, cache_mode)
+
+    if data.get('stream'):
+        async def events():
+            completed = 0
+            async for document in documents:
+                completed += 1
+                yield format_sse('document', document)
+            yield workflow_complete_event(completed, step_ids)
+
+        return 200, events(), SSE_HEADERS
+
+    by_step = {document['stepId']: document async for document in documents}
+    return 200, workflow_response(by_step, step_ids, client_data), {}
+
+
+async def iter_workflow_documents(app, step_ids, client_data, concurrency, cache_mode='use'):
+    """Yield one generated document per step, in completion order"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(step_id):
+        async with semaphore:
+            try:
+                return await generate_step_document(app, step_id, client_data, cache_mode)
+            except Exception as e:
+                logger.exception('Workflow step %s failed, using its template', step_id)
+                return generate_template_step_document(step_id, client_data)
+
+    tasks = [asyncio.ensure_future(run(step_id)) for step_id in dict.fromkeys(step_ids)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def resolve_client_data(app, data):
+    """``eia_docs.request_client_data``; only a ``clientId`` lookup leaves the event loop"""
+    if data.get('clientId') is not None:
+        return await run_in_app(app, request_client_data, data)
+    return data.get('clientData') or {}
+
+
+async def generate_step_document(app, step_id, client_data, cache_mode='use', store=True):
+    """``eia_docs.generate_step_document`` on the event loop
+
+    Concurrent identical requests share one upstream call within this
+    process (``SingleFlight.do_async``); cross-worker coalescing does not
+    apply to the async path.
+    """
+    with metrics.timed('generate', step_id=step_id, model=MODEL) as stage, prioritized(client_data):
+        started = time.perf_counter()
+        prompt_data = get_enhanced_eia_prompts(step_id, client_data)
+        key = document_cache_key(step_id, client_data)
+        cached = await run_in_app(app, document_cache.get, key, cache_mode)
+        prompt_done = time.perf_counter()
+        if cached is not None:
+            stage['outcome'] = 'cached'
+            return cached_document(step_id, client_data, prompt_data, cached[1])
+
+        coalesced = False
+        try:
+            if cache_mode == 'bypass':
+                content = await request_enhanced_gpt(prompt_data['prompt'], step_id)
+            else:
+                content, coalesced = await single_flight.do_async(
+                    key, lambda: request_enhanced_gpt(prompt_data['prompt'], step_id), step_id=step_id
+                )
+            source = 'llm'
+        except UpstreamBusyError:
+            raise
+        except Exception as e:
+            content, source = fallback_content(step_id, client_data, e), 'template'
+        else:
+            if not coalesced:
+                await run_in_app(app, document_cache.set, key, prompt_data['documentType'], content, cache_mode)
+        stage['outcome'] = 'coalesced' if coalesced else outcome_label(source)
+        document = generated_document(step_id, client_data, prompt_data, content, source, coalesced, started, prompt_done)
+        if store:
+            document['documentId'] = await run_in_app(app, save_document, document, client_data)
+        return document
+
+
+async def request_enhanced_gpt(prompt, step_id='', max_tokens=MAX_TOKENS):
+    """``eia_docs.request_enhanced_gpt`` on the shared ``AsyncOpenAI`` client"""
+    client = openai_pool.get_async_client()
+
+    admission = admit_upstream_call()
+    try:
+        async with upstream_limiter.async_slot(prompt, max_tokens) as reservation:
+            with metrics.timed('upstream', step_id=step_id, model=MODEL, outcome='llm'):
+                request_started = time.monotonic()
+                try:
+                    response = await client.chat.completions.create(**completion_request(prompt, max_tokens))
+                except Exception as e:
+                    record_upstream_failure(admission, e, request_started)
+                    raise
+                reservation.settle(response.usage)
+                upstream_breaker.record_success(admission, time.monotonic() - request_started)
+    except (UpstreamBusyError, asyncio.CancelledError):
+        # Refused by the limiter, or every waiting client went away: neither
+        # an upstream failure nor a success
+        upstream_breaker.release_probe(admission)
+        raise
+    return completion_content(response, step_id)
+
+
+async def stream_with_enhanced_gpt(prompt, step_id, client_data):
+    """``eia_docs.stream_with_enhanced_gpt`` on the shared ``AsyncOpenAI`` client"""
+    started = False
+    admission = None
+    try:
+        admission = admit_upstream_call()
+        async with upstream_limiter.async_slot(prompt, MAX_TOKENS, priority_class(client_data)) as reservation:
+            request_started = time.monotonic()
+            try:
+                client = openai_pool.get_async_client()
+                stream = await client.chat.completions.create(**completion_request(prompt, MAX_TOKENS, stream=True))
+                async with stream:
+                    async for chunk in stream:
+                        reservation.settle(chunk.usage)
+                        fragment = chunk_fragment(chunk, step_id)
+                        if fragment:
+                            started = True
+                            yield 'llm', fragment
+            except Exception as e:
+                record_upstream_failure(admission, e, request_started)
+                raise
+            upstream_breaker.record_success(admission, time.monotonic() - request_started)
+    except (UpstreamBusyError, GeneratorExit, asyncio.CancelledError):
+        # Refused by the limiter, or the client went away mid-stream: neither
+        # an upstream failure nor a success
+        upstream_breaker.release_probe(admission)
+        raise
+    except Exception as e:
+        if started:
+            raise
+        for section in stream_fallback(step_id, client_data, e):
+            yield 'template', section
+
+
+def upstream_busy_response(error):
+    """429/503 with Retry-After for a call the upstream limiter refused"""
+    return error.status, {'success': False, 'error': str(error), 'retryAfter': error.retry_after}, {
+        'Retry-After': str(error.retry_after)
+    }
+
+
+async def run_in_app(app, func, *args):
+    """Run blocking ``func(*args)`` on a worker thread inside an app context"""
+    def call():
+        with app.app_context():
+            return func(*args)
+    return await asyncio.to_thread(call)
@@ -0,0 +1,178 @@
+import json
+from datetime import datetime
+from flask import Blueprint, jsonify, request
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import selectinload
+from src.models.document import Document
+from src.models.job import GenerationJob, GenerationJobItem
+from src.models.user import db
+from src.routes.eia_docs import generate_step_document
+from src.services.client_context import client_contexts
+from src.services.job_runner import JobRunner
+
+jobs_bp = Blueprint('jobs', __name__)
+
+job_runner = JobRunner(generate_step_document)
+
+MAX_JOB_ITEMS = 10000
+MAX_PAGE_SIZE = 200
+
+@jobs_bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a batch of (client, step) generation items and return the job ID
+
+    The body is either ``{"items": [{"clientData": {...}, "stepId": "step1"}, ...]}``
+    or ``{"clients": [{...}, ...], "stepIds": ["step1", ...]}`` for every
+    combination of clients and steps. Stored clients can be given as
+    ``clientId`` in an item, or in a ``clientIds`` list; their current
+    ``clientData`` is what the job generates from.
+    """
+    data = request.get_json(silent=True) or {}
+    error = job_request_error(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    stored = {}
+    client_ids = [item.get('clientId') for item in data['items']] if 'items' in data else data.get('clientIds', [])
+    for client_id in client_ids:
+        if client_id is not None and client_id not in stored:
+            stored[client_id] = client_contexts.get(client_id)
+            if stored[client_id] is None:
+                return jsonify({'error': f'Client {client_id} not found'}), 404
+
+    if 'items' in data:
+        pairs = [(stored[item['clientId']] if item.get('clientId') is not None else item.get('clientData') or {},
+                  item.get('stepId', '')) for item in data['items']]
+    else:
+        clients = data.get('clients', []) + [stored[client_id] for client_id in client_ids if client_id is not None]
+        pairs = [(client, step_id) for client in clients for step_id in data.get('stepIds', [])]
+
+    if not pairs:
+        return jsonify({'error': 'At least one (clientData, stepId) item is required'}), 400
+
+    if len(pairs) > MAX_JOB_ITEMS:
+        return jsonify({'error': f'A job may contain at most {MAX_JOB_ITEMS} items'}), 400
+
+    for client_data, step_id in pairs:
+        if not isinstance(client_data, dict) or not client_data.get('name'):
+            return jsonify({'error': 'Client name is required for every item'}), 400
+        if not step_id:
+            return jsonify({'error': 'Step ID is required for every item'}), 400
+
+    job = GenerationJob(total_items=len(pairs))
+    db.session.add(job)
+    db.session.flush()
+    db.session.execute(GenerationJobItem.__table__.insert(), [
+        {
+            'job_id': job.id,
+            'step_id': step_id,
+            'client_name': client_data['name'],
+            'client_data': json.dumps(client_data),
+            'status': 'pending',
+            'attempts': 0
+        }
+        for client_data, step_id in pairs
+    ])
+    db.session.commit()
+    job_runner.notify()
+    return jsonify(job.to_dict({'pending': len(pairs)})), 202
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = db.get_or_404(GenerationJob, job_id)
+    return jsonify(job.to_dict(item_counts(job_id)))
+
+@jobs_bp.route('/jobs/<job_id>/items', methods=['GET'])
+def get_job_items(job_id):
+    """Page through a job's items, ordered by item ID (``after`` is the last ID seen)"""
+    db.get_or_404(GenerationJob, job_id)
+    limit = max(1, min(request.args.get('limit', 50, type=int), MAX_PAGE_SIZE))
+    after = request.args.get('after', 0, type=int)
+    status = request.args.get('status')
+    include_content = request.args.get('includeContent', 'false').lower() == 'true'
+
+    query = select(GenerationJobItem).where(
+        GenerationJobItem.job_id == job_id,
+        GenerationJobItem.id > after
+    ).order_by(GenerationJobItem.id).limit(limit)
+    if status:
+        query = query.where(GenerationJobItem.status == status)
+    if include_content:
+        query = query.options(selectinload(GenerationJobItem.document).undefer(Document.content_data))
+
+    items = db.session.execute(query).scalars().all()
+    return jsonify({
+        'items': [item.to_dict(include_content) for item in items],
+        'nextAfter': items[-1].id if len(items) == limit else None
+    })
+
+@jobs_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a job; items already running finish (without retries), pending items are skipped"""
+    job = db.get_or_404(GenerationJob, job_id)
+    if job.cancelled_at is None:
+        job.cancelled_at = datetime.utcnow()
+        db.session.execute(
+            update(GenerationJobItem)
+            .where(GenerationJobItem.job_id == job_id, GenerationJobItem.status == 'pending')
+            .values(status='cancelled')
+        )
+        db.session.commit()
+    return jsonify(job.to_dict(item_counts(job_id)))
+
+@jobs_bp.route('/jobs/<job_id>/retry-failed', methods=['POST'])
+def retry_failed_items(job_id):
+    """Re-queue failed items (and, with ``includeTemplate``, template fallbacks)"""
+    job = db.get_or_404(GenerationJob, job_id)
+    if job.cancelled_at is not None:
+        return jsonify({'error': 'Job has been cancelled'}), 409
+
+    data = request.get_json(silent=True) or {}
+    retryable = GenerationJobItem.status == 'failed'
+    if data.get('includeTemplate'):
+        retryable = retryable | ((GenerationJobItem.status == 'succeeded') & (GenerationJobItem.source == 'template'))
+
+    result = db.session.execute(
+        update(GenerationJobItem)
+        .where(GenerationJobItem.job_id == job_id, retryable)
+        .values(status='pending', attempts=0, error=None, claimed_by=None, claimed_at=None, finished_at=None)
+    )
+    db.session.commit()
+    job_runner.notify()
+    response = job.to_dict(item_counts(job_id))
+    response['requeued'] = result.rowcount
+    return jsonify(response)
+
+def job_request_error(data):
+    """Validation error for the shape of a job body, or None"""
+    if not isinstance(data, dict):
+        return 'A JSON object is required'
+    if 'items' in data:
+        items = data['items']
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return 'items must be a list of objects'
+        client_ids = [item.get('clientId') for item in items]
+        step_ids = [item.get('stepId', '') for item in items]
+    else:
+        client_ids = data.get('clientIds', [])
+        step_ids = data.get('stepIds', [])
+        if not isinstance(client_ids, list):
+            return 'clientIds must be a list of client IDs'
+        if not isinstance(data.get('clients', []), list):
+            return 'clients must be a list of objects'
+        if not isinstance(step_ids, list):
+            return 'stepIds must be a list of step IDs'
+    if not all(client_id is None or (isinstance(client_id, (int, str)) and not isinstance(client_id, bool))
+               for client_id in client_ids):
+        return 'clientId must be a client ID'
+    if not all(isinstance(step_id, str) for step_id in step_ids):
+        return 'stepId must be a string'
+    return None
+
+def item_counts(job_id):
+    rows = db.session.execute(
+        select(GenerationJobItem.status, func.count())
+        .where(GenerationJobItem.job_id == job_id)
+        .group_by(GenerationJobItem.status)
+    ).all()
+    return dict(rows)
@@ -1,12 +1,92 @@
 from flask import Blueprint, jsonify, request
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from src.models.user import User, db
 
 user_bp = Blueprint('user', __name__)
 
+MAX_PAGE_SIZE = 500
+MAX_BULK_USERS = 5000
+USER_FIELDS = ('id', 'username', 'email')
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """Page through users ordered by ID (``after`` is the last ID seen)
+
+    ``fields`` (comma-separated) limits the columns selected and returned;
+    ``id`` is always included.
+    """
+    limit = max(1, min(request.args.get('limit', 100, type=int), MAX_PAGE_SIZE))
+    after = request.args.get('after', 0, type=int)
+    fields = request.args.get('fields')
+    if fields:
+        fields = ['id'] + [field for field in dict.fromkeys(fields.split(',')) if field and field != 'id']
+        unknown = [field for field in fields if field not in USER_FIELDS]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    else:
+        fields = list(USER_FIELDS)
+
+    rows = db.session.execute(
+        select(*[getattr(User, field) for field in fields])
+        .where(User.id > after)
+        .order_by(User.id)
+        .limit(limit)
+    ).all()
+    return jsonify({
+        'users': [row._asdict() for row in rows],
+        'nextAfter': rows[-1].id if len(rows) == limit else None
+    })
+
+@user_bp.route('/users/bulk', methods=['POST'])
+def create_users_bulk():
+    """Create many users in one transaction; nothing is created if any row conflicts"""
+    rows, error = bulk_user_rows(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+    try:
+        ids = db.session.execute(insert(User).returning(User.id, sort_by_parameter_order=True), rows).scalars().all()
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'A username or email already exists'}), 409
+    return jsonify({'created': len(ids), 'ids': ids}), 201
+
+@user_bp.route('/users/bulk', methods=['PUT'])
+def upsert_users_bulk():
+    """Create or update many users by username in one transaction"""
+    rows, error = bulk_user_rows(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+    statement = sqlite_insert(User)
+    statement = statement.on_conflict_do_update(
+        index_elements=[User.username],
+        set_={'email': statement.excluded.email}
+    )
+    try:
+        db.session.execute(statement, rows)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'An email already belongs to another user'}), 409
+    return jsonify({'upserted': len(rows)})
+
+def bulk_user_rows(data):
+    """Validate a ``{"users": [{"username": ..., "email": ...}, ...]}`` body"""
+    users = data.get('users') if isinstance(data, dict) else None
+    if not isinstance(users, list) or not users:
+        return None, 'users must be a non-empty list'
+    if len(users) > MAX_BULK_USERS:
+        return None, f'At most {MAX_BULK_USERS} users per request'
+    rows = []
+    for user in users:
+        if not isinstance(user, dict) or not user.get('username') or not user.get('email'):
+            return None, 'Every user needs a username and an email'
+        rows.append({'username': str(user['username']), 'email': str(user['email'])})
+    if len({row['username'] for row in rows}) != len(rows):
+        return None, 'Usernames must be unique within a request'
+    return rows, None
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -0,0 +1,223 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from src.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+BREAKER_CONFIG_DEFAULTS = {
+    'EIA_BREAKER_WINDOW_SECONDS': 60.0,
+    'EIA_BREAKER_MIN_CALLS': 5,
+    'EIA_BREAKER_ERROR_RATE': 0.5,
+    'EIA_BREAKER_SLOW_CALL_SECONDS': 30.0,
+    'EIA_BREAKER_SLOW_CALL_RATE': 0.8,
+    'EIA_BREAKER_OPEN_SECONDS': 30.0,
+    'EIA_BREAKER_HALF_OPEN_PROBES': 2,
+}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling upstream while the circuit is open."""
+
+
+class Admission:
+    """A call let through by ``CircuitBreaker.allow_request``.
+
+    ``probe`` is true when the call holds one of the half-open probe slots;
+    ``epoch`` counts the breaker's state transitions at admission.
+    """
+    __slots__ = ('probe', 'epoch')
+
+    def __init__(self, probe, epoch):
+        self.probe = probe
+        self.epoch = epoch
+
+
+class CircuitBreaker:
+    """Process-wide circuit breaker over a sliding time window of calls.
+
+    The circuit opens once at least ``EIA_BREAKER_MIN_CALLS`` calls in the
+    window have an error rate or slow-call rate above its threshold. While
+    open every call is rejected immediately. After ``EIA_BREAKER_OPEN_SECONDS``
+    the circuit goes half-open and lets up to ``EIA_BREAKER_HALF_OPEN_PROBES``
+    real requests through as probes: if they all succeed it closes, and any
+    probe failure re-opens it. A result only counts in the state its call
+    was admitted in: calls still running from before a transition are
+    ignored when they finish.
+    """
+
+    def __init__(self, name, app=None):
+        self.name = name
+        self._settings = dict(BREAKER_CONFIG_DEFAULTS)
+        self._lock = threading.Lock()
+        self._calls = deque()
+        self._state = CLOSED
+        self._epoch = 0
+        self._opened_at = None
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._rejected = 0
+        self._transitions = deque(maxlen=20)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read breaker settings from app config (falling back to the environment)."""
+        for key, default in BREAKER_CONFIG_DEFAULTS.items():
+            value = app.config.get(key, os.environ.get(key, default))
+            app.config[key] = type(default)(value)
+            self._settings[key] = app.config[key]
+        metrics.gauge(
+            'eia_upstream_circuit_state',
+            f'State of the {self.name} circuit breaker (1 for the current state)',
+            lambda: {(('state', state),): int(state == self.state) for state in (CLOSED, OPEN, HALF_OPEN)}
+        )
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def allow_request(self):
+        """Return an ``Admission`` if a call may go upstream now (a probe if half-open), else None."""
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            if self._state == CLOSED:
+                return Admission(False, self._epoch)
+            if self._state == HALF_OPEN and self._probes_in_flight < self._settings['EIA_BREAKER_HALF_OPEN_PROBES']:
+                self._probes_in_flight += 1
+                return Admission(True, self._epoch)
+            self._rejected += 1
+            return None
+
+    def record_success(self, admission, latency):
+        self._record(admission, True, latency)
+
+    def record_failure(self, admission, latency):
+        self._record(admission, False, latency)
+
+    def release_probe(self, admission):
+        """Give back ``admission``'s probe slot without a result, for calls abandoned by their client.
+
+        A no-op unless the call took a probe slot in the current half-open
+        period: slots are reset on every transition.
+        """
+        with self._lock:
+            if admission is not None and admission.probe and admission.epoch == self._epoch:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    def call(self, func, *args, **kwargs):
+        """Run ``func`` through the breaker, raising CircuitOpenError when open."""
+        admission = self.allow_request()
+        if admission is None:
+            raise CircuitOpenError(f'{self.name} circuit is open')
+        started = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record_failure(admission, time.monotonic() - started)
+            raise
+        self.record_success(admission, time.monotonic() - started)
+        return result
+
+    def status(self):
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+            self._prune(now)
+            calls = len(self._calls)
+            failures = sum(1 for _, ok, _ in self._calls if not ok)
+            slow = sum(1 for _, _, is_slow in self._calls if is_slow)
+            return {
+                'name': self.name,
+                'state': self._state,
+                'windowCalls': calls,
+                'windowFailures': failures,
+                'windowSlowCalls': slow,
+                'errorRate': round(failures / calls, 4) if calls else 0.0,
+                'slowCallRate': round(slow / calls, 4) if calls else 0.0,
+                'rejected': self._rejected,
+                'retryAfterSeconds': self._retry_after(now),
+                'transitions': list(self._transitions),
+                'settings': dict(self._settings),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._transition(CLOSED, 'manual reset')
+
+    def _record(self, admission, ok, latency):
+        now = time.monotonic()
+        slow = latency >= self._settings['EIA_BREAKER_SLOW_CALL_SECONDS']
+        with self._lock:
+            if admission.epoch != self._epoch:
+                # Admitted before the last transition: a slow call from the
+                # closed period says nothing about whether upstream recovered
+                return
+            if admission.probe:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                if not ok or slow:
+                    self._transition(OPEN, 'probe failed' if not ok else 'probe was slow')
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self._settings['EIA_BREAKER_HALF_OPEN_PROBES']:
+                    self._calls.clear()
+                    self._transition(CLOSED, 'probes succeeded')
+                return
+            self._calls.append((now, ok, slow))
+            self._prune(now)
+            if self._state == CLOSED:
+                self._evaluate()
+
+    def _evaluate(self):
+        calls = len(self._calls)
+        if calls < self._settings['EIA_BREAKER_MIN_CALLS']:
+            return
+        failures = sum(1 for _, ok, _ in self._calls if not ok)
+        slow = sum(1 for _, _, is_slow in self._calls if is_slow)
+        if failures / calls >= self._settings['EIA_BREAKER_ERROR_RATE']:
+            self._transition(OPEN, f'error rate {failures}/{calls}')
+        elif slow / calls >= self._settings['EIA_BREAKER_SLOW_CALL_RATE']:
+            self._transition(OPEN, f'slow call rate {slow}/{calls}')
+
+    def _maybe_half_open(self, now):
+        if self._state == OPEN and now - self._opened_at >= self._settings['EIA_BREAKER_OPEN_SECONDS']:
+            self._transition(HALF_OPEN, 'open interval elapsed')
+
+    def _prune(self, now):
+        horizon = now - self._settings['EIA_BREAKER_WINDOW_SECONDS']
+        while self._calls and self._calls[0][0] < horizon:
+            self._calls.popleft()
+
+    def _retry_after(self, now):
+        if self._state != OPEN:
+            return 0
+        return max(round(self._settings['EIA_BREAKER_OPEN_SECONDS'] - (now - self._opened_at), 1), 0)
+
+    def _transition(self, state, reason):
+        previous, self._state = self._state, state
+        self._epoch += 1
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        self._transitions.append({
+            'from': previous,
+            'to': state,
+            'reason': reason,
+            'at': datetime.utcnow().isoformat()
+        })
+        logger.warning('Circuit %s: %s -> %s (%s)', self.name, previous, state, reason)
+
+
+upstream_breaker = CircuitBreaker('upstream-model')
@@ -0,0 +1,124 @@
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from src.models.client import Client
+from src.models.user import db
+from src.services.metrics import metrics
+
+CLIENT_CONTEXT_CONFIG_DEFAULTS = {
+    # Stored clients whose resolved prompt context is kept in this process
+    'EIA_CLIENT_CONTEXT_MAX_ENTRIES': 4096,
+}
+
+# clientData fields that feed the prompts, with the defaults used when missing
+PROMPT_CLIENT_FIELDS = {
+    'name': 'Michael Frame',
+    'medicaidId': '529614220',
+    'dateOfBirth': '[Protected Health Information]',
+    'guardian': '[As documented in referral]',
+    'placement': '[Current placement facility]',
+    'referralSource': '[Verified referral source]',
+    'serviceRequests': 'Comprehensive behavioral health services',
+    'urgencyLevel': 'standard'
+}
+
+context_lookups = metrics.counter('eia_client_context_lookups_total', 'Stored client lookups by generation requests',
+                                  ('outcome',))
+
+
+class ClientData(dict):
+    """``clientData`` of a stored client, with its prompt context already resolved.
+
+    Shared between requests through the cache, so treat it as read-only.
+    """
+
+    def __init__(self, data, client_id, version):
+        super().__init__(data)
+        self.client_id = client_id
+        self.version = version
+        self.context = _resolve(data)
+
+
+def normalize_client_context(client_data):
+    """Resolve the prompt's clientData fields, substituting defaults for missing ones"""
+    if isinstance(client_data, ClientData):
+        return dict(client_data.context)
+    return _resolve(client_data)
+
+
+def _resolve(client_data):
+    return {field: str(client_data.get(field, default)) for field, default in PROMPT_CLIENT_FIELDS.items()}
+
+
+class ClientContextCache:
+    """Per-process LRU of stored clients as ``ClientData``.
+
+    Every lookup reads the client's ``version`` (a primary-key lookup of one
+    column) and reloads the record only when it changed, so an update made
+    through any worker process is seen by the next request everywhere.
+    Updates through this process also evict the entry straight away.
+    """
+
+    def __init__(self, app=None):
+        self._settings = dict(CLIENT_CONTEXT_CONFIG_DEFAULTS)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {'hits': 0, 'misses': 0, 'stale': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, default in CLIENT_CONTEXT_CONFIG_DEFAULTS.items():
+            value = app.config.get(key, os.environ.get(key, default))
+            app.config[key] = type(default)(value)
+            self._settings[key] = app.config[key]
+        app.extensions['client_contexts'] = self
+
+    def get(self, client_id):
+        """``ClientData`` of the stored client, or None if there is none. Needs an app context."""
+        try:
+            client_id = int(client_id)
+        except (TypeError, ValueError):
+            return None
+        version = db.session.execute(select(Client.version).where(Client.id == client_id)).scalar()
+        with self._lock:
+            entry = self._entries.get(client_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(client_id)
+                self._stats['hits'] += 1
+                context_lookups.inc(outcome='hit')
+                return entry
+            stale = entry is not None
+            if stale:
+                del self._entries[client_id]
+        client = db.session.get(Client, client_id, populate_existing=True) if version is not None else None
+        if client is None:
+            context_lookups.inc(outcome='not_found')
+            return None
+
+        entry = ClientData(client.client_data, client.id, client.version)
+        with self._lock:
+            self._stats['stale' if stale else 'misses'] += 1
+            self._entries[client_id] = entry
+            while len(self._entries) > self._settings['EIA_CLIENT_CONTEXT_MAX_ENTRIES']:
+                self._entries.popitem(last=False)
+        context_lookups.inc(outcome='stale' if stale else 'miss')
+        return entry
+
+    def invalidate(self, client_id):
+        with self._lock:
+            self._entries.pop(client_id, None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        stats['pid'] = os.getpid()
+        stats['settings'] = dict(self._settings)
+        return stats
+
+
+client_contexts = ClientContextCache()
@@ -0,0 +1,73 @@
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DATABASE_CONFIG_DEFAULTS = {
+    # Connections kept per process; sized for gunicorn's request threads plus
+    # the job and upgrade workers
+    'EIA_DB_POOL_SIZE': 16,
+    'EIA_DB_MAX_OVERFLOW': 8,
+    'EIA_DB_POOL_TIMEOUT': 10.0,
+    'EIA_SQLITE_JOURNAL_MODE': 'WAL',
+    'EIA_SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'EIA_SQLITE_SYNCHRONOUS': 'NORMAL',
+}
+
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+
+class DatabaseTuning:
+    """Engine pool sizing and SQLite pragmas for concurrent web use.
+
+    In WAL mode readers no longer block the writer (or each other), and a
+    writer waits up to the busy timeout for another process's write lock
+    instead of failing straight away with "database is locked".
+    ``synchronous=NORMAL`` is durable in WAL mode except for the last
+    transactions before a power loss. Call ``init_app`` before ``db.init_app``
+    so the pool options are in place when the engine is created.
+    """
+
+    def __init__(self, app=None):
+        self._settings = dict(DATABASE_CONFIG_DEFAULTS)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, default in DATABASE_CONFIG_DEFAULTS.items():
+            value = app.config.get(key, os.environ.get(key, default))
+            app.config[key] = type(default)(value)
+            self._settings[key] = app.config[key]
+        if self._settings['EIA_SQLITE_JOURNAL_MODE'].upper() not in JOURNAL_MODES:
+            raise ValueError(f"EIA_SQLITE_JOURNAL_MODE must be one of {', '.join(JOURNAL_MODES)}")
+        if self._settings['EIA_SQLITE_SYNCHRONOUS'].upper() not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"EIA_SQLITE_SYNCHRONOUS must be one of {', '.join(SYNCHRONOUS_LEVELS)}")
+
+        options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+        # In-memory SQLite uses a single shared connection; pool options do not apply
+        if ':memory:' not in uri and uri not in ('sqlite://', 'sqlite:///'):
+            options.setdefault('pool_size', self._settings['EIA_DB_POOL_SIZE'])
+            options.setdefault('max_overflow', self._settings['EIA_DB_MAX_OVERFLOW'])
+            options.setdefault('pool_timeout', self._settings['EIA_DB_POOL_TIMEOUT'])
+        app.extensions['database_tuning'] = self
+
+    def apply_pragmas(self, dbapi_connection):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA busy_timeout = {int(self._settings['EIA_SQLITE_BUSY_TIMEOUT_MS'])}")
+            cursor.execute(f"PRAGMA journal_mode = {self._settings['EIA_SQLITE_JOURNAL_MODE'].upper()}")
+            cursor.execute(f"PRAGMA synchronous = {self._settings['EIA_SQLITE_SYNCHRONOUS'].upper()}")
+        finally:
+            cursor.close()
+
+
+database_tuning = DatabaseTuning()
+
+
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        database_tuning.apply_pragmas(dbapi_connection)
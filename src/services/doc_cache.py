@@ -0,0 +1,254 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.cache import CachedDocument
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONFIG_DEFAULTS = {
+    'EIA_CACHE_ENABLED': 1,
+    'EIA_CACHE_TTL_SECONDS': 86400,
+    'EIA_CACHE_MEMORY_MAX_ENTRIES': 256,
+    'EIA_CACHE_MEMORY_MAX_BYTES': 16 * 1024 * 1024,
+    'EIA_CACHE_DB_MAX_ENTRIES': 20000,
+}
+
+# How a request may interact with the cache: read and write, skip it
+# entirely, or skip the read but store the fresh result.
+CACHE_MODES = ('use', 'bypass', 'refresh')
+
+# Run the persistent tier's size-bounded eviction once per this many stores
+DB_EVICTION_INTERVAL = 50
+
+
+def cache_key(step_id, context, system_prompt, model, temperature, max_tokens, prompt_version, day=None):
+    """Stable content hash for a generation request.
+
+    ``context`` is the normalized, default-resolved client context that feeds
+    the prompt. The prompts embed the current date, so the key includes the
+    local calendar day: a document generated yesterday is never served today
+    and entries from earlier days simply age out.
+    """
+    payload = {
+        'step': step_id,
+        'context': context,
+        'system': hashlib.sha256(system_prompt.encode('utf-8')).hexdigest(),
+        'model': model,
+        'temperature': temperature,
+        'maxTokens': max_tokens,
+        'promptVersion': prompt_version,
+        'day': (day or date.today()).isoformat(),
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def prompt_key(prompt, system_prompt, model, temperature, max_tokens, prompt_version):
+    """Stable content hash of a rendered prompt and the parameters it is sent with.
+
+    Unlike ``cache_key`` this is not tied to the calendar day: a prompt that
+    embeds the date changes with it anyway.
+    """
+    payload = {
+        'prompt': prompt,
+        'system': hashlib.sha256(system_prompt.encode('utf-8')).hexdigest(),
+        'model': model,
+        'temperature': temperature,
+        'maxTokens': max_tokens,
+        'promptVersion': prompt_version,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class MemoryLRU:
+    """Thread-safe LRU bounded by entry count and total content size, with TTL."""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def set(self, key, document_type, content, expires_at):
+        size = len(content)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (document_type, content, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+
+class DocumentCache:
+    """Two-tier cache of generated documents.
+
+    Lookups try the per-process LRU first, then the ``cached_document`` table
+    in app.db, which every worker shares. Entries expire after
+    ``EIA_CACHE_TTL_SECONDS``; the table is trimmed to
+    ``EIA_CACHE_DB_MAX_ENTRIES`` rows, oldest first.
+    """
+
+    def __init__(self, app=None):
+        self._settings = dict(CACHE_CONFIG_DEFAULTS)
+        self.memory = MemoryLRU(self._settings['EIA_CACHE_MEMORY_MAX_ENTRIES'],
+                                self._settings['EIA_CACHE_MEMORY_MAX_BYTES'])
+        self._counters_lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ('memory_hits', 'db_hits', 'misses', 'stores', 'bypasses', 'refreshes', 'db_evictions'), 0
+        )
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read cache settings from app config (falling back to the environment)."""
+        for key, default in CACHE_CONFIG_DEFAULTS.items():
+            value = app.config.get(key, os.environ.get(key, default))
+            app.config[key] = type(default)(value)
+            self._settings[key] = app.config[key]
+        self.memory = MemoryLRU(self._settings['EIA_CACHE_MEMORY_MAX_ENTRIES'],
+                                self._settings['EIA_CACHE_MEMORY_MAX_BYTES'])
+        app.extensions['document_cache'] = self
+
+    @property
+    def enabled(self):
+        return bool(self._settings['EIA_CACHE_ENABLED'])
+
+    def get(self, key, mode='use'):
+        """Return ``(document_type, content)`` or None; requires an app context."""
+        if not self.enabled:
+            return None
+        if mode != 'use':
+            self._count('bypasses' if mode == 'bypass' else 'refreshes')
+            return None
+
+        hit = self.memory.get(key)
+        if hit is not None:
+            self._count('memory_hits')
+            return hit
+
+        row = db.session.execute(
+            select(CachedDocument.document_type, CachedDocument.content, CachedDocument.expires_at)
+            .where(CachedDocument.key == key, CachedDocument.expires_at > datetime.utcnow())
+        ).first()
+        if row is None:
+            self._count('misses')
+            return None
+
+        self._count('db_hits')
+        remaining = (row.expires_at - datetime.utcnow()).total_seconds()
+        self.memory.set(key, row.document_type, row.content, time.time() + remaining)
+        return row.document_type, row.content
+
+    def set(self, key, document_type, content, mode='use'):
+        """Store a document in both tiers unless the request bypasses the cache."""
+        if not self.enabled or mode == 'bypass':
+            return
+        ttl = self._settings['EIA_CACHE_TTL_SECONDS']
+        self.memory.set(key, document_type, content, time.time() + ttl)
+
+        now = datetime.utcnow()
+        values = {
+            'key': key,
+            'document_type': document_type,
+            'content': content,
+            'size': len(content),
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=ttl),
+        }
+        statement = insert(CachedDocument).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[CachedDocument.key],
+            set_={name: statement.excluded[name] for name in values if name != 'key'}
+        )
+        try:
+            db.session.execute(statement)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning('Could not persist cache entry: %s', e)
+            return
+
+        stores = self._count('stores')
+        if stores % DB_EVICTION_INTERVAL == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop expired rows, then the oldest rows beyond the size bound."""
+        removed = db.session.execute(
+            delete(CachedDocument).where(CachedDocument.expires_at <= datetime.utcnow())
+        ).rowcount
+        overflow = db.session.scalar(select(func.count()).select_from(CachedDocument)) \
+            - self._settings['EIA_CACHE_DB_MAX_ENTRIES']
+        if overflow > 0:
+            oldest = select(CachedDocument.key).order_by(CachedDocument.created_at).limit(overflow)
+            removed += db.session.execute(
+                delete(CachedDocument).where(CachedDocument.key.in_(oldest))
+            ).rowcount
+        db.session.commit()
+        if removed:
+            self._count('db_evictions', removed)
+        return removed
+
+    def stats(self):
+        with self._counters_lock:
+            stats = dict(self._counters)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['memory_hits'] + stats['db_hits']) / lookups, 4) if lookups else None
+        stats['memory_entries'] = len(self.memory)
+        stats['memory_bytes'] = self.memory.size_bytes
+        stats['memory_evictions'] = self.memory.evictions
+        stats['enabled'] = self.enabled
+        return stats
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self._counters[name] += amount
+            return self._counters[name]
+
+
+document_cache = DocumentCache()
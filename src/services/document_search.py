@@ -0,0 +1,179 @@
+import logging
+import re
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import column, event, func, inspect, literal_column, select, table, text
+from sqlalchemy.exc import OperationalError
+
+from src.models.document import Document, decompress_content
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'document_fts'
+
+# rowid is the document ID, so search hits join straight back to document
+FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(content, tokenize = 'porter unicode61 remove_diacritics 2')"
+)
+
+fts = table(FTS_TABLE, column('rowid'), column('content'))
+
+SNIPPET_TOKENS = 24
+REINDEX_BATCH_SIZE = 500
+
+# Plain queries match every word (as a prefix for the last one, so
+# search-as-you-type works); FTS5 syntax is only used when asked for.
+WORD = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchQueryError(ValueError):
+    """Raised for search text FTS5 cannot parse."""
+
+
+class DocumentSearch:
+    """SQLite FTS5 index over stored document content.
+
+    The index lives in ``app.db`` next to the ``document`` table and is kept
+    in sync by mapper events inside the same transaction that writes the
+    document, so a committed document is always searchable (documents written
+    before the index is created are logged and skipped). Content is stored
+    compressed in ``document``; the index keeps its own plain-text copy,
+    which ``snippet()`` needs.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['document_search'] = self
+        app.cli.add_command(reindex_documents_command)
+
+    def create_index(self):
+        """Create the FTS table if missing (call inside an app context)."""
+        if db.engine.dialect.name != 'sqlite':
+            logger.warning('Full-text search needs SQLite FTS5; document search is disabled')
+            return False
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql(FTS_DDL)
+        return True
+
+    def search(self, query_text, step_id=None, document_type=None, created_from=None, created_to=None,
+               limit=20, offset=0, syntax='plain'):
+        """Return ``(document, snippet, score)`` rows ranked by BM25, best first."""
+        match = query_text if syntax == 'fts' else plain_match_expression(query_text)
+        if not match:
+            return []
+        rank = func.bm25(literal_column(FTS_TABLE))
+        snippet = func.snippet(literal_column(FTS_TABLE), 0, '[', ']', '…', SNIPPET_TOKENS)
+        query = (
+            select(Document, snippet, rank)
+            .join(fts, fts.c.rowid == Document.id)
+            .where(literal_column(FTS_TABLE).op('MATCH')(match))
+            .order_by(rank)
+            .limit(limit)
+            .offset(offset)
+        )
+        if step_id:
+            query = query.where(Document.step_id == step_id)
+        if document_type:
+            query = query.where(Document.document_type == document_type)
+        if created_from is not None:
+            query = query.where(Document.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(Document.created_at < created_to)
+        try:
+            return db.session.execute(query).all()
+        except OperationalError as e:
+            db.session.rollback()
+            if syntax == 'fts':
+                raise SearchQueryError(str(e.orig)) from e
+            raise
+
+    def rebuild(self, batch_size=REINDEX_BATCH_SIZE):
+        """Rebuild the whole index from the document table; returns the document count."""
+        self.create_index()
+        indexed = 0
+        with db.engine.begin() as connection:
+            connection.execute(fts.delete())
+            last_id = 0
+            while True:
+                rows = connection.execute(
+                    select(Document.id, Document.content_encoding, Document.content_data)
+                    .where(Document.id > last_id)
+                    .order_by(Document.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                connection.execute(fts.insert(), [
+                    {'rowid': row.id, 'content': decompress_content(row.content_data, row.content_encoding)}
+                    for row in rows
+                ])
+                indexed += len(rows)
+                last_id = rows[-1].id
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+        return indexed
+
+
+def plain_match_expression(query_text):
+    """Turn free text into an FTS5 query matching every word."""
+    words = WORD.findall(query_text or '')
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words[:-1]]
+    terms.append(f'"{words[-1]}"*')
+    return ' '.join(terms)
+
+
+# Databases seen to have the FTS table; mapper events run on every document
+# write, so each database is only checked until the table exists
+_indexed_databases = set()
+
+
+def _indexed(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    database = str(connection.engine.url)
+    if database in _indexed_databases:
+        return True
+    if not inspect(connection).has_table(FTS_TABLE):
+        logger.warning('Full-text index %s is missing, document not indexed: run `flask --app src.main migrate` '
+                       'then `flask --app src.main reindex-documents`', FTS_TABLE)
+        return False
+    _indexed_databases.add(database)
+    return True
+
+
+@event.listens_for(Document, 'after_insert')
+def _index_inserted_document(mapper, connection, target):
+    if _indexed(connection):
+        connection.execute(fts.insert(), {'rowid': target.id, 'content': target.content})
+
+
+@event.listens_for(Document, 'after_update')
+def _reindex_updated_document(mapper, connection, target):
+    if _indexed(connection) and inspect(target).attrs.content_data.history.has_changes():
+        connection.execute(fts.delete().where(fts.c.rowid == target.id))
+        connection.execute(fts.insert(), {'rowid': target.id, 'content': target.content})
+
+
+@event.listens_for(Document, 'after_delete')
+def _unindex_deleted_document(mapper, connection, target):
+    if _indexed(connection):
+        connection.execute(fts.delete().where(fts.c.rowid == target.id))
+
+
+@click.command('reindex-documents')
+@click.option('--batch-size', default=REINDEX_BATCH_SIZE, show_default=True)
+@with_appcontext
+def reindex_documents_command(batch_size):
+    """Rebuild the full-text search index over stored documents."""
+    count = document_search.rebuild(batch_size)
+    click.echo(f'Indexed {count} documents')
+
+
+document_search = DocumentSearch()
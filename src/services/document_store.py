@@ -0,0 +1,108 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from src.models.document import Document, DocumentSection
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+
+def client_key_for(client_data):
+    """Stable identifier for a client: the Medicaid ID, else the normalized name."""
+    medicaid_id = str(client_data.get('medicaidId') or '').strip()
+    if medicaid_id:
+        return f'medicaid:{medicaid_id}'
+    return 'name:' + ' '.join(str(client_data.get('name', '')).lower().split())
+
+
+def save_document(document, client_data, status='final'):
+    """Persist a generated document response; returns its ID, or None on failure."""
+    row = Document(
+        client_key=client_key_for(client_data),
+        client_name=document.get('clientName') or str(client_data.get('name', '')),
+        step_id=document['stepId'],
+        status=status
+    )
+    _apply(row, document)
+    try:
+        db.session.add(row)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning('Could not store generated document: %s', e)
+        return None
+    return row.id
+
+
+def update_document(document_id, document, status='final'):
+    """Replace a stored document's content and metadata (e.g. after an upgrade)."""
+    row = db.session.get(Document, document_id)
+    if row is None:
+        return False
+    row.status = status
+    _apply(row, document)
+    try:
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning('Could not update document %s: %s', document_id, e)
+        return False
+    return True
+
+
+def set_document_status(document_id, status):
+    row = db.session.get(Document, document_id)
+    if row is not None:
+        row.status = status
+        db.session.commit()
+
+
+def load_sections(client_key, step_id, fingerprints):
+    """Stored section texts for a client's step, by fingerprint (missing ones are left out)."""
+    if not fingerprints:
+        return {}
+    rows = db.session.execute(
+        select(DocumentSection.fingerprint, DocumentSection.content).where(
+            DocumentSection.client_key == client_key,
+            DocumentSection.step_id == step_id,
+            DocumentSection.fingerprint.in_(fingerprints)
+        )
+    )
+    return {fingerprint: content for fingerprint, content in rows}
+
+
+def save_sections(client_key, step_id, sections):
+    """Store generated ``(number, fingerprint, content)`` sections for a client's step."""
+    if not sections:
+        return
+    now = datetime.utcnow()
+    statement = insert(DocumentSection).values([
+        {'client_key': client_key, 'step_id': step_id, 'number': number, 'fingerprint': fingerprint,
+         'content': content, 'created_at': now}
+        for number, fingerprint, content in sections
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[DocumentSection.client_key, DocumentSection.step_id, DocumentSection.fingerprint],
+        set_={'content': statement.excluded.content, 'created_at': statement.excluded.created_at}
+    )
+    try:
+        db.session.execute(statement)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning('Could not store generated sections: %s', e)
+
+
+def _apply(row, document):
+    timings = document.get('timings') or {}
+    row.document_type = document['documentType']
+    row.prompt_version = document.get('promptVersion')
+    row.model = document.get('model')
+    row.source = document['source']
+    row.prompt_ms = timings.get('promptMs')
+    row.generation_ms = timings.get('generationMs')
+    row.total_ms = timings.get('totalMs')
+    row.content = document['content']
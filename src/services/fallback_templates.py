@@ -0,0 +1,44 @@
+import os
+from datetime import datetime
+
+from src.services.templates import TemplateRegistry
+
+DEFAULT_FALLBACK_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'eia_templates', 'fallback')
+
+MONTH_NAMES = ('January', 'February', 'March', 'April', 'May', 'June', 'July',
+               'August', 'September', 'October', 'November', 'December')
+
+# Offline documents served when the upstream model is unavailable; see
+# eia_templates/fallback/manifest.json
+fallback_registry = TemplateRegistry(DEFAULT_FALLBACK_DIR, 'EIA_FALLBACK_DIR')
+
+
+def build_fallback_context(client_context, now=None):
+    """Template context from a normalized client context and one timestamp.
+
+    Every date and time in the document comes from the same ``now``, so a
+    document never straddles a minute (or midnight) boundary.
+    """
+    now = now or datetime.now()
+    name = client_context['name']
+    context = dict(client_context)
+    # Formatted by hand: three strftime calls cost more than rendering the document
+    context.update({
+        'currentDate': f'{MONTH_NAMES[now.month - 1]} {now.day:02d}, {now.year}',
+        'currentTime': f"{now.hour % 12 or 12:02d}:{now.minute:02d} {'AM' if now.hour < 12 else 'PM'}",
+        'dateStamp': f'{now.year:04d}{now.month:02d}{now.day:02d}',
+        'nameUpper': name.upper(),
+        'nameCode': name.replace(' ', '').upper()[:4],
+        'nameInitials': ''.join(part[0] for part in name.split()).upper() or 'XX',
+    })
+    return context
+
+
+def render_fallback_document(step_id, client_context, now=None):
+    """Render the offline document for ``step_id`` in one pass."""
+    return fallback_registry.get(step_id).render(build_fallback_context(client_context, now))
+
+
+def iter_fallback_document(step_id, client_context, now=None):
+    """Yield the offline document for ``step_id`` section by section."""
+    return fallback_registry.get(step_id).iter_render(build_fallback_context(client_context, now))
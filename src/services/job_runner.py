@@ -0,0 +1,141 @@
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import exists, or_, select, update
+
+from src.models.job import GenerationJob, GenerationJobItem
+from src.models.user import db
+from src.services.scheduler import batch_origin
+
+logger = logging.getLogger(__name__)
+
+RUNNER_CONFIG_DEFAULTS = {
+    'EIA_JOB_WORKERS': 2,
+    'EIA_JOB_POLL_INTERVAL': 2.0,
+    'EIA_JOB_LEASE_SECONDS': 600,
+    'EIA_JOB_MAX_ATTEMPTS': 3,
+}
+
+
+class JobRunner:
+    """Background workers that drain queued generation job items.
+
+    Items are claimed with a conditional UPDATE, so any number of threads in
+    any number of processes can share the queue without double-processing.
+    A claim is a lease: items left ``running`` by a crashed or restarted
+    process become claimable again once ``EIA_JOB_LEASE_SECONDS`` pass.
+    Items of a cancelled job are never claimed, and an item of a job
+    cancelled while it ran is not retried.
+    Upstream calls made for items are scheduled as batch work.
+    """
+
+    def __init__(self, handler, app=None):
+        self.handler = handler
+        self.app = None
+        self._settings = dict(RUNNER_CONFIG_DEFAULTS)
+        self._threads = []
+        self._pid = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read runner settings from app config (falling back to the environment)."""
+        for key, default in RUNNER_CONFIG_DEFAULTS.items():
+            value = app.config.get(key, os.environ.get(key, default))
+            app.config[key] = type(default)(value)
+            self._settings[key] = app.config[key]
+        self.app = app
+        app.extensions['job_runner'] = self
+
+    def start(self):
+        """Start the worker threads for this process (no-op if already running)."""
+        if self._pid == os.getpid() and any(thread.is_alive() for thread in self._threads):
+            return
+        self._pid = os.getpid()
+        self._stopping.clear()
+        self._threads = []
+        for index in range(self._settings['EIA_JOB_WORKERS']):
+            worker_id = f'{socket.gethostname()}:{os.getpid()}:{index}'
+            thread = threading.Thread(target=self._work, args=(worker_id,), name=f'eia-job-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def notify(self):
+        """Wake idle workers after new items have been queued."""
+        self._wakeup.set()
+
+    def _work(self, worker_id):
+        while not self._stopping.is_set():
+            try:
+                with self.app.app_context():
+                    item_id = self._claim_next(worker_id)
+                    if item_id is not None:
+                        self._process(item_id)
+                        continue
+            except Exception:
+                logger.exception('Job worker %s failed', worker_id)
+            self._wakeup.wait(self._settings['EIA_JOB_POLL_INTERVAL'])
+            self._wakeup.clear()
+
+    def _claim_next(self, worker_id):
+        now = datetime.utcnow()
+        lease_expired = now - timedelta(seconds=self._settings['EIA_JOB_LEASE_SECONDS'])
+        job_active = exists().where(GenerationJob.id == GenerationJobItem.job_id, GenerationJob.cancelled_at.is_(None))
+        claimable = or_(
+            GenerationJobItem.status == 'pending',
+            (GenerationJobItem.status == 'running') & (GenerationJobItem.claimed_at < lease_expired)
+        ) & job_active
+        candidates = db.session.execute(
+            select(GenerationJobItem.id).where(claimable).order_by(GenerationJobItem.id).limit(8)
+        ).scalars().all()
+        for item_id in candidates:
+            result = db.session.execute(
+                update(GenerationJobItem)
+                .where(GenerationJobItem.id == item_id, claimable)
+                .values(
+                    status='running',
+                    claimed_by=worker_id,
+                    claimed_at=now,
+                    attempts=GenerationJobItem.attempts + 1
+                )
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return item_id
+        return None
+
+    def _process(self, item_id):
+        item = db.session.get(GenerationJobItem, item_id)
+        try:
+            with batch_origin():
+                document = self.handler(item.step_id, item.get_client_data())
+        except Exception as e:
+            db.session.rollback()
+            item = db.session.get(GenerationJobItem, item_id)
+            cancelled = db.session.get(GenerationJob, item.job_id).cancelled_at is not None
+            retry = not cancelled and item.attempts < self._settings['EIA_JOB_MAX_ATTEMPTS']
+            logger.warning('Job item %s failed (attempt %s): %s', item_id, item.attempts, e)
+            item.status = 'cancelled' if cancelled else 'pending' if retry else 'failed'
+            item.error = str(e)
+            item.claimed_by = None
+            item.finished_at = None if retry else datetime.utcnow()
+            db.session.commit()
+            return
+        item.status = 'succeeded'
+        item.source = document.get('source')
+        item.document_type = document.get('documentType')
+        item.document_id = document.get('documentId')
+        item.error = None
+        item.finished_at = datetime.utcnow()
+        db.session.commit()
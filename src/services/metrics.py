@@ -0,0 +1,352 @@
+import bisect
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import Response, g
+
+METRICS_CONFIG_DEFAULTS = {
+    # Add a Server-Timing header with per-stage durations to API responses
+    'EIA_SERVER_TIMING': 0,
+    # Directory where each worker process publishes its metrics so /metrics
+    # can report totals for all of them (empty: this process only)
+    'EIA_METRICS_DIR': '',
+    'EIA_METRICS_PUBLISH_SECONDS': 5.0,
+}
+
+# Upstream calls take seconds; prompt and template rendering take microseconds
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# ``step_id`` label of steps outside the tracked ones (see ``Metrics.track_steps``)
+UNKNOWN_STEP = 'unknown'
+
+# Per-request stage timings for Server-Timing, set while a request is handled
+_request_timings = contextvars.ContextVar('eia_request_timings', default=None)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name, self.help, self.labels, self.kind = name, help_text, labels, 'counter'
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {key: value for key, value in self._values.items()}
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.kind = name, help_text, labels, 'histogram'
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def observe(self, value, **labels):
+        self.child(*(labels.get(label, '') for label in self.labels)).observe(value)
+
+    def child(self, *values):
+        """The series for label ``values`` (in ``labels`` order), to observe without building its key again"""
+        key = tuple(str(value) for value in values)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        return HistogramChild(self, series)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: [list(counts), total] for key, (counts, total) in self._values.items()}
+
+
+class HistogramChild:
+    __slots__ = ('_buckets', '_lock', '_counts', '_series')
+
+    def __init__(self, histogram, series):
+        self._buckets = histogram.buckets
+        self._lock = histogram._lock
+        self._counts = series[0]
+        self._series = series
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._series[1] += value
+
+
+class StageTimer:
+    """Context manager returned by ``Metrics.timed``"""
+    __slots__ = ('_metrics', '_stage', '_step_id', '_model', '_labels', '_started')
+
+    def __init__(self, metrics, stage, step_id, model, outcome):
+        self._metrics = metrics
+        self._stage = stage
+        self._step_id = step_id
+        self._model = model
+        self._labels = {'outcome': outcome}
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self._labels
+
+    def __exit__(self, exc_type, exc, traceback):
+        elapsed = time.perf_counter() - self._started
+        outcome = 'error' if exc_type is not None else self._labels['outcome']
+        self._metrics._observe_stage(self._stage, self._step_id, self._model, outcome, elapsed)
+        return False
+
+
+class Metrics:
+    """In-process counters and histograms, exposed in Prometheus text format.
+
+    Observations are a dict lookup and a few additions under a lock. Under
+    gunicorn every worker has its own registry; set ``EIA_METRICS_DIR`` to a
+    directory shared by the workers and each publishes its snapshot there
+    periodically, so ``/metrics`` reports the sum over all live workers.
+    """
+
+    def __init__(self, app=None):
+        self._settings = dict(METRICS_CONFIG_DEFAULTS)
+        self._metrics = {}
+        self._gauges = []
+        self._publisher = None
+        self._publisher_pid = None
+        self._steps = ()
+        self._stage_children = {}
+        self.stage_seconds = self.histogram(
+            'eia_stage_duration_seconds',
+            'Time spent in each stage of document generation',
+            ('stage', 'step_id', 'model', 'outcome')
+        )
+        self.upstream_tokens = self.counter(
+            'eia_upstream_tokens_total',
+            'Tokens reported by upstream in response.usage',
+            ('step_id', 'model', 'kind')
+        )
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, default in METRICS_CONFIG_DEFAULTS.items():
+            value = app.config.get(key, os.environ.get(key, default))
+            app.config[key] = type(default)(value)
+            self._settings[key] = app.config[key]
+        app.extensions['metrics'] = self
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        if self._settings['EIA_SERVER_TIMING']:
+            app.before_request(self._start_request_timings)
+            app.after_request(self._add_server_timing)
+
+    def counter(self, name, help_text, labels=()):
+        return self._metrics.setdefault(name, Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._metrics.setdefault(name, Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, callback):
+        """Report ``callback()`` at scrape time (for the scraped process only)
+
+        The callback returns a number, or a dict mapping label tuples such as
+        ``(('state', 'open'),)`` to numbers.
+        """
+        self._gauges = [gauge for gauge in self._gauges if gauge[0] != name]
+        self._gauges.append((name, help_text, callback))
+
+    def track_steps(self, steps):
+        """Label series by the step IDs in ``steps`` (any container); other step IDs become ``unknown``
+
+        ``step_id`` comes from request bodies, so labelling by it as-is would
+        let clients create any number of series.
+        """
+        self._steps = steps
+
+    def step_label(self, step_id):
+        """``step_id`` as a label value: itself for a tracked step, ``unknown`` otherwise"""
+        if not step_id or (isinstance(step_id, str) and step_id in self._steps):
+            return step_id
+        return UNKNOWN_STEP
+
+    def timed(self, stage, step_id='', model='', outcome='ok'):
+        """Time a block as ``stage``; the dict it yields has an ``outcome`` that may be changed inside it.
+
+        The outcome becomes ``error`` if the block raises. Cheap enough for
+        microsecond stages: label series are looked up once per combination.
+        """
+        return StageTimer(self, stage, step_id, model, outcome)
+
+    def _observe_stage(self, stage, step_id, model, outcome, elapsed):
+        if self._settings['EIA_METRICS_DIR']:
+            self._ensure_publisher()
+        try:
+            child = self._stage_children[stage, step_id, model, outcome]
+        except (KeyError, TypeError):
+            # Keyed by label, not by the step ID from the request body, so
+            # the cache cannot grow past the tracked steps
+            key = (stage, self.step_label(step_id), model, outcome)
+            child = self._stage_children.get(key)
+            if child is None:
+                child = self._stage_children[key] = self.stage_seconds.child(*key)
+        child.observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+    def record_usage(self, usage, step_id='', model=''):
+        if usage is None:
+            return
+        step_id = self.step_label(step_id)
+        self.upstream_tokens.inc(usage.prompt_tokens or 0, step_id=step_id, model=model, kind='prompt')
+        self.upstream_tokens.inc(usage.completion_tokens or 0, step_id=step_id, model=model, kind='completion')
+
+    def metrics_view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+    def render(self):
+        snapshots = [self._snapshot()]
+        directory = self._settings['EIA_METRICS_DIR']
+        if directory:
+            self._ensure_publisher()
+            snapshots.extend(self._read_published(directory))
+        merged = merge_snapshots(snapshots)
+
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for key, value in sorted(merged.get(name, {}).items()):
+                labels = list(zip(metric.labels, key))
+                if metric.kind == 'counter':
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{format_labels(labels + [("le", le)])} {cumulative}')
+                lines.append(f'{name}_sum{format_labels(labels)} {total}')
+                lines.append(f'{name}_count{format_labels(labels)} {cumulative}')
+        for name, help_text, callback in self._gauges:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            value = callback()
+            if isinstance(value, dict):
+                for labels, sample in value.items():
+                    lines.append(f'{name}{format_labels(labels)} {sample}')
+            else:
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def _snapshot(self):
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    @property
+    def server_timing(self):
+        return bool(self._settings['EIA_SERVER_TIMING'])
+
+    def start_request_timings(self):
+        """Collect stage timings in the current context; returns a token for ``finish_request_timings``."""
+        return _request_timings.set([])
+
+    def finish_request_timings(self, token):
+        """Stop collecting; return the Server-Timing header value, or None if nothing was timed."""
+        timings = _request_timings.get()
+        _request_timings.reset(token)
+        if not timings:
+            return None
+        return ', '.join(f'{stage};dur={elapsed * 1000:.2f}' for stage, elapsed in timings)
+
+    def _start_request_timings(self):
+        g.eia_timings_token = self.start_request_timings()
+
+    def _add_server_timing(self, response):
+        token = g.pop('eia_timings_token', None)
+        if token is not None:
+            header = self.finish_request_timings(token)
+            if header:
+                response.headers['Server-Timing'] = header
+        return response
+
+    def _ensure_publisher(self):
+        if self._publisher_pid == os.getpid():
+            return
+        self._publisher_pid = os.getpid()
+        self._publisher = threading.Thread(target=self._publish_forever, name='eia-metrics', daemon=True)
+        self._publisher.start()
+
+    def _publish_forever(self):
+        directory = self._settings['EIA_METRICS_DIR']
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+        while True:
+            snapshot = {name: [[list(key), value] for key, value in series.items()]
+                        for name, series in self._snapshot().items()}
+            with open(path + '.tmp', 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(path + '.tmp', path)
+            time.sleep(self._settings['EIA_METRICS_PUBLISH_SECONDS'])
+
+    def _read_published(self, directory):
+        snapshots = []
+        for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+            pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+            if pid == os.getpid():
+                continue
+            if not pid_alive(pid):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            snapshots.append({name: {tuple(key): value for key, value in series} for name, series in data.items()})
+        return snapshots
+
+
+def merge_snapshots(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for name, series in snapshot.items():
+            target = merged.setdefault(name, {})
+            for key, value in series.items():
+                if key not in target:
+                    target[key] = [list(value[0]), value[1]] if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    counts, total = target[key]
+                    target[key] = [[a + b for a, b in zip(counts, value[0])], total + value[1]]
+                else:
+                    target[key] += value
+    return merged
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+metrics = Metrics()
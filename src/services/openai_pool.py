@@ -0,0 +1,255 @@
+import atexit
+import logging
+import os
+import threading
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# App config keys and their defaults. Every key can also be supplied through
+# an environment variable of the same name.
+POOL_CONFIG_DEFAULTS = {
+    'EIA_UPSTREAM_MAX_CONNECTIONS': 20,
+    'EIA_UPSTREAM_MAX_KEEPALIVE_CONNECTIONS': 10,
+    'EIA_UPSTREAM_KEEPALIVE_EXPIRY': 30.0,
+    'EIA_UPSTREAM_CONNECT_TIMEOUT': 5.0,
+    'EIA_UPSTREAM_READ_TIMEOUT': 60.0,
+    'EIA_UPSTREAM_WRITE_TIMEOUT': 10.0,
+    'EIA_UPSTREAM_POOL_TIMEOUT': 5.0,
+    'EIA_UPSTREAM_MAX_RETRIES': 2,
+    # Connection limit of the asyncio clients used by the ASGI generation
+    # routes (src/asgi.py), where one process holds many calls in flight
+    'EIA_UPSTREAM_ASYNC_MAX_CONNECTIONS': 512,
+    # Connections per asyncio client. httpcore checks every connection of a
+    # pool on each request, which dominates CPU once a pool holds hundreds,
+    # so calls are spread round-robin over several small pools instead.
+    'EIA_UPSTREAM_ASYNC_POOL_SIZE': 32,
+}
+
+
+def is_rate_limited(error):
+    """True if ``error`` is an upstream HTTP 429 (``openai.RateLimitError``).
+
+    Checked by status code so callers need not import openai themselves.
+    """
+    return getattr(error, 'status_code', None) == 429
+
+
+class OpenAIClientPool:
+    """Process-wide shared OpenAI client backed by a keep-alive httpx pool.
+
+    The client is created lazily on first use and rebuilt in a forked child,
+    so sockets are never shared between a pre-fork parent and its workers.
+    ``get_async_client`` likewise shares a few ``AsyncOpenAI`` clients
+    between the coroutines of the process's event loop.
+    """
+
+    def __init__(self, app=None):
+        self._settings = dict(POOL_CONFIG_DEFAULTS)
+        self._api_key = None
+        self._base_url = None
+        self._client = None
+        self._http_client = None
+        self._pid = None
+        self._async_clients = []
+        self._async_http_clients = []
+        self._async_next = 0
+        self._ssl_context = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork_in_child)
+        atexit.register(self.close)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read pool settings from app config (falling back to the environment)."""
+        for key, default in POOL_CONFIG_DEFAULTS.items():
+            value = app.config.get(key, os.environ.get(key, default))
+            app.config[key] = type(default)(value)
+            self._settings[key] = app.config[key]
+        self._api_key = app.config.get('OPENAI_API_KEY', os.environ.get('OPENAI_API_KEY'))
+        self._base_url = app.config.get('OPENAI_API_BASE', os.environ.get('OPENAI_API_BASE'))
+        app.extensions['openai_pool'] = self
+
+    def get_client(self):
+        """Return the shared client, creating it on first use in this process."""
+        client = self._client
+        if client is not None and self._pid == os.getpid():
+            return client
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                self._client = self._build_client()
+                self._pid = os.getpid()
+            return self._client
+
+    def get_async_client(self):
+        """Return one of the shared ``AsyncOpenAI`` clients, round-robin, creating them on first use.
+
+        Call from the event loop that will use it; they are not rebuilt per loop.
+        """
+        if not self._async_clients:
+            total = self._settings['EIA_UPSTREAM_ASYNC_MAX_CONNECTIONS']
+            size = max(1, min(self._settings['EIA_UPSTREAM_ASYNC_POOL_SIZE'], total))
+            count = max(1, total // size)
+            logger.info('Creating %s shared AsyncOpenAI clients in pid %s', count, os.getpid())
+            self._async_clients = [self._build_async_client(size) for _ in range(count)]
+        self._async_next = (self._async_next + 1) % len(self._async_clients)
+        return self._async_clients[self._async_next]
+
+    async def aclose(self):
+        """Close the asyncio clients (call from their event loop)."""
+        clients, self._async_clients, self._async_http_clients = self._async_clients, [], []
+        for client in clients:
+            await client.close()
+
+    def preload(self):
+        """Import the openai modules the first upstream call would otherwise import.
+
+        Also loads the CA bundle once for every client. Safe before forking:
+        no client or connection is created.
+        """
+        self._ssl()
+        # ``client.chat`` imports its resources lazily, on the first call, and
+        # httpx its transport when the first client is built
+        import httpcore
+        import openai.resources.chat
+        import openai.types.chat
+
+    def close(self):
+        """Close the shared client and its connections (owning process only)."""
+        with self._lock:
+            client, self._client = self._client, None
+            if client is not None and self._pid == os.getpid():
+                client.close()
+
+    def stats(self):
+        """Connection-reuse counters for the current process."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['reused_connections'] = max(stats['requests'] - stats['connections_opened'], 0)
+        stats['pid'] = os.getpid()
+        stats['initialized'] = self._client is not None and self._pid == os.getpid()
+        stats['async_clients'] = len(self._async_clients)
+        stats['open_connections'] = 0
+        stats['idle_connections'] = 0
+        http_clients = [self._http_client] if stats['initialized'] else []
+        for http_client in http_clients + self._async_http_clients:
+            pool = getattr(http_client._transport, '_pool', None)
+            for connection in getattr(pool, 'connections', []):
+                stats['open_connections'] += 1
+                if connection.is_idle():
+                    stats['idle_connections'] += 1
+        stats['limits'] = {
+            'max_connections': self._settings['EIA_UPSTREAM_MAX_CONNECTIONS'],
+            'async_max_connections': self._settings['EIA_UPSTREAM_ASYNC_MAX_CONNECTIONS'],
+            'async_pool_size': self._settings['EIA_UPSTREAM_ASYNC_POOL_SIZE'],
+            'max_keepalive_connections': self._settings['EIA_UPSTREAM_MAX_KEEPALIVE_CONNECTIONS'],
+            'keepalive_expiry': self._settings['EIA_UPSTREAM_KEEPALIVE_EXPIRY'],
+        }
+        return stats
+
+    def _build_client(self):
+        import openai
+
+        settings = self._settings
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=settings['EIA_UPSTREAM_MAX_CONNECTIONS'],
+                max_keepalive_connections=settings['EIA_UPSTREAM_MAX_KEEPALIVE_CONNECTIONS'],
+                keepalive_expiry=settings['EIA_UPSTREAM_KEEPALIVE_EXPIRY'],
+            ),
+            timeout=self._timeout(),
+            verify=self._ssl(),
+            event_hooks={'request': [self._on_request]},
+        )
+        self._http_client = http_client
+        logger.info('Creating shared OpenAI client in pid %s', os.getpid())
+        return openai.OpenAI(
+            api_key=self._api_key,
+            base_url=self._base_url,
+            http_client=http_client,
+            timeout=self._timeout(),
+            max_retries=settings['EIA_UPSTREAM_MAX_RETRIES'],
+        )
+
+    def _build_async_client(self, max_connections):
+        import openai
+
+        settings = self._settings
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=settings['EIA_UPSTREAM_KEEPALIVE_EXPIRY'],
+            ),
+            timeout=self._timeout(),
+            verify=self._ssl(),
+            event_hooks={'request': [self._on_async_request]},
+        )
+        self._async_http_clients.append(http_client)
+        return openai.AsyncOpenAI(
+            api_key=self._api_key,
+            base_url=self._base_url,
+            http_client=http_client,
+            timeout=self._timeout(),
+            max_retries=settings['EIA_UPSTREAM_MAX_RETRIES'],
+        )
+
+    def _ssl(self):
+        # Loading the CA bundle is most of the cost of building a client; one
+        # context serves every client, including those of forked children
+        if self._ssl_context is None:
+            self._ssl_context = httpx.create_ssl_context()
+        return self._ssl_context
+
+    def _timeout(self):
+        settings = self._settings
+        return httpx.Timeout(
+            connect=settings['EIA_UPSTREAM_CONNECT_TIMEOUT'],
+            read=settings['EIA_UPSTREAM_READ_TIMEOUT'],
+            write=settings['EIA_UPSTREAM_WRITE_TIMEOUT'],
+            pool=settings['EIA_UPSTREAM_POOL_TIMEOUT'],
+        )
+
+    def _on_request(self, request):
+        with self._stats_lock:
+            self._stats['requests'] += 1
+        request.extensions['trace'] = self._trace
+
+    async def _on_async_request(self, request):
+        with self._stats_lock:
+            self._stats['requests'] += 1
+        request.extensions['trace'] = self._async_trace
+
+    async def _async_trace(self, event_name, info):
+        self._trace(event_name, info)
+
+    def _trace(self, event_name, info):
+        if event_name == 'connection.connect_tcp.complete':
+            with self._stats_lock:
+                self._stats['connections_opened'] += 1
+        elif event_name == 'connection.start_tls.complete':
+            with self._stats_lock:
+                self._stats['tls_handshakes'] += 1
+
+    def _reset_stats(self):
+        self._stats = {'requests': 0, 'connections_opened': 0, 'tls_handshakes': 0}
+
+    def _after_fork_in_child(self):
+        # The parent's client (and any lock it held) must not be used here;
+        # drop them without closing so the parent's sockets stay intact.
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._client = None
+        self._http_client = None
+        self._pid = None
+        self._async_clients = []
+        self._async_http_clients = []
+        self._reset_stats()
+
+
+openai_pool = OpenAIClientPool()
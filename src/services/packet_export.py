@@ -0,0 +1,232 @@
+import csv
+import io
+import re
+import tempfile
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from src.services.metrics import metrics
+
+# Export formats: file extension, and how the outer ZIP stores the entry
+# (DOCX files are ZIP archives already, so deflating them again gains nothing)
+EXPORT_FORMATS = {
+    'text': ('txt', zipfile.ZIP_DEFLATED),
+    'pdf': ('pdf', zipfile.ZIP_DEFLATED),
+    'docx': ('docx', zipfile.ZIP_STORED),
+}
+
+MANIFEST_FIELDS = ('path', 'clientKey', 'clientName', 'stepId', 'documentType', 'source', 'status',
+                   'documentId', 'origin', 'createdAt')
+
+# The manifest is spooled to disk past this size
+MANIFEST_SPOOL_BYTES = 1024 * 1024
+
+# PDF page layout: US Letter, 10pt Courier, so wrapping is by character count
+PDF_PAGE_WIDTH = 612
+PDF_PAGE_HEIGHT = 792
+PDF_MARGIN = 54
+PDF_FONT_SIZE = 10
+PDF_LEADING = 12
+PDF_LINE_CHARS = 90
+PDF_PAGE_LINES = (PDF_PAGE_HEIGHT - 2 * PDF_MARGIN) // PDF_LEADING
+
+# Characters outside WinAnsiEncoding that the generated documents use
+PDF_TRANSLATIONS = str.maketrans({'═': '=', '─': '-', '│': '|', '✓': '*', '☐': '[ ]', '☑': '[x]'})
+
+exported_documents = metrics.counter('eia_exported_documents_total', 'Documents written to exported packets',
+                                     ('format', 'origin'))
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, non-seekable buffer that hands back what was written since the last ``drain``"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class PacketWriter:
+    """Writes a ZIP packet of documents as a sequence of byte chunks.
+
+    ``zipfile`` writes to a non-seekable sink, so every entry is followed by
+    a data descriptor instead of being patched in place, and ``add`` returns
+    the bytes of that entry straight away. Only one document is held at a
+    time; what grows with the packet is the central directory, a ZipInfo of
+    a few hundred bytes per entry. The manifest is spooled to a temporary
+    file.
+    """
+
+    def __init__(self, export_format='text'):
+        self.extension, self.compress_type = EXPORT_FORMATS[export_format]
+        self.export_format = export_format
+        self.count = 0
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+        self._manifest = tempfile.SpooledTemporaryFile(max_size=MANIFEST_SPOOL_BYTES, mode='w+', newline='')
+        self._manifest_writer = csv.DictWriter(self._manifest, MANIFEST_FIELDS)
+        self._manifest_writer.writeheader()
+
+    def add(self, entry, content):
+        """Render one document into the packet; returns the ZIP bytes written"""
+        path = self._unique(f"{slugify(entry['clientKey'])}/{slugify(entry['stepId'])}-"
+                            f"{slugify(entry.get('documentType') or 'document')}.{self.extension}")
+        title = f"{entry.get('documentType') or entry['stepId']} - {entry.get('clientName', '')}"
+        self._write(path, render_document(content, title, self.export_format), self.compress_type)
+        self.record(entry, path)
+        self.count += 1
+        exported_documents.inc(format=self.export_format, origin=entry.get('origin', 'stored'))
+        return self._sink.drain()
+
+    def record(self, entry, path=''):
+        """Add a manifest row (also for requested documents that are not in the packet)"""
+        self._manifest_writer.writerow({field: entry.get(field, '') for field in MANIFEST_FIELDS} | {'path': path})
+
+    def close(self):
+        """Write the manifest and the central directory; returns the remaining bytes"""
+        info = zipfile.ZipInfo('manifest.csv', date_time=datetime.now().timetuple()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        self._manifest.seek(0)
+        with self._zip.open(info, 'w') as out:
+            for chunk in iter(lambda: self._manifest.read(64 * 1024), ''):
+                out.write(chunk.encode('utf-8'))
+        self._manifest.close()
+        self._zip.close()
+        return self._sink.drain()
+
+    def _write(self, path, data, compress_type):
+        info = zipfile.ZipInfo(path, date_time=datetime.now().timetuple()[:6])
+        info.compress_type = compress_type
+        self._zip.writestr(info, data)
+
+    def _unique(self, path):
+        stem, dot, extension = path.rpartition('.')
+        candidate, number = path, 1
+        while candidate in self._zip.NameToInfo:
+            number += 1
+            candidate = f'{stem}-{number}{dot}{extension}'
+        return candidate
+
+
+def slugify(value):
+    return re.sub(r'[^a-z0-9]+', '-', str(value).lower()).strip('-')[:80] or 'untitled'
+
+
+def render_document(content, title, export_format):
+    if export_format == 'pdf':
+        return render_pdf(content, title)
+    if export_format == 'docx':
+        return render_docx(content, title)
+    return content.encode('utf-8')
+
+
+def render_pdf(content, title=''):
+    """Plain-text document as a PDF: Courier, wrapped and paginated, no dependencies"""
+    lines = []
+    for line in content.translate(PDF_TRANSLATIONS).splitlines() or ['']:
+        while len(line) > PDF_LINE_CHARS:
+            cut = line.rfind(' ', 0, PDF_LINE_CHARS + 1)
+            cut = cut if cut > 0 else PDF_LINE_CHARS
+            lines.append(line[:cut])
+            line = line[cut:].lstrip(' ')
+        lines.append(line)
+    pages = [lines[start:start + PDF_PAGE_LINES] for start in range(0, len(lines), PDF_PAGE_LINES)]
+
+    # Objects: 1 catalog, 2 page tree, 3 font, 4 info, then a page and its
+    # content stream per page
+    page_ids = [5 + 2 * index for index in range(len(pages))]
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [' + b' '.join(b'%d 0 R' % page_id for page_id in page_ids)
+        + b'] /Count %d >>' % len(pages),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>',
+        b'<< /Title (' + _pdf_string(title) + b') /Producer (EIA Backend) >>',
+    ]
+    for page_id, page in zip(page_ids, pages):
+        stream = b'BT /F1 %d Tf %d TL %d %d Td\n' % (PDF_FONT_SIZE, PDF_LEADING, PDF_MARGIN,
+                                                     PDF_PAGE_HEIGHT - PDF_MARGIN - PDF_FONT_SIZE)
+        stream += b''.join(b'(' + _pdf_string(line) + b") '\n" for line in page) + b'ET'
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> '
+                       b'/Contents %d 0 R >>' % (PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT, page_id + 1))
+        objects.append(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+    xref = out.tell()
+    out.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    out.write(b''.join(b'%010d 00000 n \n' % offset for offset in offsets))
+    out.write(b'trailer\n<< /Size %d /Root 1 0 R /Info 4 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def _pdf_string(text):
+    data = text.encode('cp1252', errors='replace')
+    return data.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+DOCX_CONTENT_TYPES = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/docProps/core.xml" ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>
+</Types>'''
+
+DOCX_RELATIONSHIPS = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" Target="docProps/core.xml"/>
+</Relationships>'''
+
+DOCX_CORE = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" xmlns:dc="http://purl.org/dc/elements/1.1/">
+<dc:title>{title}</dc:title>
+<dc:creator>EIA Backend</dc:creator>
+</cp:coreProperties>'''
+
+DOCX_NAMESPACE = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+
+def render_docx(content, title=''):
+    """Plain-text document as a minimal DOCX: a paragraph per line, headings in bold"""
+    paragraphs = []
+    for line in content.splitlines():
+        text = escape(line)
+        # Upper-case lines and numbered section titles are the documents' headings
+        bold = '<w:rPr><w:b/></w:rPr>' if line.strip() and (line.isupper() or _is_numbered_heading(line)) else ''
+        paragraphs.append(f'<w:p><w:r>{bold}<w:t xml:space="preserve">{text}</w:t></w:r></w:p>')
+    body = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<w:document xmlns:w="{DOCX_NAMESPACE}"><w:body>'
+            + ''.join(paragraphs) + '</w:body></w:document>')
+
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr('[Content_Types].xml', DOCX_CONTENT_TYPES)
+        docx.writestr('_rels/.rels', DOCX_RELATIONSHIPS)
+        docx.writestr('docProps/core.xml', DOCX_CORE.format(title=escape(title)))
+        docx.writestr('word/document.xml', body)
+    return out.getvalue()
+
+
+def _is_numbered_heading(line):
+    match = re.match(r'\d+\.\s+(.*)$', line)
+    return bool(match) and match.group(1).isupper()
@@ -0,0 +1,26 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from src.services.templates import TemplateRegistry
+
+DEFAULT_PROMPT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'eia_templates', 'prompts')
+
+# Upstream prompts for each workflow step; see eia_templates/prompts/manifest.json
+prompt_registry = TemplateRegistry(DEFAULT_PROMPT_DIR, 'EIA_PROMPT_DIR')
+
+# (local midnight ending the day, that day as prompts show it)
+_prompt_date = (0.0, '')
+
+
+def prompt_date():
+    """Today's date as prompts show it (``'%B %d, %Y'``), formatted once a day"""
+    global _prompt_date
+    until, label = _prompt_date
+    if time.time() < until:
+        return label
+    today = datetime.now()
+    midnight = (today + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    label = today.strftime('%B %d, %Y')
+    _prompt_date = (midnight.timestamp(), label)
+    return label
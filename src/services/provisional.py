@@ -0,0 +1,92 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from src.models.document import Document
+from src.models.user import db
+from src.services.document_store import save_document, set_document_status, update_document
+
+logger = logging.getLogger(__name__)
+
+PROVISIONAL_CONFIG_DEFAULTS = {
+    'EIA_UPGRADE_WORKERS': 8,
+}
+
+# How often waiters re-check the database, so upgrades finished by another
+# worker process are noticed too
+WAIT_POLL_SECONDS = 0.5
+
+
+class ProvisionalDocuments:
+    """Documents served provisionally while the upstream call keeps running.
+
+    A deadline-bound request that misses its deadline gets the template
+    document straight away, stored with status ``provisional``; the upstream
+    call carries on in a background executor and overwrites the stored
+    document (status ``final``, or ``failed`` if the upgrade itself errored).
+    """
+
+    def __init__(self, app=None):
+        self._settings = dict(PROVISIONAL_CONFIG_DEFAULTS)
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._executor = None
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, default in PROVISIONAL_CONFIG_DEFAULTS.items():
+            value = app.config.get(key, os.environ.get(key, default))
+            app.config[key] = type(default)(value)
+            self._settings[key] = app.config[key]
+
+    @property
+    def executor(self):
+        """Background executor for upgrades, recreated after a fork."""
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._settings['EIA_UPGRADE_WORKERS'],
+                        thread_name_prefix='eia-upgrade'
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def create(self, document, client_data, future):
+        """Store a provisional document and upgrade it when ``future`` resolves."""
+        document_id = save_document(document, client_data, status='provisional')
+        if document_id is not None:
+            app = current_app._get_current_object()
+            future.add_done_callback(lambda done: self._complete(app, document_id, done))
+        return document_id
+
+    def wait(self, document_id, timeout):
+        """Block until the document is no longer provisional (or ``timeout`` passes)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            row = db.session.get(Document, document_id, populate_existing=True)
+            remaining = deadline - time.monotonic()
+            if row is None or row.status != 'provisional' or remaining <= 0:
+                return row
+            db.session.rollback()
+            with self._changed:
+                self._changed.wait(min(remaining, WAIT_POLL_SECONDS))
+
+    def _complete(self, app, document_id, future):
+        with app.app_context():
+            try:
+                update_document(document_id, future.result(), status='final')
+            except Exception:
+                logger.exception('Background upgrade for document %s failed', document_id)
+                set_document_status(document_id, 'failed')
+        with self._changed:
+            self._changed.notify_all()
+
+
+provisional_documents = ProvisionalDocuments()
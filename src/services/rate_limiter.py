@@ -0,0 +1,406 @@
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from src.services.metrics import metrics
+from src.services.scheduler import (BATCH_CLASSES, PRIORITY_CLASSES, SCHEDULER_CONFIG_DEFAULTS, FairScheduler, QueueFullError,
+                                    current_priority)
+
+logger = logging.getLogger(__name__)
+
+LIMITER_CONFIG_DEFAULTS = {
+    # Upstream calls in flight per worker process
+    'EIA_UPSTREAM_CONCURRENCY': 8,
+    # Requests and tokens per minute for the API key, shared by every
+    # process on this host (0 disables that bucket). A call takes its
+    # estimated prompt tokens plus max_tokens (what upstream meters it at)
+    # and gets back what it did not use once upstream reports its usage, so
+    # the TPM budget bounds tokens actually used; only bursts of calls in
+    # flight at once are held to the max_tokens worst case
+    'EIA_UPSTREAM_RPM': 500,
+    'EIA_UPSTREAM_TPM': 200000,
+    # Callers allowed to wait per process, and for how long
+    'EIA_LIMITER_MAX_QUEUE': 32,
+    'EIA_LIMITER_MAX_WAIT_SECONDS': 20.0,
+    # SQLite file holding the shared buckets (empty: next to app.db)
+    'EIA_LIMITER_STATE_PATH': '',
+}
+
+# Rough prompt size estimate; OpenAI meters max_tokens up front as well,
+# and calls settle with their reported usage (``TokenReservation``)
+CHARS_PER_TOKEN = 4
+
+WAIT_SAMPLES = 1000
+
+wait_seconds = metrics.histogram('eia_upstream_limiter_wait_seconds', 'Time upstream calls waited for a slot and rate budget')
+rejections = metrics.counter('eia_upstream_limiter_rejected_total', 'Upstream calls refused by the limiter', ('reason',))
+
+
+class UpstreamBusyError(RuntimeError):
+    """Raised instead of queueing when upstream capacity is exhausted.
+
+    ``status`` is 503 when the wait queue is full and 429 when the rate
+    limit cannot be met within the maximum wait; ``retry_after`` is in
+    seconds.
+    """
+
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class TokenReservation:
+    """Tokens an upstream call took from the per-minute bucket.
+
+    Yielded by ``UpstreamLimiter.slot``; ``settle`` it with the usage
+    upstream reports, and the difference goes back to the bucket when the
+    slot is released. Unsettled calls (failures, abandoned streams) keep the
+    whole reservation.
+    """
+    __slots__ = ('tokens', 'used')
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.used = None
+
+    def settle(self, usage):
+        """Record the call's ``usage`` (an upstream usage object; None is ignored)"""
+        if usage is not None and usage.total_tokens is not None:
+            self.used = usage.total_tokens
+
+
+class TokenBuckets:
+    """Requests-per-minute and tokens-per-minute buckets in a SQLite file.
+
+    Every process opening the same file shares the buckets; ``BEGIN
+    IMMEDIATE`` makes each refill-and-take atomic across processes.
+    """
+
+    def __init__(self, path, rpm, tpm):
+        self.path = path
+        self.limits = {'requests': rpm, 'tokens': tpm}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def take(self, tokens, reserve=0.0):
+        """Take one request and ``tokens`` tokens; return 0, or the seconds to wait first.
+
+        With ``reserve`` (a fraction of each limit) the take only succeeds if
+        that much of each bucket would be left over.
+        """
+        wanted = {'requests': 1, 'tokens': tokens}
+        if not any(limit > 0 for limit in self.limits.values()):
+            return 0
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                levels = {name: self._refilled(conn, name, now) for name, limit in self.limits.items() if limit > 0}
+                wait = max(
+                    [(min(wanted[name] + reserve * self.limits[name], self.limits[name]) - level) * 60.0 / self.limits[name]
+                     for name, level in levels.items()] + [0]
+                )
+                if wait <= 0:
+                    levels = {name: level - wanted[name] for name, level in levels.items()}
+                conn.executemany(
+                    'INSERT INTO bucket (name, level, updated) VALUES (?, ?, ?) '
+                    'ON CONFLICT (name) DO UPDATE SET level = excluded.level, updated = excluded.updated',
+                    [(name, level, now) for name, level in levels.items()]
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        return wait
+
+    def credit(self, name, amount):
+        """Add ``amount`` to a bucket (negative: take it), e.g. to settle an estimated take."""
+        if self.limits.get(name, 0) <= 0 or not amount:
+            return
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                level = min(self.limits[name], self._refilled(conn, name, now) + amount)
+                conn.execute(
+                    'INSERT INTO bucket (name, level, updated) VALUES (?, ?, ?) '
+                    'ON CONFLICT (name) DO UPDATE SET level = excluded.level, updated = excluded.updated',
+                    (name, level, now)
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def drain(self, name='requests'):
+        """Empty a bucket, e.g. after upstream answered 429 despite the limiter."""
+        if self.limits.get(name, 0) <= 0:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                'INSERT INTO bucket (name, level, updated) VALUES (?, 0, ?) '
+                'ON CONFLICT (name) DO UPDATE SET level = 0, updated = excluded.updated',
+                (name, time.time())
+            )
+
+    def levels(self):
+        with self._lock:
+            conn = self._connect()
+            now = time.time()
+            result = {}
+            for name, level, updated in conn.execute('SELECT name, level, updated FROM bucket'):
+                limit = self.limits.get(name, 0)
+                if limit > 0:
+                    result[name] = round(min(limit, level + (now - updated) * limit / 60.0), 1)
+            return result
+
+    def _refilled(self, conn, name, now):
+        """Level of bucket ``name`` at ``now`` (inside the caller's transaction)"""
+        limit = self.limits[name]
+        row = conn.execute('SELECT level, updated FROM bucket WHERE name = ?', (name,)).fetchone()
+        level, updated = row if row else (limit, now)
+        return min(limit, level + (now - updated) * limit / 60.0)
+
+    def _connect(self):
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS bucket (name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)')
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+
+class UpstreamLimiter:
+    """Admission control for upstream model calls.
+
+    A caller first takes one of ``EIA_UPSTREAM_CONCURRENCY`` in-process
+    slots, handed out by priority class (see ``FairScheduler``), then one
+    request and its estimated tokens from the shared per-minute buckets,
+    waiting for either as needed; unused tokens go back once the call
+    settles its ``TokenReservation``. At most ``EIA_LIMITER_MAX_QUEUE`` callers
+    of a class wait at a time; beyond that, or when the wait would exceed
+    ``EIA_LIMITER_MAX_WAIT_SECONDS`` (``EIA_SCHEDULER_BATCH_MAX_WAIT_SECONDS``
+    for batch work), the call is refused with ``UpstreamBusyError`` so the
+    client can back off.
+    """
+
+    def __init__(self, app=None):
+        self._settings = dict(LIMITER_CONFIG_DEFAULTS, **SCHEDULER_CONFIG_DEFAULTS)
+        self._lock = threading.Lock()
+        self.scheduler = self._build_scheduler()
+        self.buckets = None
+        self._reset_stats()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, default in dict(LIMITER_CONFIG_DEFAULTS, **SCHEDULER_CONFIG_DEFAULTS).items():
+            value = app.config.get(key, os.environ.get(key, default))
+            app.config[key] = type(default)(value)
+            self._settings[key] = app.config[key]
+        path = self._settings['EIA_LIMITER_STATE_PATH'] or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'rate_limit.db'
+        )
+        self.scheduler = self._build_scheduler()
+        self.buckets = TokenBuckets(path, self._settings['EIA_UPSTREAM_RPM'], self._settings['EIA_UPSTREAM_TPM'])
+        app.extensions['upstream_limiter'] = self
+        metrics.gauge('eia_upstream_limiter_queue_depth', 'Callers waiting for upstream capacity',
+                      lambda: sum(self.scheduler.queue_depths().values()))
+        metrics.gauge('eia_upstream_limiter_in_flight', 'Upstream calls holding a limiter slot', lambda: self._in_flight)
+        metrics.gauge('eia_scheduler_queue_depth', 'Callers waiting for an upstream slot, by priority class',
+                      lambda: {(('priority', name),): depth for name, depth in self.scheduler.queue_depths().items()})
+        metrics.gauge('eia_scheduler_in_flight', 'Upstream slots held, by priority class',
+                      lambda: {(('priority', name),): count for name, count in self.scheduler.running().items()})
+
+    @contextmanager
+    def slot(self, prompt, max_tokens, priority=None):
+        """Hold upstream capacity for one call of ``prompt`` (plus ``max_tokens`` of output).
+
+        ``priority`` is a class from ``PRIORITY_CLASSES``; by default the one
+        set for the current request (see ``scheduler.prioritized``). Yields
+        the call's ``TokenReservation``.
+        """
+        reservation = TokenReservation(math.ceil(len(prompt) / CHARS_PER_TOKEN) + max_tokens)
+        priority = priority or current_priority()
+        self._acquire(reservation.tokens, priority)
+        try:
+            yield reservation
+        finally:
+            self._release(priority)
+            if reservation.used is not None:
+                self._settle(reservation)
+
+    @asynccontextmanager
+    async def async_slot(self, prompt, max_tokens, priority=None):
+        """``slot`` for coroutines: waits without blocking the event loop.
+
+        Shares the slots, queue bound and rate buckets with ``slot``, so
+        threads and coroutines of one process draw on the same capacity.
+        """
+        reservation = TokenReservation(math.ceil(len(prompt) / CHARS_PER_TOKEN) + max_tokens)
+        priority = priority or current_priority()
+        await self._acquire_async(reservation.tokens, priority)
+        try:
+            yield reservation
+        finally:
+            self._release(priority)
+            if reservation.used is not None:
+                await asyncio.to_thread(self._settle, reservation)
+
+    def throttle(self):
+        """Upstream rate-limited us anyway: make every process wait for fresh capacity."""
+        if self.buckets is not None:
+            self.buckets.drain()
+        with self._lock:
+            self._stats['upstream429'] += 1
+
+    def stats(self):
+        scheduler = self.scheduler.stats()
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = dict(self._stats)
+            stats.update({
+                'queueDepth': sum(cls['queueDepth'] for cls in scheduler['classes'].values()),
+                'maxQueueDepth': max(cls['maxQueueDepth'] for cls in scheduler['classes'].values()),
+                'inFlight': self._in_flight,
+                'waitMsAvg': round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                'waitMsP95': round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+                'waitMsMax': round(waits[-1] * 1000, 1) if waits else 0.0,
+            })
+        stats['scheduler'] = scheduler
+        stats['buckets'] = self.buckets.levels() if self.buckets is not None else {}
+        stats['pid'] = os.getpid()
+        stats['settings'] = dict(self._settings)
+        return stats
+
+    def _build_scheduler(self):
+        weights = {name: self._settings[f'EIA_SCHEDULER_WEIGHT_{name.upper()}'] for name in PRIORITY_CLASSES}
+        return FairScheduler(self._settings['EIA_UPSTREAM_CONCURRENCY'], weights,
+                             self._settings['EIA_SCHEDULER_RESERVED_SLOTS'])
+
+    def _limits(self, priority):
+        """``(maximum wait, bucket reserve)`` for calls of ``priority``"""
+        if priority in BATCH_CLASSES:
+            return self._settings['EIA_SCHEDULER_BATCH_MAX_WAIT_SECONDS'], self._settings['EIA_SCHEDULER_BATCH_RESERVE']
+        return self._settings['EIA_LIMITER_MAX_WAIT_SECONDS'], 0.0
+
+    def _acquire(self, tokens, priority):
+        started = time.monotonic()
+        max_wait, reserve = self._limits(priority)
+        deadline = started + max_wait
+        try:
+            acquired = self.scheduler.acquire(priority, tokens, max_wait, self._settings['EIA_LIMITER_MAX_QUEUE'])
+        except QueueFullError:
+            self._reject_queue_full()
+        if not acquired:
+            self._reject_timeout()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            self._take_tokens(tokens, deadline, reserve)
+        except BaseException:
+            self._release(priority)
+            raise
+        self._record_wait(started)
+
+    async def _acquire_async(self, tokens, priority):
+        started = time.monotonic()
+        max_wait, reserve = self._limits(priority)
+        deadline = started + max_wait
+        try:
+            acquired = await self.scheduler.acquire_async(priority, tokens, max_wait,
+                                                          self._settings['EIA_LIMITER_MAX_QUEUE'])
+        except QueueFullError:
+            self._reject_queue_full()
+        if not acquired:
+            self._reject_timeout()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            while self.buckets is not None:
+                wait = await asyncio.to_thread(self.buckets.take, tokens, reserve)
+                if wait <= 0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    self._reject_timeout(math.ceil(wait))
+                with self._lock:
+                    self._stats['rateLimitedWaits'] += 1
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._release(priority)
+            raise
+        self._record_wait(started)
+
+    def _release(self, priority):
+        self.scheduler.release(priority)
+        with self._lock:
+            self._in_flight -= 1
+
+    def _settle(self, reservation):
+        if self.buckets is not None:
+            self.buckets.credit('tokens', reservation.tokens - reservation.used)
+        with self._lock:
+            self._stats['tokensReturned'] += reservation.tokens - reservation.used
+
+    def _record_wait(self, started):
+        waited = time.monotonic() - started
+        wait_seconds.observe(waited)
+        with self._lock:
+            self._stats['acquired'] += 1
+            self._waits.append(waited)
+
+    def _take_tokens(self, tokens, deadline, reserve=0.0):
+        if self.buckets is None:
+            return
+        while True:
+            wait = self.buckets.take(tokens, reserve)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                self._reject_timeout(math.ceil(wait))
+            with self._lock:
+                self._stats['rateLimitedWaits'] += 1
+            time.sleep(wait)
+
+    def _reject_queue_full(self):
+        with self._lock:
+            self._stats['rejectedQueueFull'] += 1
+        rejections.inc(reason='queue_full')
+        raise UpstreamBusyError('Upstream request queue is full', 503, self._retry_after())
+
+    def _reject_timeout(self, retry_after=None):
+        with self._lock:
+            self._stats['rejectedTimeout'] += 1
+        rejections.inc(reason='timeout')
+        raise UpstreamBusyError('Upstream rate limit reached', 429, retry_after or self._retry_after())
+
+    def _retry_after(self):
+        # Roughly how long a slot takes to free up: the average recent wait, at least a second
+        waits = list(self._waits)[-50:]
+        return max(1, math.ceil(sum(waits) / len(waits))) if waits else 1
+
+    def _reset_stats(self):
+        self._in_flight = 0
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._stats = {
+            'acquired': 0,
+            'rejectedQueueFull': 0,
+            'rejectedTimeout': 0,
+            'rateLimitedWaits': 0,
+            'upstream429': 0,
+            'tokensReturned': 0,
+        }
+
+
+upstream_limiter = UpstreamLimiter()
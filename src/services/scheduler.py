@@ -0,0 +1,237 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from src.services.metrics import metrics
+
+SCHEDULER_CONFIG_DEFAULTS = {
+    # Share of the upstream slots each priority class gets while others
+    # are waiting too (weighted fair queuing)
+    'EIA_SCHEDULER_WEIGHT_URGENT': 16,
+    'EIA_SCHEDULER_WEIGHT_INTERACTIVE': 8,
+    'EIA_SCHEDULER_WEIGHT_BATCH_URGENT': 2,
+    'EIA_SCHEDULER_WEIGHT_BATCH': 1,
+    # Upstream slots per process that batch calls never take, so an
+    # interactive call finds one free however large the batch
+    'EIA_SCHEDULER_RESERVED_SLOTS': 2,
+    # Share of the per-minute request and token budgets batch calls leave
+    # for interactive ones
+    'EIA_SCHEDULER_BATCH_RESERVE': 0.1,
+    # Batch calls may wait this long (interactive ones: EIA_LIMITER_MAX_WAIT_SECONDS)
+    'EIA_SCHEDULER_BATCH_MAX_WAIT_SECONDS': 120.0,
+}
+
+# Priority classes, most urgent first
+PRIORITY_CLASSES = ('urgent', 'interactive', 'batch_urgent', 'batch')
+BATCH_CLASSES = ('batch_urgent', 'batch')
+
+# clientData.urgencyLevel values that raise a request's priority
+URGENT_LEVELS = ('urgent', 'emergency', 'crisis')
+
+WAIT_SAMPLES = 1000
+
+_origin = contextvars.ContextVar('eia_request_origin', default='interactive')
+_priority = contextvars.ContextVar('eia_priority_class', default=None)
+
+class_wait_seconds = metrics.histogram('eia_scheduler_wait_seconds', 'Time upstream calls waited for a slot, by priority class',
+                                       ('priority',))
+
+
+class QueueFullError(RuntimeError):
+    """The priority class already has the maximum number of callers waiting."""
+
+
+def priority_class(client_data=None, origin=None):
+    """Priority class of a call for ``client_data`` from ``origin`` (default: the current origin)"""
+    origin = origin or _origin.get()
+    urgent = str((client_data or {}).get('urgencyLevel', '')).strip().lower() in URGENT_LEVELS
+    if origin == 'batch':
+        return 'batch_urgent' if urgent else 'batch'
+    return 'urgent' if urgent else 'interactive'
+
+
+def current_priority():
+    """Priority class set by ``prioritized``, else that of the current origin"""
+    return _priority.get() or priority_class()
+
+
+@contextmanager
+def batch_origin():
+    """Mark upstream calls made inside the block as batch work (jobs, exports)"""
+    token = _origin.set('batch')
+    try:
+        yield
+    finally:
+        _origin.reset(token)
+
+
+@contextmanager
+def prioritized(client_data):
+    """Schedule upstream calls made inside the block by ``client_data``'s urgency"""
+    token = _priority.set(priority_class(client_data))
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _Waiter:
+    __slots__ = ('priority', 'tag', 'enqueued', 'granted', 'event', 'loop', 'future')
+
+    def __init__(self, priority, tag, loop=None):
+        self.priority = priority
+        self.tag = tag
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.event = threading.Event() if loop is None else None
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+
+    def grant(self):
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class FairScheduler:
+    """Hands out a process's upstream slots by weighted fair queuing.
+
+    A caller that finds no free slot queues in its priority class and is
+    stamped with a virtual finish time: the later of the scheduler's virtual
+    clock and its class's last stamp, plus its estimated tokens divided by
+    the class weight (self-clocked fair queuing). Each freed slot goes to
+    the smallest stamp at the head of a class queue, so every class drains
+    at a rate proportional to its weight and batch work is slowed, never
+    starved. Batch classes may hold at most ``capacity - reserved`` slots,
+    which keeps slots free for interactive calls that arrive while a large
+    batch is draining. Threads and coroutines share the same slots.
+    """
+
+    def __init__(self, capacity, weights, reserved=0):
+        self.capacity = capacity
+        self.weights = weights
+        self.batch_capacity = max(1, capacity - reserved)
+        self._lock = threading.Lock()
+        self._queues = {name: deque() for name in PRIORITY_CLASSES}
+        self._running = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self._last_tag = dict.fromkeys(PRIORITY_CLASSES, 0.0)
+        self._virtual_time = 0.0
+        self._waits = {name: deque(maxlen=WAIT_SAMPLES) for name in PRIORITY_CLASSES}
+        self._stats = {name: {'granted': 0, 'queued': 0, 'timedOut': 0, 'rejected': 0, 'maxQueueDepth': 0}
+                       for name in PRIORITY_CLASSES}
+
+    def acquire(self, priority, cost, timeout, max_queue):
+        """Take a slot for ``priority``, waiting up to ``timeout`` seconds; False if none came free"""
+        waiter = self._enqueue(priority, cost, max_queue)
+        if waiter is None:
+            return True
+        if waiter.event.wait(timeout):
+            return True
+        return self._abandon(waiter, timed_out=True)
+
+    async def acquire_async(self, priority, cost, timeout, max_queue):
+        """``acquire`` for coroutines: waits without blocking the event loop"""
+        waiter = self._enqueue(priority, cost, max_queue, asyncio.get_running_loop())
+        if waiter is None:
+            return True
+        try:
+            # Not wait_for: it drops a cancellation that arrives together with the grant
+            done, _ = await asyncio.wait((waiter.future,), timeout=timeout)
+        except BaseException:
+            if self._abandon(waiter, timed_out=False):
+                self.release(priority)
+            raise
+        return bool(done) or self._abandon(waiter, timed_out=True)
+
+    def release(self, priority):
+        with self._lock:
+            self._running[priority] -= 1
+            self._dispatch()
+
+    def queue_depths(self):
+        with self._lock:
+            return {name: len(queue) for name, queue in self._queues.items()}
+
+    def running(self):
+        with self._lock:
+            return dict(self._running)
+
+    def stats(self):
+        with self._lock:
+            classes = {}
+            for name in PRIORITY_CLASSES:
+                waits = sorted(self._waits[name])
+                classes[name] = dict(
+                    self._stats[name],
+                    weight=self.weights[name],
+                    queueDepth=len(self._queues[name]),
+                    inFlight=self._running[name],
+                    waitMsAvg=round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                    waitMsP95=round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+                    waitMsMax=round(waits[-1] * 1000, 1) if waits else 0.0
+                )
+        return {'capacity': self.capacity, 'batchCapacity': self.batch_capacity, 'classes': classes}
+
+    def _enqueue(self, priority, cost, max_queue, loop=None):
+        """Take a free slot (returns None) or queue a waiter for ``priority``"""
+        with self._lock:
+            stats = self._stats[priority]
+            if self._can_start(priority):
+                self._start(priority, 0.0)
+                return None
+            queue = self._queues[priority]
+            if len(queue) >= max_queue:
+                stats['rejected'] += 1
+                raise QueueFullError(f'{priority} queue is full')
+            tag = max(self._virtual_time, self._last_tag[priority]) + max(cost, 1) / self.weights[priority]
+            self._last_tag[priority] = tag
+            waiter = _Waiter(priority, tag, loop)
+            queue.append(waiter)
+            stats['queued'] += 1
+            stats['maxQueueDepth'] = max(stats['maxQueueDepth'], len(queue))
+            return waiter
+
+    def _abandon(self, waiter, timed_out):
+        """Leave the queue; returns True if the slot was granted meanwhile (the caller now holds it)"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._queues[waiter.priority].remove(waiter)
+            if timed_out:
+                self._stats[waiter.priority]['timedOut'] += 1
+            return False
+
+    def _can_start(self, priority):
+        if sum(self._running.values()) >= self.capacity:
+            return False
+        if priority in BATCH_CLASSES:
+            return sum(self._running[name] for name in BATCH_CLASSES) < self.batch_capacity
+        return True
+
+    def _start(self, priority, waited):
+        self._running[priority] += 1
+        self._stats[priority]['granted'] += 1
+        self._waits[priority].append(waited)
+        class_wait_seconds.observe(waited, priority=priority)
+
+    def _dispatch(self):
+        """Hand free slots to the waiters with the smallest virtual finish times (lock held)"""
+        while True:
+            heads = [queue[0] for name, queue in self._queues.items() if queue and self._can_start(name)]
+            if not heads:
+                return
+            waiter = min(heads, key=lambda head: head.tag)
+            self._queues[waiter.priority].popleft()
+            self._virtual_time = waiter.tag
+            self._start(waiter.priority, time.monotonic() - waiter.enqueued)
+            waiter.grant()
@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.models.inflight import InflightGeneration
+from src.models.user import db
+from src.services.metrics import metrics, pid_alive
+from src.services.rate_limiter import UpstreamBusyError
+
+logger = logging.getLogger(__name__)
+
+SINGLE_FLIGHT_CONFIG_DEFAULTS = {
+    # Share one upstream call between concurrent identical generation requests
+    'EIA_SINGLE_FLIGHT_ENABLED': 1,
+    # Also coalesce across worker processes through app.db
+    'EIA_SINGLE_FLIGHT_SHARED': 0,
+    # How long a worker's claim on a call holds before others may take it
+    # over; claims of a worker that has exited are taken over straight away
+    'EIA_SINGLE_FLIGHT_LEASE_SECONDS': 240.0,
+    'EIA_SINGLE_FLIGHT_POLL_SECONDS': 0.2,
+}
+
+# Finished rows are kept this long so waiting workers can read the outcome
+RESULT_RETENTION_SECONDS = 60
+
+# Drop old finished rows once per this many claims
+PURGE_INTERVAL = 50
+
+coalesced_requests = metrics.counter(
+    'eia_coalesced_requests_total',
+    'Generation requests answered by another request\'s upstream call',
+    ('step_id', 'scope')
+)
+
+
+class CoalescedCallError(RuntimeError):
+    """The upstream call this request was waiting on (in another worker) failed."""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent identical upstream calls.
+
+    The first caller for a key makes the call; callers arriving while it is
+    in flight wait and receive its result, or its exception. With
+    ``EIA_SINGLE_FLIGHT_SHARED`` the calling thread also claims the key in
+    the ``inflight_generation`` table, so a worker process that finds
+    another worker's claim polls for that call's outcome instead of making
+    its own.
+    """
+
+    def __init__(self, app=None):
+        self._settings = dict(SINGLE_FLIGHT_CONFIG_DEFAULTS)
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+        self._stats = {'calls': 0, 'coalescedProcess': 0, 'coalescedShared': 0, 'takeovers': 0, 'claims': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, default in SINGLE_FLIGHT_CONFIG_DEFAULTS.items():
+            value = app.config.get(key, os.environ.get(key, default))
+            app.config[key] = type(default)(value)
+            self._settings[key] = app.config[key]
+        app.extensions['single_flight'] = self
+        metrics.gauge('eia_single_flight_in_flight', 'Distinct upstream calls currently shared by waiting requests',
+                      lambda: len(self._calls) + len(self._async_calls))
+
+    def do(self, key, fn, step_id=''):
+        """Return ``(fn(), coalesced)``, sharing one ``fn()`` between concurrent callers of ``key``.
+
+        ``coalesced`` is true when the result came from another request's
+        call. Cross-worker coalescing needs an app context.
+        """
+        if not self._settings['EIA_SINGLE_FLIGHT_ENABLED']:
+            return fn(), False
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            self._count('coalescedProcess', step_id, 'process')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result, coalesced = self._run(key, fn, step_id)
+            return call.result, coalesced
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, fn, step_id=''):
+        """``do`` for coroutines: ``fn()`` returns an awaitable, shared by concurrent callers of ``key``.
+
+        Coalesces within the event loop only; ``EIA_SINGLE_FLIGHT_SHARED``
+        does not apply.
+        """
+        if not self._settings['EIA_SINGLE_FLIGHT_ENABLED']:
+            return await fn(), False
+
+        call = self._async_calls.get(key)
+        if call is not None:
+            self._count('coalescedProcess', step_id, 'process')
+            # shield: a waiter going away must not cancel everyone's call
+            return await asyncio.shield(call), True
+
+        call = self._async_calls[key] = asyncio.ensure_future(fn())
+        call.add_done_callback(lambda future: self._forget_async(key, future))
+        self._count('calls')
+        return await asyncio.shield(call), False
+
+    def _forget_async(self, key, future):
+        if self._async_calls.get(key) is future:
+            del self._async_calls[key]
+        if not future.cancelled():
+            # Retrieve the exception so it is not reported as unhandled
+            # when every waiter has gone away
+            future.exception()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['inFlight'] = len(self._calls) + len(self._async_calls)
+        stats['pid'] = os.getpid()
+        stats['settings'] = dict(self._settings)
+        return stats
+
+    def _run(self, key, fn, step_id):
+        if not self._settings['EIA_SINGLE_FLIGHT_SHARED']:
+            self._count('calls')
+            return fn(), False
+
+        try:
+            token, row = self._claim_or_wait(key)
+        except SQLAlchemyError as e:
+            logger.warning('Cross-worker coalescing unavailable, calling upstream directly: %s', e)
+            self._count('calls')
+            return fn(), False
+        if token is None:
+            self._count('coalescedShared', step_id, 'shared')
+            if row.status == 'done':
+                return row.content, True
+            if row.error_status:
+                raise UpstreamBusyError(row.error, row.error_status, row.retry_after or 1)
+            raise CoalescedCallError(row.error or 'Upstream call failed in another worker')
+
+        self._count('calls')
+        try:
+            result = fn()
+        except UpstreamBusyError as e:
+            self._finish(token, status='failed', error=str(e), error_status=e.status, retry_after=e.retry_after)
+            raise
+        except Exception as e:
+            self._finish(token, status='failed', error=str(e))
+            raise
+        except BaseException:
+            self._release(token)
+            raise
+        self._finish(token, status='done', content=result)
+        return result, False
+
+    def _claim_or_wait(self, key):
+        """Claim ``key`` and return ``(token, None)``, or wait for another worker's call and return ``(None, row)``."""
+        while True:
+            token, holder = self._claim(key)
+            if token is not None:
+                return token, None
+            row = self._wait_remote(holder)
+            if row is not None:
+                return None, row
+
+    def _claim(self, key):
+        """Return ``(token, None)`` for a new claim on ``key``, or ``(None, token)`` of the live claim."""
+        table = InflightGeneration.__table__
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        claim = insert(table).values(
+            token=token,
+            key=key,
+            owner_pid=os.getpid(),
+            status='running',
+            expires_at=now + timedelta(seconds=self._settings['EIA_SINGLE_FLIGHT_LEASE_SECONDS']),
+            updated_at=now
+        ).on_conflict_do_nothing()
+        with db.engine.begin() as conn:
+            # Writing first takes the database write lock, so the check and
+            # takeover below cannot race another worker's claim
+            claimed = conn.execute(claim).rowcount
+            if not claimed:
+                holder = conn.execute(
+                    select(table.c.token, table.c.owner_pid, table.c.expires_at)
+                    .where(table.c.key == key, table.c.status == 'running')
+                ).first()
+                # A lapsed lease, a worker that exited mid-call, or an earlier
+                # process with our pid (this process has no call in flight)
+                if holder.expires_at > now and holder.owner_pid != os.getpid() and pid_alive(holder.owner_pid):
+                    return None, holder.token
+                conn.execute(
+                    update(table).where(table.c.token == holder.token).values(status='abandoned', updated_at=now)
+                )
+                conn.execute(claim)
+                self._count('takeovers')
+        if self._count('claims') % PURGE_INTERVAL == 0:
+            self._purge()
+        return token, None
+
+    def _wait_remote(self, token):
+        """Poll another worker's call; return its finished row, or None once the claim lapses."""
+        table = InflightGeneration.__table__
+        while True:
+            time.sleep(self._settings['EIA_SINGLE_FLIGHT_POLL_SECONDS'])
+            with db.engine.connect() as conn:
+                row = conn.execute(select(table).where(table.c.token == token)).first()
+            if row is None or row.status == 'abandoned':
+                return None
+            if row.status != 'running':
+                return row
+            if row.expires_at <= datetime.utcnow() or not pid_alive(row.owner_pid):
+                return None
+
+    def _finish(self, token, **values):
+        table = InflightGeneration.__table__
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(update(table).where(table.c.token == token).values(updated_at=datetime.utcnow(), **values))
+        except SQLAlchemyError as e:
+            logger.warning('Could not publish coalesced call outcome: %s', e)
+
+    def _release(self, token):
+        table = InflightGeneration.__table__
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(delete(table).where(table.c.token == token))
+        except SQLAlchemyError as e:
+            logger.warning('Could not release coalesced call: %s', e)
+
+    def _purge(self):
+        table = InflightGeneration.__table__
+        cutoff = datetime.utcnow() - timedelta(seconds=RESULT_RETENTION_SECONDS)
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(delete(table).where(table.c.status != 'running', table.c.updated_at < cutoff))
+        except SQLAlchemyError as e:
+            logger.warning('Could not purge finished coalesced calls: %s', e)
+
+    def _count(self, name, step_id=None, scope=None):
+        if scope is not None:
+            coalesced_requests.inc(step_id=metrics.step_label(step_id), scope=scope)
+        with self._lock:
+            self._stats[name] += 1
+            return self._stats[name]
+
+
+single_flight = SingleFlight()
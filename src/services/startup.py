@@ -0,0 +1,108 @@
+import logging
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from src.models.user import db
+from src.services.document_search import document_search
+from src.services.fallback_templates import fallback_registry
+from src.services.metrics import metrics
+from src.services.openai_pool import openai_pool
+from src.services.prompt_registry import prompt_registry
+from src.services.static_assets import static_manifest
+
+logger = logging.getLogger(__name__)
+
+STARTUP_CONFIG_DEFAULTS = {
+    # Create missing tables and the search index in create_app. Off by
+    # default: run `flask --app src.main migrate` once per deploy instead.
+    'EIA_AUTO_MIGRATE': 0,
+    # Load templates, the static manifest and the upstream client library
+    # before serving, instead of in the first requests that need them
+    'EIA_WARMUP': 1,
+}
+
+
+class Startup:
+    """Explicit startup phases, and the wall time each took in this process.
+
+    ``create_app`` only wires up configuration: it reads no template or
+    static files and opens no database connection. The other phases are run
+    by whoever starts the process:
+
+    - ``migrate`` creates missing tables and the search index (the
+      ``flask migrate`` command, or ``EIA_AUTO_MIGRATE``);
+    - ``warm_up`` compiles the templates, builds the static manifest and
+      imports the upstream client library. It creates no sockets, so a
+      pre-forking server runs it once, before forking;
+    - ``warm_up_process`` creates this process's upstream client and first
+      database connection, after forking.
+    """
+
+    def __init__(self, app=None):
+        self._settings = dict(STARTUP_CONFIG_DEFAULTS)
+        self.timings = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, default in STARTUP_CONFIG_DEFAULTS.items():
+            value = app.config.get(key, os.environ.get(key, default))
+            app.config[key] = type(default)(value)
+            self._settings[key] = app.config[key]
+        app.extensions['startup'] = self
+        app.cli.add_command(migrate_command)
+        metrics.gauge('eia_startup_seconds', 'Wall time of each startup phase in this process',
+                      lambda: {(('phase', phase),): seconds for phase, seconds in self.timings.items()})
+
+    @property
+    def warmup_enabled(self):
+        return bool(self._settings['EIA_WARMUP'])
+
+    def record(self, phase, started):
+        """Record a phase that began at ``started`` (``time.perf_counter()``); returns its seconds."""
+        self.timings[phase] = time.perf_counter() - started
+        return self.timings[phase]
+
+    def migrate(self, app):
+        started = time.perf_counter()
+        with app.app_context():
+            db.create_all()
+            document_search.create_index()
+        return self.record('migrate', started)
+
+    def warm_up(self, app):
+        started = time.perf_counter()
+        prompt_registry.ensure_loaded()
+        fallback_registry.ensure_loaded()
+        static_manifest.ensure_loaded()
+        openai_pool.preload()
+        elapsed = self.record('warm_up', started)
+        logger.info('Warm-up finished in %.0f ms', elapsed * 1000)
+        return elapsed
+
+    def warm_up_process(self, app):
+        started = time.perf_counter()
+        try:
+            openai_pool.get_client()
+        except Exception as e:
+            # e.g. no OPENAI_API_KEY: requests will use the template fallback
+            logger.warning('Upstream client not created at warm-up: %s', e)
+        with app.app_context():
+            with db.engine.connect():
+                pass
+        return self.record('warm_up_process', started)
+
+
+@click.command('migrate')
+@with_appcontext
+def migrate_command():
+    """Create missing tables and the full-text search index."""
+    elapsed = startup.migrate(current_app)
+    click.echo(f'Schema up to date ({elapsed * 1000:.0f} ms)')
+
+
+startup = Startup()
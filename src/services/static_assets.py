@@ -0,0 +1,232 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+
+import click
+from flask import Response, request, send_file
+from flask.cli import with_appcontext
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_CONFIG_DEFAULTS = {
+    # Compress assets in memory at startup when no precompressed sibling exists
+    'EIA_STATIC_PRECOMPRESS': 1,
+    # Files at most this large are held in memory; larger ones stay on disk
+    'EIA_STATIC_MEMORY_MAX_BYTES': 2 * 1024 * 1024,
+}
+
+# Vite emits content-hashed bundle names such as assets/index-CtZsIirQ.js
+HASHED_NAME = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml', 'image/x-icon',
+                      'image/vnd.microsoft.icon', 'application/wasm')
+MIN_COMPRESS_BYTES = 1024
+
+# Preferred order when a client accepts several encodings
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+SHORT_LIVED = 'public, max-age=3600'
+
+
+class StaticAsset:
+    """One file of the frontend build and its encoded variants."""
+
+    __slots__ = ('path', 'filename', 'mimetype', 'etag', 'cache_control', 'size', 'body', 'variants')
+
+    def __init__(self, path, filename, mimetype, etag, cache_control, size, body=None):
+        self.path = path
+        self.filename = filename
+        self.mimetype = mimetype
+        self.etag = etag
+        self.cache_control = cache_control
+        self.size = size
+        self.body = body
+        # encoding -> (bytes or None, sibling filename or None)
+        self.variants = {}
+
+
+class StaticManifest:
+    """Manifest of the static folder, built once at startup.
+
+    Requests are answered from the manifest instead of the filesystem:
+    content-hashed bundles are cached as immutable, ``index.html`` is served
+    from memory and revalidated with its strong ETag, and gzip/brotli
+    variants (precompressed ``.gz``/``.br`` siblings, or compressed here when
+    the manifest is built) are chosen by ``Accept-Encoding``.
+    """
+
+    def __init__(self, app=None):
+        self._settings = dict(STATIC_CONFIG_DEFAULTS)
+        self.folder = None
+        self.assets = None
+        self.index = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, default in STATIC_CONFIG_DEFAULTS.items():
+            value = app.config.get(key, os.environ.get(key, default))
+            app.config[key] = type(default)(value)
+            self._settings[key] = app.config[key]
+        app.extensions['static_manifest'] = self
+        app.cli.add_command(precompress_static_command)
+        # Scanned on first use, or by ``ensure_loaded`` at warm-up
+        self.folder = app.static_folder
+        self.assets = None
+        self.index = None
+
+    def ensure_loaded(self):
+        """Build the manifest unless it already is."""
+        if self.assets is None:
+            self.load(self.folder)
+
+    def load(self, folder):
+        """Scan ``folder`` and (re)build the manifest."""
+        self.folder = folder
+        self.assets = {}
+        if folder is None or not os.path.isdir(folder):
+            self.index = None
+            return
+        for root, _, files in os.walk(folder):
+            for name in files:
+                filename = os.path.join(root, name)
+                path = os.path.relpath(filename, folder).replace(os.sep, '/')
+                if any(path.endswith(suffix) and os.path.exists(filename[:-len(suffix)]) for _, suffix in ENCODINGS):
+                    continue
+                self.assets[path] = self._build_asset(path, filename)
+        self.index = self.assets.get('index.html')
+        logger.info('Static manifest: %s files from %s', len(self.assets), folder)
+
+    def serve(self, path):
+        """Response for ``path``; unknown paths get ``index.html`` (client-side routing)."""
+        if self.folder is None:
+            return "Static folder not configured", 404
+        self.ensure_loaded()
+        asset = self.assets.get(path) if path else None
+        if asset is None:
+            asset = self.index
+            if asset is None:
+                return "index.html not found", 404
+        return self._respond(asset)
+
+    def stats(self):
+        self.ensure_loaded()
+        return {
+            'folder': self.folder,
+            'files': len(self.assets),
+            'inMemoryBytes': sum(len(asset.body or b'') + sum(len(body or b'') for body, _ in asset.variants.values())
+                                 for asset in self.assets.values()),
+            'brotli': brotli is not None,
+        }
+
+    def _build_asset(self, path, filename):
+        with open(filename, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()[:32]
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if path == 'index.html':
+            cache_control = REVALIDATE
+        elif HASHED_NAME.match(path):
+            cache_control = IMMUTABLE
+        else:
+            cache_control = SHORT_LIVED
+        in_memory = path == 'index.html' or len(data) <= self._settings['EIA_STATIC_MEMORY_MAX_BYTES']
+        asset = StaticAsset(path, filename, mimetype, digest, cache_control, len(data), data if in_memory else None)
+
+        if not is_compressible(mimetype, len(data)):
+            return asset
+        for encoding, suffix in ENCODINGS:
+            sibling = filename + suffix
+            if os.path.exists(sibling) and os.path.getmtime(sibling) >= os.path.getmtime(filename):
+                asset.variants[encoding] = (None, sibling)
+            elif self._settings['EIA_STATIC_PRECOMPRESS'] and in_memory:
+                body = compress(data, encoding)
+                if body is not None and len(body) < len(data):
+                    asset.variants[encoding] = (body, None)
+        return asset
+
+    def _respond(self, asset):
+        encoding = None
+        for candidate, _ in ENCODINGS:
+            if candidate in asset.variants and request.accept_encodings.quality(candidate) > 0:
+                encoding = candidate
+                break
+        etag = asset.etag if encoding is None else f'{asset.etag}-{encoding}'
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        elif encoding is None:
+            response = self._body_response(asset.body, asset.filename, asset.mimetype)
+        else:
+            body, sibling = asset.variants[encoding]
+            response = self._body_response(body, sibling, asset.mimetype)
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = asset.cache_control
+        if asset.variants:
+            response.vary.add('Accept-Encoding')
+        return response
+
+    def _body_response(self, body, filename, mimetype):
+        if body is not None:
+            return Response(body, mimetype=mimetype)
+        response = send_file(filename, mimetype=mimetype, conditional=False, etag=False, max_age=None)
+        response.last_modified = None
+        return response
+
+
+def is_compressible(mimetype, size):
+    return size >= MIN_COMPRESS_BYTES and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(data, encoding):
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(data, quality=11)
+    return None
+
+
+def precompress_folder(folder):
+    """Write ``.gz`` (and, with brotli installed, ``.br``) siblings next to compressible files."""
+    written = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+                continue
+            filename = os.path.join(root, name)
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            if not is_compressible(mimetype, os.path.getsize(filename)):
+                continue
+            with open(filename, 'rb') as f:
+                data = f.read()
+            for encoding, suffix in ENCODINGS:
+                body = compress(data, encoding)
+                if body is not None and len(body) < len(data):
+                    with open(filename + suffix, 'wb') as f:
+                        f.write(body)
+                    written += 1
+    return written
+
+
+@click.command('precompress-static')
+@with_appcontext
+def precompress_static_command():
+    """Write precompressed variants of the frontend build (run after each build)."""
+    count = precompress_folder(static_manifest.folder)
+    click.echo(f'Wrote {count} precompressed files')
+    if brotli is None:
+        click.echo('brotli is not installed; only gzip variants were written')
+
+
+static_manifest = StaticManifest()
@@ -0,0 +1,259 @@
+import json
+import os
+import re
+import threading
+from string import Formatter
+
+# Numbered section headings ("1. REFERRAL RECEIPT CONFIRMATION") start a new
+# chunk when a template is rendered incrementally
+SECTION_HEADING = re.compile(r'^\d+\. [A-Z]', re.MULTILINE)
+
+
+class TemplateError(ValueError):
+    """Raised when a template does not match its declared placeholders."""
+
+
+def split_sections(text):
+    """Split template text at numbered section headings; the first part is the preamble."""
+    starts = [0] + [match.start() for match in SECTION_HEADING.finditer(text) if match.start()]
+    ends = starts[1:] + [len(text)]
+    return [text[start:end] for start, end in zip(starts, ends)]
+
+
+class CompiledTemplate:
+    """A ``{placeholder}`` text template parsed once into literal/field segments.
+
+    Rendering is a single join over the pre-split segments, with no re-parsing
+    of the template text. Only bare placeholder names are supported; format
+    specs, conversions and attribute access are rejected at compile time.
+    Segments are also grouped at numbered section headings so a document can
+    be rendered chunk by chunk with ``iter_render``.
+    """
+
+    __slots__ = ('name', 'placeholders', 'segments', 'sections', '_plan', '_section_plans')
+
+    def __init__(self, name, text, placeholders=None):
+        self.name = name
+        sections = []
+        fields = []
+        for part in split_sections(text):
+            sections.append(tuple(self._parse(part, fields)))
+        if placeholders is not None:
+            undeclared = set(fields) - set(placeholders)
+            if undeclared:
+                raise TemplateError(f"{name}: undeclared placeholders {', '.join(sorted(undeclared))}")
+            unused = set(placeholders) - set(fields)
+            if unused:
+                raise TemplateError(f"{name}: declared placeholders not used: {', '.join(sorted(unused))}")
+            fields = list(placeholders)
+        self.placeholders = tuple(fields)
+        self.sections = tuple(sections)
+        self.segments = tuple(segment for section in sections for segment in section)
+        self._plan = self._build_plan(self.segments)
+        self._section_plans = tuple(self._build_plan(section) for section in self.sections)
+
+    def render(self, context):
+        """Render the whole template; ``context`` must supply every placeholder."""
+        return self._fill(self._plan, context)
+
+    def iter_render(self, context):
+        """Yield the rendered template one section at a time."""
+        for plan in self._section_plans:
+            yield self._fill(plan, context)
+
+    @staticmethod
+    def _build_plan(segments):
+        # Literal parts with empty slots where fields go, plus (slot, field) pairs
+        parts = tuple('' if field is not None else literal for literal, field in segments)
+        slots = tuple((index, field) for index, (_, field) in enumerate(segments) if field is not None)
+        return parts, slots
+
+    @staticmethod
+    def _fill(plan, context):
+        parts, slots = plan
+        parts = list(parts)
+        for index, field in slots:
+            parts[index] = context[field]
+        return ''.join(parts)
+
+    def _parse(self, text, fields):
+        try:
+            parsed = list(Formatter().parse(text))
+        except ValueError as e:
+            raise TemplateError(f'{self.name}: {e}') from e
+        for literal, field, spec, conversion in parsed:
+            if literal:
+                yield literal, None
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion:
+                raise TemplateError(f'{self.name}: unsupported placeholder {{{field}}}')
+            if field not in fields:
+                fields.append(field)
+            yield None, field
+
+    def __repr__(self):
+        return f'<CompiledTemplate {self.name}>'
+
+
+class TemplateSection:
+    """One numbered section of a step template and the context fields it depends on."""
+
+    __slots__ = ('number', 'heading', 'fields', 'template')
+
+    def __init__(self, number, heading, fields, template):
+        self.number = number
+        self.heading = heading
+        self.fields = fields
+        self.template = template
+
+    def render(self, context):
+        return self.template.render(context)
+
+    def __repr__(self):
+        return f'<TemplateSection {self.heading}>'
+
+
+class StepTemplate:
+    """One workflow step's template: document type, version and compiled text.
+
+    Steps whose manifest entry declares ``sections`` also carry one
+    ``TemplateSection`` per numbered section, plus ``guidance``: the
+    instructions after the last section, which apply to every section.
+    """
+
+    __slots__ = ('step_id', 'document_type', 'version', 'template', 'sections', 'guidance')
+
+    def __init__(self, step_id, document_type, version, template, sections=(), guidance=None):
+        self.step_id = step_id
+        self.document_type = document_type
+        self.version = version
+        self.template = template
+        self.sections = sections
+        self.guidance = guidance
+
+    @property
+    def placeholders(self):
+        return self.template.placeholders
+
+    def render(self, context):
+        return self.template.render(context)
+
+    def iter_render(self, context):
+        return self.template.iter_render(context)
+
+
+class TemplateRegistry:
+    """Step templates loaded from ``manifest.json`` plus one text file per step.
+
+    Each manifest entry declares the template file, a version, the
+    placeholders its text uses and (optionally) the document type. Templates
+    are compiled once, on first use or by ``ensure_loaded`` at warm-up; a
+    request only renders the step it asked for. ``config_key`` names the app
+    config/environment setting that can point the registry at another
+    directory.
+
+    A step entry may also list its numbered ``sections``, each with its
+    ``title`` and the context ``fields`` it depends on, for generating the
+    document section by section. The manifest's ``section`` entry is then
+    the template wrapping one section into a prompt, and its
+    ``fieldLabels`` name every field a section may depend on.
+    """
+
+    def __init__(self, directory, config_key):
+        self.directory = directory
+        self.config_key = config_key
+        self.version = None
+        self.templates = {}
+        self.default = None
+        self.section_prompt = None
+        self.field_labels = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        directory = app.config.get(self.config_key, os.environ.get(self.config_key, self.directory))
+        app.config[self.config_key] = directory
+        with self._lock:
+            self.directory = directory
+            self.default = None
+
+    def ensure_loaded(self):
+        """Load the templates unless they already are; returns the registry."""
+        if self.default is None:
+            self.load()
+        return self
+
+    def load(self, directory=None):
+        """(Re)load and compile every template from ``directory``."""
+        directory = directory or self.directory
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        version = str(manifest['version'])
+        templates = {
+            step_id: self._compile(directory, version, step_id, entry)
+            for step_id, entry in manifest['steps'].items()
+        }
+        default = self._compile(directory, version, 'default', manifest['default'])
+        section_prompt, field_labels = None, {}
+        if 'section' in manifest:
+            section_prompt = self._compile(directory, version, 'section', manifest['section'])
+            field_labels = dict(manifest['section']['fieldLabels'])
+        for template in templates.values():
+            for section in template.sections:
+                unknown = set(section.fields) - set(field_labels)
+                if unknown:
+                    raise TemplateError(f"{template.step_id}: section {section.number} depends on unknown "
+                                        f"fields {', '.join(sorted(unknown))}")
+        with self._lock:
+            self.directory = directory
+            self.version = version
+            self.templates = templates
+            self.default = default
+            self.section_prompt = section_prompt
+            self.field_labels = field_labels
+        return self
+
+    def get(self, step_id):
+        """Template for ``step_id``, or the generic template for unknown steps."""
+        self.ensure_loaded()
+        return self.templates.get(step_id, self.default)
+
+    def step_ids(self):
+        return list(self.ensure_loaded().templates)
+
+    def __contains__(self, step_id):
+        return step_id in self.ensure_loaded().templates
+
+    def _compile(self, directory, version, step_id, entry):
+        with open(os.path.join(directory, entry['file']), encoding='utf-8') as f:
+            text = f.read()
+        if text.endswith('\n'):
+            text = text[:-1]
+        template = CompiledTemplate(f'{step_id}:{entry["file"]}', text, entry['placeholders'])
+        sections, guidance = self._compile_sections(step_id, text, entry.get('sections') or ())
+        # e.g. "2025.1-3": manifest release, then this step's own revision
+        return StepTemplate(step_id, entry.get('documentType'), f"{version}-{entry['version']}", template,
+                            sections, guidance)
+
+    @staticmethod
+    def _compile_sections(step_id, text, declared):
+        if not declared:
+            return (), None
+        parts = [part.strip() for part in split_sections(text)[1:]]
+        if len(parts) != len(declared):
+            raise TemplateError(f'{step_id}: {len(declared)} sections declared, template has {len(parts)}')
+        # Everything after the last section's first blank line addresses the whole document
+        parts[-1], _, guidance_text = parts[-1].partition('\n\n')
+        guidance = CompiledTemplate(f'{step_id}:guidance', guidance_text.strip()) if guidance_text.strip() else None
+        sections = []
+        for number, (part, entry) in enumerate(zip(parts, declared), start=1):
+            heading = part.splitlines()[0].split(' - ')[0].strip()
+            if heading != f"{number}. {entry['title']}":
+                raise TemplateError(f"{step_id}: section {number} is {heading!r}, manifest says {entry['title']!r}")
+            template = CompiledTemplate(f'{step_id}:section{number}', part)
+            undeclared = (set(template.placeholders) | set(guidance.placeholders if guidance else ())) \
+                - set(entry['fields'])
+            if undeclared:
+                raise TemplateError(f"{step_id}: section {number} uses undeclared fields {', '.join(sorted(undeclared))}")
+            sections.append(TemplateSection(number, heading, tuple(entry['fields']), template))
+        return tuple(sections), guidance
@@ -0,0 +1,79 @@
+"""CircuitBreaker: half-open probe slots, and which call results count toward transitions.
+
+    python -m unittest discover tests
+"""
+import unittest
+
+from src.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker('test')
+        self.breaker._settings.update(EIA_BREAKER_OPEN_SECONDS=0.0, EIA_BREAKER_HALF_OPEN_PROBES=1)
+
+    def half_open(self):
+        with self.breaker._lock:
+            self.breaker._transition(OPEN, 'test')
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+    def test_probe_slots_are_limited_while_half_open(self):
+        self.half_open()
+        probe = self.breaker.allow_request()
+        self.assertTrue(probe.probe)
+        self.assertIsNone(self.breaker.allow_request())
+
+        self.breaker.release_probe(probe)
+        self.assertTrue(self.breaker.allow_request().probe)
+
+    def test_releasing_a_call_admitted_while_closed_keeps_the_probe_slot_taken(self):
+        admission = self.breaker.allow_request()
+        self.assertFalse(admission.probe)
+        self.half_open()
+        self.assertIsNotNone(self.breaker.allow_request())
+
+        self.breaker.release_probe(admission)
+        self.assertIsNone(self.breaker.allow_request())
+
+    def test_releasing_a_probe_of_an_earlier_half_open_period_is_ignored(self):
+        self.half_open()
+        stale = self.breaker.allow_request()
+        self.half_open()
+        self.assertIsNotNone(self.breaker.allow_request())
+
+        self.breaker.release_probe(stale)
+        self.assertIsNone(self.breaker.allow_request())
+        self.assertNotEqual(self.breaker.state, CLOSED)
+
+    def test_call_admitted_while_closed_does_not_count_as_a_probe(self):
+        slow = self.breaker.allow_request()
+        self.half_open()
+        probe = self.breaker.allow_request()
+
+        self.breaker.record_success(slow, 0.1)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.record_failure(slow, 0.1)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+        self.breaker.record_success(probe, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failed_probe_reopens_the_circuit(self):
+        self.breaker._settings['EIA_BREAKER_OPEN_SECONDS'] = 30.0
+        with self.breaker._lock:
+            self.breaker._transition(HALF_OPEN, 'test')
+        probe = self.breaker.allow_request()
+
+        self.breaker.record_failure(probe, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_failures_while_closed_open_the_circuit(self):
+        self.breaker._settings.update(EIA_BREAKER_MIN_CALLS=2, EIA_BREAKER_OPEN_SECONDS=30.0)
+        for _ in range(2):
+            self.breaker.record_failure(self.breaker.allow_request(), 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertIsNone(self.breaker.allow_request())
+
+
+if __name__ == '__main__':
+    unittest.main()
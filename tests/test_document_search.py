@@ -0,0 +1,60 @@
+"""DocumentSearch: keeping the full-text index in step with stored documents.
+
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.main import create_app
+from src.models.user import db
+from src.services.document_search import FTS_TABLE, document_search
+from src.services.document_store import save_document
+from src.services.startup import startup
+
+CLIENT = {'name': 'Acme Mining'}
+
+
+def document(content):
+    return {'stepId': 'step1', 'documentType': 'Referral Processing Report', 'source': 'template', 'content': content}
+
+
+class DocumentIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.directory, 'app.db')}",
+            'EIA_LIMITER_STATE_PATH': os.path.join(self.directory, 'limiter.db'),
+        })
+        startup.migrate(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+        shutil.rmtree(self.directory)
+
+    def found(self, text):
+        return [row[0].id for row in document_search.search(text)]
+
+    def test_saved_document_is_searchable(self):
+        document_id = save_document(document('Groundwater sampling plan'), CLIENT)
+        self.assertEqual(self.found('groundwater'), [document_id])
+
+    def test_document_is_stored_without_the_index_table(self):
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql(f'DROP TABLE {FTS_TABLE}')
+
+        with self.assertLogs('src.services.document_search', 'WARNING'):
+            document_id = save_document(document('Groundwater sampling plan'), CLIENT)
+        self.assertIsNotNone(document_id)
+
+        self.assertEqual(document_search.rebuild(), 1)
+        self.assertEqual(self.found('groundwater'), [document_id])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""JobRunner: claiming queued items and honouring job cancellation.
+
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from src.main import create_app
+from src.models.job import GenerationJob, GenerationJobItem
+from src.models.user import db
+from src.services.job_runner import JobRunner
+from src.services.startup import startup
+
+CLIENT = {'name': 'Acme Mining', 'projectType': 'mine'}
+
+
+class JobRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.directory, 'app.db')}",
+            'EIA_LIMITER_STATE_PATH': os.path.join(self.directory, 'limiter.db'),
+        })
+        startup.migrate(self.app)
+        self.client = self.app.test_client()
+        self.context = self.app.app_context()
+        self.context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+        shutil.rmtree(self.directory)
+
+    def submit(self, steps=('step1',)):
+        response = self.client.post('/api/eia/jobs', json={'clients': [CLIENT], 'stepIds': list(steps)})
+        self.assertEqual(response.status_code, 202)
+        return response.get_json()['id']
+
+    def runner(self, handler):
+        runner = JobRunner(handler)
+        runner.app = self.app
+        return runner
+
+    def items(self, job_id):
+        db.session.expire_all()
+        return db.session.query(GenerationJobItem).filter_by(job_id=job_id).order_by(GenerationJobItem.id).all()
+
+    def test_item_failing_after_its_job_is_cancelled_is_not_retried(self):
+        job_id = self.submit(('step1', 'step2'))
+
+        def cancel_then_fail(step_id, client_data):
+            self.assertEqual(self.client.post(f'/api/eia/jobs/{job_id}/cancel').status_code, 200)
+            raise RuntimeError('upstream went away')
+
+        runner = self.runner(cancel_then_fail)
+        item_id = runner._claim_next('worker')
+        runner._process(item_id)
+
+        self.assertEqual([item.status for item in self.items(job_id)], ['cancelled', 'cancelled'])
+        self.assertIsNone(runner._claim_next('worker'))
+
+    def test_lapsed_claim_of_a_cancelled_job_is_not_reclaimed(self):
+        job_id = self.submit()
+        runner = self.runner(lambda step_id, client_data: {})
+        item_id = runner._claim_next('crashed-worker')
+        db.session.get(GenerationJobItem, item_id).claimed_at = datetime.utcnow() - timedelta(days=1)
+        db.session.get(GenerationJob, job_id).cancelled_at = datetime.utcnow()
+        db.session.commit()
+
+        self.assertIsNone(runner._claim_next('worker'))
+        self.assertEqual(self.items(job_id)[0].claimed_by, 'crashed-worker')
+
+    def test_failed_item_of_an_active_job_is_retried(self):
+        job_id = self.submit()
+
+        def fail(step_id, client_data):
+            raise RuntimeError('upstream went away')
+
+        runner = self.runner(fail)
+        item_id = runner._claim_next('worker')
+        runner._process(item_id)
+
+        self.assertEqual(self.items(job_id)[0].status, 'pending')
+        self.assertEqual(runner._claim_next('worker'), item_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+"""Metrics: stage timing labels and outcomes.
+
+    python -m unittest discover tests
+"""
+import unittest
+
+from src.services.metrics import Metrics
+
+
+class TimedTest(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        self.metrics.track_steps({'step1'})
+
+    def observations(self):
+        return {key: sum(counts) for key, (counts, _) in self.metrics.stage_seconds.snapshot().items()}
+
+    def test_outcome_can_be_set_inside_the_block(self):
+        for outcome in ('llm', 'cached', 'llm'):
+            with self.metrics.timed('generate', step_id='step1', model='m') as stage:
+                stage['outcome'] = outcome
+
+        self.assertEqual(self.observations(), {('generate', 'step1', 'm', 'llm'): 2,
+                                               ('generate', 'step1', 'm', 'cached'): 1})
+
+    def test_raising_block_is_an_error(self):
+        with self.assertRaises(ValueError):
+            with self.metrics.timed('prompt', step_id='step1'):
+                raise ValueError('bad template')
+
+        self.assertEqual(self.observations(), {('prompt', 'step1', '', 'error'): 1})
+
+    def test_untracked_step_ids_share_one_series(self):
+        for step_id in ('step9', 'nope', ['step1']):
+            with self.metrics.timed('prompt', step_id=step_id):
+                pass
+
+        self.assertEqual(self.observations(), {('prompt', 'unknown', '', 'ok'): 3})
+        self.assertEqual(list(self.metrics._stage_children), [('prompt', 'unknown', '', 'ok')])
+
+
+if __name__ == '__main__':
+    unittest.main()
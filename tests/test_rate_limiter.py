@@ -0,0 +1,82 @@
+"""UpstreamLimiter: per-minute token reservations settled with reported usage.
+
+    python -m unittest discover tests
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from flask import Flask
+
+from src.services.rate_limiter import TokenBuckets, UpstreamLimiter
+
+PROMPT = 'x' * 400  # 100 estimated tokens
+
+
+class TokenBucketsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.buckets = TokenBuckets(os.path.join(self.directory, 'limiter.db'), 0, 6000)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_credit_returns_tokens_up_to_the_limit(self):
+        self.assertEqual(self.buckets.take(5000), 0)
+        self.buckets.credit('tokens', 4000)
+        self.assertAlmostEqual(self.buckets.levels()['tokens'], 5000, delta=5)
+
+        self.buckets.credit('tokens', 4000)
+        self.assertEqual(self.buckets.levels()['tokens'], 6000)
+
+    def test_negative_credit_takes_tokens(self):
+        self.buckets.credit('tokens', -1000)
+        self.assertAlmostEqual(self.buckets.levels()['tokens'], 5000, delta=5)
+
+
+class TokenReservationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        app = Flask(__name__)
+        app.config.update(EIA_LIMITER_STATE_PATH=os.path.join(self.directory, 'limiter.db'),
+                          EIA_UPSTREAM_RPM=0, EIA_UPSTREAM_TPM=60000)
+        self.limiter = UpstreamLimiter(app)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def level(self):
+        return self.limiter.buckets.levels()['tokens']
+
+    def test_settled_call_keeps_only_the_tokens_it_used(self):
+        with self.limiter.slot(PROMPT, 3000) as reservation:
+            self.assertEqual(reservation.tokens, 3100)
+            self.assertAlmostEqual(self.level(), 60000 - 3100, delta=50)
+            reservation.settle(SimpleNamespace(total_tokens=600))
+
+        self.assertAlmostEqual(self.level(), 60000 - 600, delta=50)
+        self.assertEqual(self.limiter.stats()['tokensReturned'], 2500)
+
+    def test_unsettled_call_keeps_its_reservation(self):
+        with self.assertRaises(RuntimeError):
+            with self.limiter.slot(PROMPT, 3000):
+                raise RuntimeError('upstream failed')
+
+        self.assertAlmostEqual(self.level(), 60000 - 3100, delta=50)
+        self.assertEqual(self.limiter.stats()['tokensReturned'], 0)
+
+    def test_async_slot_settles_too(self):
+        async def call():
+            async with self.limiter.async_slot(PROMPT, 3000) as reservation:
+                reservation.settle(None)
+                reservation.settle(SimpleNamespace(total_tokens=1100))
+
+        asyncio.run(call())
+        self.assertAlmostEqual(self.level(), 60000 - 1100, delta=50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+"""FairScheduler: dispatch order, batch slot limits and timeout/cancel races.
+
+    python -m unittest discover tests
+"""
+import asyncio
+import queue
+import threading
+import time
+import unittest
+
+from src.services.scheduler import FairScheduler, QueueFullError
+
+WEIGHTS = {'urgent': 16, 'interactive': 4, 'batch_urgent': 2, 'batch': 1}
+
+
+class SchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.granted = queue.Queue()
+        self.threads = []
+
+    def tearDown(self):
+        for thread in self.threads:
+            thread.join(1)
+
+    def queue_waiter(self, scheduler, name, priority, cost=1, timeout=5):
+        """Start a thread that queues for a slot, and return once it is queued"""
+        depth = scheduler.queue_depths()[priority]
+
+        def run():
+            if scheduler.acquire(priority, cost, timeout, max_queue=100):
+                self.granted.put(name)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        deadline = time.monotonic() + 1
+        while scheduler.queue_depths()[priority] == depth:
+            self.assertLess(time.monotonic(), deadline, f'{name} never queued')
+            time.sleep(0.001)
+
+    def grant_order(self, scheduler, priority, count):
+        """Release ``count`` slots held by ``priority`` one at a time; names of the waiters they went to"""
+        order = []
+        for _ in range(count):
+            scheduler.release(priority)
+            name = self.granted.get(timeout=1)
+            order.append(name)
+            priority = name.split('-')[0]
+        return order
+
+
+class DispatchOrderTest(SchedulerTestCase):
+    def test_classes_drain_in_proportion_to_their_weights(self):
+        scheduler = FairScheduler(1, WEIGHTS)
+        self.assertTrue(scheduler.acquire('batch', 1, 0, 100))
+        for index in range(3):
+            self.queue_waiter(scheduler, f'batch-{index}', 'batch')
+        for index in range(8):
+            self.queue_waiter(scheduler, f'interactive-{index}', 'interactive')
+
+        order = self.grant_order(scheduler, 'batch', 11)
+        # Virtual finish times: interactive 0.25, 0.5, ...; batch 1, 2, 3
+        self.assertEqual(order, [
+            'interactive-0', 'interactive-1', 'interactive-2', 'interactive-3', 'batch-0',
+            'interactive-4', 'interactive-5', 'interactive-6', 'interactive-7', 'batch-1',
+            'batch-2',
+        ])
+
+    def test_late_urgent_call_goes_ahead_of_a_batch_backlog(self):
+        scheduler = FairScheduler(1, WEIGHTS)
+        self.assertTrue(scheduler.acquire('batch', 100, 0, 100))
+        for index in range(5):
+            self.queue_waiter(scheduler, f'batch-{index}', 'batch', cost=100)
+        self.assertEqual(self.grant_order(scheduler, 'batch', 1), ['batch-0'])
+        self.queue_waiter(scheduler, 'urgent-0', 'urgent', cost=100)
+
+        self.assertEqual(self.grant_order(scheduler, 'batch', 2), ['urgent-0', 'batch-1'])
+        self.grant_order(scheduler, 'batch', 3)
+
+    def test_batch_is_slowed_not_starved(self):
+        scheduler = FairScheduler(1, WEIGHTS)
+        self.assertTrue(scheduler.acquire('interactive', 1, 0, 100))
+        self.queue_waiter(scheduler, 'batch-0', 'batch')
+        for index in range(10):
+            self.queue_waiter(scheduler, f'interactive-{index}', 'interactive')
+
+        order = self.grant_order(scheduler, 'interactive', 11)
+        self.assertLess(order.index('batch-0'), 5)
+
+
+class BatchCapacityTest(SchedulerTestCase):
+    def test_batch_never_takes_the_reserved_slots(self):
+        scheduler = FairScheduler(4, WEIGHTS, reserved=2)
+        self.assertEqual(scheduler.batch_capacity, 2)
+        self.assertTrue(scheduler.acquire('batch', 1, 0, 100))
+        self.assertTrue(scheduler.acquire('batch_urgent', 1, 0, 100))
+        self.assertFalse(scheduler.acquire('batch', 1, 0.01, 100))
+
+        self.assertTrue(scheduler.acquire('interactive', 1, 0, 100))
+        self.assertTrue(scheduler.acquire('urgent', 1, 0, 100))
+        self.assertFalse(scheduler.acquire('interactive', 1, 0.01, 100))
+        self.assertEqual(scheduler.running(), {'urgent': 1, 'interactive': 1, 'batch_urgent': 1, 'batch': 1})
+        self.assertEqual(scheduler.stats()['classes']['batch']['timedOut'], 1)
+
+    def test_free_reserved_slot_is_not_handed_to_queued_batch(self):
+        scheduler = FairScheduler(3, WEIGHTS, reserved=1)
+        self.assertTrue(scheduler.acquire('batch', 1, 0, 100))
+        self.assertTrue(scheduler.acquire('batch', 1, 0, 100))
+        self.assertTrue(scheduler.acquire('interactive', 1, 0, 100))
+        self.queue_waiter(scheduler, 'batch-0', 'batch')
+
+        scheduler.release('interactive')
+        self.assertTrue(self.granted.empty())
+        self.assertEqual(scheduler.queue_depths()['batch'], 1)
+
+        self.assertEqual(self.grant_order(scheduler, 'batch', 1), ['batch-0'])
+        self.assertEqual(scheduler.running()['batch'], 2)
+
+    def test_full_class_queue_is_rejected(self):
+        scheduler = FairScheduler(1, WEIGHTS)
+        self.assertTrue(scheduler.acquire('interactive', 1, 0, 1))
+        with self.assertRaises(QueueFullError):
+            scheduler.acquire('interactive', 1, 5, 0)
+        self.assertEqual(scheduler.stats()['classes']['interactive']['rejected'], 1)
+
+
+class AbandonRaceTest(SchedulerTestCase):
+    def test_timeout_after_grant_keeps_the_slot(self):
+        scheduler = FairScheduler(1, WEIGHTS)
+        self.assertTrue(scheduler.acquire('interactive', 1, 0, 100))
+        waiter = scheduler._enqueue('interactive', 1, 100)
+        # The slot is handed over just as the waiter's timeout expires
+        scheduler.release('interactive')
+
+        self.assertTrue(scheduler._abandon(waiter, timed_out=True))
+        self.assertEqual(scheduler.running()['interactive'], 1)
+        self.assertEqual(scheduler.stats()['classes']['interactive']['timedOut'], 0)
+
+    def test_timeout_before_grant_leaves_the_queue(self):
+        scheduler = FairScheduler(1, WEIGHTS)
+        self.assertTrue(scheduler.acquire('interactive', 1, 0, 100))
+        self.assertFalse(scheduler.acquire('batch', 1, 0.01, 100))
+
+        self.assertEqual(scheduler.queue_depths()['batch'], 0)
+        scheduler.release('interactive')
+        self.assertEqual(scheduler.running(), dict.fromkeys(WEIGHTS, 0))
+
+    def test_cancel_after_grant_passes_the_slot_on(self):
+        scheduler = FairScheduler(1, WEIGHTS)
+
+        async def main():
+            self.assertTrue(await scheduler.acquire_async('interactive', 1, 5, 100))
+            first = asyncio.create_task(scheduler.acquire_async('urgent', 1, 5, 100))
+            second = asyncio.create_task(scheduler.acquire_async('batch', 1, 5, 100))
+            await asyncio.sleep(0.01)
+            # Grant the slot to the first waiter, then cancel it before it wakes up
+            scheduler.release('interactive')
+            first.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await first
+            self.assertTrue(await asyncio.wait_for(second, 1))
+
+        asyncio.run(main())
+        self.assertEqual(scheduler.running(), {'urgent': 0, 'interactive': 0, 'batch_urgent': 0, 'batch': 1})
+        self.assertEqual(scheduler.queue_depths(), dict.fromkeys(WEIGHTS, 0))
+
+    def test_cancel_before_grant_leaves_the_queue(self):
+        scheduler = FairScheduler(1, WEIGHTS)
+
+        async def main():
+            self.assertTrue(await scheduler.acquire_async('interactive', 1, 5, 100))
+            waiting = asyncio.create_task(scheduler.acquire_async('batch', 1, 5, 100))
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            scheduler.release('interactive')
+
+        asyncio.run(main())
+        self.assertEqual(scheduler.running(), dict.fromkeys(WEIGHTS, 0))
+        self.assertEqual(scheduler.queue_depths(), dict.fromkeys(WEIGHTS, 0))
+
+    def test_async_timeout_returns_false(self):
+        scheduler = FairScheduler(1, WEIGHTS)
+
+        async def main():
+            self.assertTrue(await scheduler.acquire_async('interactive', 1, 5, 100))
+            return await scheduler.acquire_async('batch', 1, 0.01, 100)
+
+        self.assertFalse(asyncio.run(main()))
+        self.assertEqual(scheduler.stats()['classes']['batch']['timedOut'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
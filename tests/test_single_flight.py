@@ -0,0 +1,130 @@
+"""SingleFlight across worker processes: waiting on, and taking over, another worker's claim.
+
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, update
+
+from src.main import create_app
+from src.models.inflight import InflightGeneration
+from src.models.user import db
+from src.services.single_flight import single_flight
+from src.services.startup import startup
+
+KEY = 'a' * 64
+
+
+class SharedSingleFlightTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.directory, 'app.db')}",
+            'EIA_LIMITER_STATE_PATH': os.path.join(self.directory, 'limiter.db'),
+            'EIA_SINGLE_FLIGHT_SHARED': 1,
+            'EIA_SINGLE_FLIGHT_POLL_SECONDS': 0.02,
+        })
+        startup.migrate(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        self.processes = []
+
+    def tearDown(self):
+        for process in self.processes:
+            process.kill()
+            process.wait()
+        db.session.remove()
+        db.engine.dispose()
+        self.context.pop()
+        shutil.rmtree(self.directory)
+
+    def start_worker(self):
+        """A live process standing in for another worker; returns its pid"""
+        process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+        self.processes.append(process)
+        return process.pid
+
+    def exited_worker(self):
+        process = subprocess.Popen([sys.executable, '-c', 'pass'])
+        process.wait()
+        return process.pid
+
+    def claim(self, owner_pid, lease_seconds=240, token='other-worker'):
+        """Write another worker's ``running`` claim on ``KEY``"""
+        now = datetime.utcnow()
+        with db.engine.begin() as conn:
+            conn.execute(insert(InflightGeneration.__table__).values(
+                token=token, key=KEY, owner_pid=owner_pid, status='running',
+                expires_at=now + timedelta(seconds=lease_seconds), updated_at=now
+            ))
+
+    def rows(self):
+        table = InflightGeneration.__table__
+        with db.engine.connect() as conn:
+            return {row.token: row for row in conn.execute(select(table).where(table.c.key == KEY))}
+
+    def call(self):
+        calls = []
+
+        def fn():
+            calls.append(1)
+            return 'generated here'
+
+        result = single_flight.do(KEY, fn)
+        return result, len(calls)
+
+    def test_claim_of_an_exited_worker_is_taken_over(self):
+        self.claim(self.exited_worker())
+        takeovers = single_flight.stats()['takeovers']
+
+        self.assertEqual(self.call(), (('generated here', False), 1))
+        self.assertEqual(single_flight.stats()['takeovers'], takeovers + 1)
+        rows = self.rows()
+        self.assertEqual(rows.pop('other-worker').status, 'abandoned')
+        (row,) = rows.values()
+        self.assertEqual((row.status, row.content, row.owner_pid), ('done', 'generated here', os.getpid()))
+
+    def test_lapsed_lease_is_taken_over(self):
+        self.claim(self.start_worker(), lease_seconds=-1)
+
+        self.assertEqual(self.call(), (('generated here', False), 1))
+        self.assertEqual(self.rows()['other-worker'].status, 'abandoned')
+
+    def test_live_claim_is_waited_on(self):
+        self.claim(self.start_worker())
+        engine = db.engine
+
+        def finish():
+            time.sleep(0.1)
+            with engine.begin() as conn:
+                conn.execute(update(InflightGeneration.__table__)
+                             .where(InflightGeneration.token == 'other-worker')
+                             .values(status='done', content='generated elsewhere'))
+
+        threading.Thread(target=finish).start()
+        self.assertEqual(self.call(), (('generated elsewhere', True), 0))
+
+    def test_claim_is_taken_over_when_its_worker_exits_mid_call(self):
+        pid = self.start_worker()
+        self.claim(pid)
+
+        def exit_worker():
+            time.sleep(0.1)
+            self.processes[0].kill()
+            self.processes[0].wait()
+
+        threading.Thread(target=exit_worker).start()
+        self.assertEqual(self.call(), (('generated here', False), 1))
+        self.assertEqual(self.rows()['other-worker'].status, 'abandoned')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""Bulk user routes: request validation.
+
+    python -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.main import create_app
+from src.models.user import db
+from src.services.startup import startup
+
+
+class BulkUsersTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.directory, 'app.db')}",
+            'EIA_LIMITER_STATE_PATH': os.path.join(self.directory, 'limiter.db'),
+        })
+        startup.migrate(self.app)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def test_body_that_is_not_an_object_is_rejected(self):
+        for body in ([{'username': 'a', 'email': 'a@example.com'}], 'users', 3, None):
+            for method in (self.client.post, self.client.put):
+                response = method('/api/users/bulk', json=body)
+                self.assertEqual(response.status_code, 400, body)
+                self.assertEqual(response.get_json(), {'error': 'users must be a non-empty list'})
+
+    def test_users_are_created_then_upserted(self):
+        users = [{'username': 'ana', 'email': 'ana@example.com'}, {'username': 'bo', 'email': 'bo@example.com'}]
+        response = self.client.post('/api/users/bulk', json={'users': users})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['created'], 2)
+
+        users[1]['email'] = 'bo@example.org'
+        self.assertEqual(self.client.put('/api/users/bulk', json={'users': users}).get_json(), {'upserted': 2})
+        emails = [user['email'] for user in self.client.get('/api/users').get_json()['users']]
+        self.assertEqual(emails, ['ana@example.com', 'bo@example.org'])
+
+
+if __name__ == '__main__':
+    unittest.main()